@@ -0,0 +1,45 @@
+import hmac
+import logging
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from pydantic import BaseModel
+
+from app.config import settings
+from app.utils.batch_executor import get_batch_executor_stats
+from app.utils.model_registry import get_model_registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+class WarmUpRequest(BaseModel):
+    models: Optional[List[str]] = None  # Defaults to settings.WARMUP_MODELS
+
+async def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Allow the request only with the configured X-Admin-Token."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token")
+
+@router.get("/models", dependencies=[Depends(require_admin_token)])
+async def list_models() -> Dict[str, Any]:
+    """Load time, memory footprint and use count of every model, and their inference batching stats."""
+    return {"models": get_model_registry().stats(), "inference": get_batch_executor_stats()}
+
+@router.post("/models/warmup", dependencies=[Depends(require_admin_token)])
+async def warm_up_models(request: Optional[WarmUpRequest] = None) -> Dict[str, Any]:
+    """
+    Load models before the instance takes traffic.
+
+    Meant to be called by a deploy before it routes requests to a new
+    instance; returns 503 if any model failed to load so it can hold off.
+    """
+    result = await get_model_registry().warm_up(request.models if request else None)
+    logger.info(f"Model warm-up: loaded {result['loaded']}, failed {list(result['failed'])}")
+    if result["failed"]:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=result)
+    return result
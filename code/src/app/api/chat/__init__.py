@@ -1,10 +1,19 @@
+import json
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
-from app.dependencies import get_current_active_user, get_chatbot
+from app.dependencies import get_current_active_user, get_chatbot, get_chat_repository
 from app.models.user import User
+from app.models.chat import ChatMessageCreate
 from app.chatbot.enhanced_chatbot import EnhancedChatbot
+from app.repository.chat_repository import ChatRepository
+from app.services.llm_service import stream_llm_response
+from app.services.conversation_summary import schedule_summary_refresh
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -54,4 +63,77 @@ async def get_chat_history(
     Requires authentication.
     """
     # TODO: Implement chat history retrieval from database
-    return []  # Return empty list for now 
\ No newline at end of file
+    return []  # Return empty list for now
+
+def _sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format one Server-Sent Event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@router.post("/chat/stream")
+async def stream_message(
+    message: ChatMessageCreate,
+    current_user: User = Depends(get_current_active_user),
+    chat_repo: ChatRepository = Depends(get_chat_repository)
+) -> StreamingResponse:
+    """
+    Send a message and stream the AI response as Server-Sent Events.
+    
+    Each `token` event carries a text fragment as soon as the model produces it.
+    When generation ends the assembled reply is saved to the conversation and a
+    final `done` event carries the stored message id.
+    Requires authentication.
+    """
+    conversation = await chat_repo.get_conversation(message.conversation_id)
+    if not conversation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found"
+        )
+    
+    if conversation.user_id != str(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this conversation"
+        )
+    
+    # Save user message and build the context (rolling summary plus recent messages
+    # within the token budget) before streaming starts
+    await chat_repo.create_message(message)
+    context = await chat_repo.get_conversation_context(message.conversation_id)
+    
+    async def event_stream():
+        fragments: List[str] = []
+        metadata: Dict[str, Any] = {"generated": True, "streamed": True}
+        
+        try:
+            async for fragment in stream_llm_response(context, str(current_user.id)):
+                fragments.append(fragment)
+                yield _sse_event({"token": fragment}, event="token")
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            metadata.update({"error": str(e), "incomplete": True})
+            yield _sse_event({"error": "The response was interrupted. Please try again."}, event="error")
+        
+        content = "".join(fragments).strip()
+        if not content:
+            content = "I apologize, but I encountered an error processing your request. Please try again later."
+            metadata["fallback"] = True
+        
+        assistant_message = await chat_repo.create_message(ChatMessageCreate(
+            conversation_id=message.conversation_id,
+            role="assistant",  # Use lowercase to match MessageRole enum
+            content=content,
+            metadata=metadata
+        ))
+        yield _sse_event({"message_id": str(assistant_message.id), "content": content}, event="done")
+        
+        # Fold messages that left the context window into the summary
+        schedule_summary_refresh(chat_repo, message.conversation_id)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -4,7 +4,10 @@ import logging
 from datetime import datetime
 from bson.objectid import ObjectId
 
+from app.config import settings
+from app.database.mongodb import get_analytics_database
 from app.models.user import User
+from app.repository.transaction_rollup_repository import TransactionRollupRepository
 from app.utils.data_loader import DataLoader
 from app.utils.data_processor import DataProcessor
 from app.utils.prompt_generator import PromptGenerator
@@ -45,8 +48,13 @@ async def generate_meta_prompt(
         # Process the data to extract insights
         data_processor = DataProcessor()
         
-        # Process transaction data
-        if "transactions" in user_data:
+        # Process transaction data, from the monthly rollups when they are enabled for meta-prompts
+        rollups = []
+        if settings.META_PROMPT_ROLLUPS_ENABLED:
+            rollups = await TransactionRollupRepository(await get_analytics_database()).get_user_rollups(str(current_user.id))
+        if rollups:
+            user_data["transaction_insights"] = data_processor.extract_rollup_insights(rollups)
+        elif "transactions" in user_data:
             transaction_insights = data_processor.extract_transaction_insights(user_data["transactions"])
             user_data["transaction_insights"] = transaction_insights
         
@@ -3,6 +3,7 @@ from typing import List, Optional, Dict, Any
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.database import get_database
+from app.database.mongodb import get_analytics_database
 from app.repository.financial_repository import FinancialRepository
 from app.models.financial import Product, Investment, InvestmentCreate, InvestmentUpdate
 from app.auth import get_current_user
@@ -18,6 +19,10 @@ async def get_financial_repository(db: AsyncIOMotorDatabase = Depends(get_databa
     """Get financial repository instance."""
     return FinancialRepository(db)
 
+async def get_analytics_repository(db: AsyncIOMotorDatabase = Depends(get_analytics_database)) -> FinancialRepository:
+    """Get a financial repository that reads from secondaries when available, for summaries."""
+    return FinancialRepository(db)
+
 @router.get("/products", response_model=List[Product])
 async def list_products(
     category: Optional[str] = None,
@@ -107,7 +112,7 @@ async def update_investment(
 @router.get("/investments/summary", response_model=Dict[str, Any])
 async def get_investment_summary(
     user: User = Depends(get_current_user),
-    repo: FinancialRepository = Depends(get_financial_repository)
+    repo: FinancialRepository = Depends(get_analytics_repository)
 ):
     """
     Get a summary of the current user's investments.
@@ -120,10 +125,15 @@ async def get_investment_summary(
 async def get_transaction_summary(
     months: int = 3,
     current_user: User = Depends(get_current_user),
-    financial_repo: FinancialRepository = Depends(get_financial_repository)
+    financial_repo: FinancialRepository = Depends(get_analytics_repository)
 ) -> Any:
     """
     Get a summary of the current user's transactions.
+
+    With transaction rollups enabled the summary covers whole calendar
+    months (the current one and the `months - 1` before it); otherwise,
+    or until the user has rollups, it covers the last `30 * months` days.
+    period_start and period_end give the window that was used.
     """
     summary = await financial_repo.get_transaction_summary(str(current_user.id), months)
     return summary
@@ -179,7 +189,7 @@ async def get_user_demographics(
 @router.get("/financial-profile", response_model=Dict[str, Any])
 async def get_financial_profile(
     current_user: User = Depends(get_current_user),
-    financial_repo: FinancialRepository = Depends(get_financial_repository)
+    financial_repo: FinancialRepository = Depends(get_analytics_repository)
 ) -> Any:
     """
     Get a complete financial profile for the current user.
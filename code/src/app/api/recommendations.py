@@ -7,7 +7,7 @@ from pydantic import BaseModel
 from app.database.connection import get_database
 from app.database.models import Recommendations, ProductRecommendation, UserInDB
 from app.api.auth import get_current_user
-from app.models.recommendation_engine import RecommendationEngine
+from app.models.recommendation_engine import get_recommendation_engine
 from app.models.user import User
 from app.dependencies import get_current_active_user
 
@@ -27,16 +27,15 @@ class RecommendationsResponse(BaseModel):
 
 @router.get("/", response_model=RecommendationsResponse)
 async def get_recommendations(
-    current_user: User = Depends(get_current_active_user),
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    current_user: User = Depends(get_current_active_user)
 ) -> RecommendationsResponse:
     """
     Get personalized financial product recommendations for the current user.
     Uses the recommendation engine to generate personalized recommendations based on the user's profile.
     """
     try:
-        # Initialize the recommendation engine
-        recommendation_engine = RecommendationEngine(db)
+        # Shared engine with a warm product index
+        recommendation_engine = await get_recommendation_engine()
         
         # Get personalized recommendations for the user
         recommendations = await recommendation_engine.generate_recommendations(current_user.user_id)
@@ -52,7 +51,7 @@ async def get_recommendations(
         ]
         
         # Store the recommendations in history
-        await db.recommendations.insert_one({
+        await recommendation_engine.db.recommendations.insert_one({
             "user_id": current_user.user_id,
             "recommendations": [rec.dict() for rec in product_recommendations],
             "created_at": datetime.utcnow()
@@ -1,16 +1,22 @@
 from typing import List, Dict, Any, Optional, Tuple
+import asyncio
 import torch
-from sentence_transformers import SentenceTransformer
 from PIL import Image
 import numpy as np
 from app.conversation.memory import ConversationMemory
+from app.conversation.semantic_memory import interaction_text
 from app.recommendations.engine import RecommendationEngine
 from app.config import settings
+from app.utils.batch_executor import get_batch_executor
+from app.utils.model_registry import default_device, get_model_registry
 import logging
 import os
 
 logger = logging.getLogger(__name__)
 
+# Embedding model used when settings.EMBEDDING_MODEL can't be loaded
+FALLBACK_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
 class EnhancedChatbot:
     def __init__(
         self,
@@ -20,36 +26,26 @@ class EnhancedChatbot:
         self.memory = memory
         self.recommendation_engine = recommendation_engine
         
-        # Check for GPU availability for embedding models only
-        if torch.cuda.is_available():
-            self.device = torch.device("cuda")
-            logger.info("Using GPU for inference")
-        else:
-            self.device = torch.device("cpu")
-            logger.info("Using CPU for inference - no GPU available")
+        # Models are loaded once per process and shared by every chatbot
+        registry = get_model_registry()
+        self.device = torch.device(default_device())
         
         # Initialize embedding model for semantic search
         try:
-            self.embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL)
-            self.embedding_model.to(self.device)
-            logger.info(f"Successfully loaded embedding model: {settings.EMBEDDING_MODEL}")
-        except Exception as e:
+            self.embedding_model = registry.get(settings.EMBEDDING_MODEL)
+        except RuntimeError as e:
             logger.error(f"Failed to load embedding model: {e}")
             try:
                 # Fallback to a smaller embedding model
-                self.embedding_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-                self.embedding_model.to(self.device)
-                logger.info("Successfully loaded embedding model: sentence-transformers/all-MiniLM-L6-v2")
-            except Exception as e2:
+                self.embedding_model = registry.get(FALLBACK_EMBEDDING_MODEL)
+            except RuntimeError as e2:
                 logger.error(f"Failed to load fallback embedding model: {e2}")
                 self.embedding_model = None
         
         # Initialize image analysis model
         try:
-            self.image_model = SentenceTransformer("clip-ViT-B-32")
-            self.image_model.to(self.device)
-            logger.info("Successfully loaded image analysis model")
-        except Exception as e:
+            self.image_model = registry.get(settings.IMAGE_MODEL)
+        except RuntimeError as e:
             logger.error(f"Failed to load image model: {e}")
             self.image_model = None
             logger.warning("Image analysis disabled due to model loading failure")
@@ -62,14 +58,14 @@ class EnhancedChatbot:
         context: Optional[Dict[str, Any]] = None
     ) -> Tuple[str, List[Dict[str, Any]]]:
         """Process user message and generate response with recommendations."""
-        # Get user context
-        user_context = await self.memory.get_user_context(user_id)
+        # Get user context, with the past interactions most relevant to this message
+        user_context = await self.memory.get_user_context(user_id, query=message)
         
         # Process image if provided and image model is available
         image_embedding = None
         if image and self.image_model is not None:
             try:
-                image_embedding = self._process_image(image)
+                image_embedding = await self._process_image(image)
             except Exception as e:
                 logger.error(f"Failed to process image: {e}")
         
@@ -93,10 +89,10 @@ class EnhancedChatbot:
             message,
             response,
             {
-                "image_embedding": image_embedding.tolist() if image_embedding is not None else None,
                 "context": context,
                 "recommendations": recommendations
-            }
+            },
+            image_embedding=image_embedding
         )
         
         return response, recommendations
@@ -134,23 +130,28 @@ class EnhancedChatbot:
             logger.error(f"Error generating response: {e}", exc_info=True)
             return "I apologize, but I encountered an error while processing your request. Please try again with a simpler question."
     
-    def _process_image(self, image: Image.Image) -> np.ndarray:
+    async def _process_image(self, image: Image.Image) -> np.ndarray:
         """Process image and extract embeddings."""
         if self.image_model is None:
             raise RuntimeError("Image model not available")
-            
-        # Resize image if needed
-        image = image.resize((224, 224))
         
-        # Convert to tensor and normalize
-        image_tensor = torch.tensor(np.array(image)).float() / 255.0
-        image_tensor = image_tensor.permute(2, 0, 1).unsqueeze(0)
+        # CLIP resizes and normalizes the image itself
+        image = image.convert("RGB")
         
-        # Get image embedding
-        with torch.no_grad():
-            image_embedding = self.image_model.encode(image_tensor)
-        
-        return image_embedding
+        # Concurrent requests share one forward pass; the event loop never runs the model
+        if not settings.INFERENCE_BATCHING_ENABLED:
+            return (await asyncio.to_thread(self._encode_images, [image]))[0]
+        executor = get_batch_executor(f"image:{settings.IMAGE_MODEL}:{self.device}", self._encode_images)
+        return await executor.run(image)
+    
+    def _encode_images(self, images: List[Image.Image]) -> np.ndarray:
+        """Embed a batch of images in one forward pass."""
+        return self.image_model.encode(
+            images,
+            batch_size=len(images),
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
     
     def _prepare_prompt(
         self,
@@ -161,7 +162,12 @@ class EnhancedChatbot:
     ) -> str:
         """Prepare prompt for the model with proper context."""
         # Create a simple prompt structure - actual formatting will happen in LLMService
-        return message
+        interactions = user_context.get("interactions") or []
+        if not interactions:
+            return message
+        
+        earlier = "\n\n".join(interaction_text(i.get("message", ""), i.get("response", "")) for i in interactions)
+        return f"Relevant earlier exchanges with this user:\n{earlier}\n\nCurrent message:\n{message}"
     
     def _clean_response(self, response: str, prompt: str) -> str:
         """Clean up generated response."""
@@ -60,6 +60,16 @@ class Settings(BaseSettings):
     LOCAL_MONGODB_URL: str = "mongodb://localhost:27017"
     LOCAL_MONGODB_DB: str = "financial_advisor"
     
+    # MongoDB connection pool (shared by the API, background jobs and loaders)
+    MONGODB_MAX_POOL_SIZE: int = 50  # Connections per server
+    MONGODB_MIN_POOL_SIZE: int = 5  # Idle connections kept open per server
+    MONGODB_MAX_IDLE_TIME_MS: int = 60000  # Close connections idle for longer than this
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 10000  # Max wait for a free connection before erroring
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000  # Max wait for a suitable server
+    MONGODB_CONNECT_TIMEOUT_MS: int = 10000  # Socket connect timeout
+    MONGODB_COMPRESSORS: str = "zstd,snappy,zlib"  # Wire compressors in order of preference; unavailable ones are skipped
+    MONGODB_ANALYTICS_READ_PREFERENCE: str = "secondaryPreferred"  # Read preference for summary/analytics reads
+    
     # Redis settings (optional)
     REDIS_URL: Optional[str] = "redis://localhost:6379"
     REDIS_DB: Optional[str] = "0"
@@ -97,12 +107,37 @@ class Settings(BaseSettings):
     TEMP_DIR: str = "temp"
     DATA_DIR: str = str(Path(__file__).parent.parent / "data")
     PRODUCTS_FILE: str = "data/products.csv"
+    PRODUCTS_RELOAD_INTERVAL: int = 30  # Seconds between products file checks, 0 = never reload
+    PRODUCTS_CHANGE_STREAM_ENABLED: bool = False  # Reload on changes to the products collection (needs a replica set)
     MAX_UPLOAD_SIZE: int = 10485760
     
+    # Columnar ingestion
+    COLUMNAR_INGESTION_ENABLED: bool = True  # Load source CSVs through Parquet copies (needs pyarrow)
+    PARQUET_DIR: Optional[str] = None  # Where Parquet copies are kept, None = a "parquet" folder next to the CSVs
+    INGEST_BATCH_SIZE: int = 5000  # Documents per insert_many when ingesting
+    INGEST_MAX_IN_FLIGHT: int = 4  # Concurrent insert_many batches per collection
+    INGEST_MAX_RETRIES: int = 3  # Retries for a failed insert batch
+    DELTA_SYNC_ENABLED: bool = True  # Apply only changed rows when a collection is already loaded
+    DELTA_SYNC_PRUNE: bool = False  # Delete synced documents whose rows were removed from a rewritten file
+    
     # Cache settings
-    CACHE_TTL: int = 3600
+    CACHE_TTL: int = 3600  # Also the lifetime of cached per-user financial context
+    FINANCIAL_CONTEXT_CACHE_SIZE: int = 10000  # Users kept in the financial context cache
+    FINANCIAL_CONTEXT_CHANGE_STREAM_ENABLED: bool = False  # Invalidate from change streams (needs a replica set)
     CONVERSATION_HISTORY_TTL: int = 86400
     
+    # Transaction rollups
+    TRANSACTION_ROLLUPS_ENABLED: bool = True  # Serve transaction summaries from the transaction_rollups collection
+    TRANSACTION_ROLLUP_BATCH_SIZE: int = 1000  # Transactions per bulk write when rebuilding rollups
+    # Build meta-prompt transaction insights from rollups. They cover whole calendar months rather than
+    # the last 30 days and report unusual activity per category, so prompts differ from the raw path
+    META_PROMPT_ROLLUPS_ENABLED: bool = False
+    
+    # Batch meta-prompt generation
+    META_PROMPT_BATCH_SIZE: int = 500  # Users prefetched and upserted together
+    META_PROMPT_WORKERS: int = 4  # Rendering processes, 0 = render in a thread
+    META_PROMPT_REFRESH_INTERVAL: int = 0  # Seconds between background refreshes of changed users, 0 = disabled
+    
     # Rate limiting
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_PERIOD: int = 3600
@@ -121,6 +156,68 @@ class Settings(BaseSettings):
     
     # Vector store settings
     VECTOR_STORE_PATH: str = "data/vector_store"
+    VECTOR_INDEX_TYPE: str = "ivf"  # "exact", "ivf" or "hnsw"
+    VECTOR_INDEX_EXACT_THRESHOLD: int = 10000  # Corpora smaller than this use exact search
+    VECTOR_IVF_NLIST: int = 0  # Number of IVF lists, 0 = sqrt(corpus size)
+    VECTOR_IVF_NPROBE: int = 8  # Lists scanned per query; higher = better recall, slower
+    VECTOR_HNSW_M: int = 16
+    VECTOR_HNSW_EF_CONSTRUCTION: int = 200
+    VECTOR_HNSW_EF_SEARCH: int = 64  # Higher = better recall, slower
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "data/embedding_cache.sqlite3"
+    EMBEDDING_CACHE_MEMORY_SIZE: int = 10000  # Vectors kept in the in-process LRU
+    
+    # Bulk embedding ingestion
+    EMBEDDING_API_BASE: str = "https://api.openai.com/v1"
+    EMBEDDING_REQUEST_TIMEOUT: float = 60.0
+    EMBEDDING_BATCH_MAX_TOKENS: int = 100000
+    EMBEDDING_BATCH_MAX_TEXTS: int = 512
+    EMBEDDING_MAX_TOKENS_PER_TEXT: int = 8191
+    EMBEDDING_MAX_IN_FLIGHT: int = 4
+    EMBEDDING_MAX_RETRIES: int = 5
+    EMBEDDING_TOKENS_PER_MINUTE: int = 0  # 0 = no client-side rate limit
+    
+    # Embedding provider for the vector store
+    EMBEDDING_PROVIDER: str = "openai"  # "openai" or "local" (sentence-transformers, shared with the chatbot)
+    EMBEDDING_BATCH_SIZE: int = 32  # Texts per forward pass for the local model
+    EMBEDDING_THREAD_POOL_SIZE: int = 2  # Threads running blocking embedding calls
+    VECTOR_STORE_DTYPE: str = "float32"  # "float32", "float16" or "int8"
+    
+    # Long-term conversation memory
+    SEMANTIC_MEMORY_ENABLED: bool = True  # Retrieve past interactions by relevance instead of recency
+    MEMORY_TOP_K: int = 5  # Past interactions added to the context
+    MEMORY_RECENCY_HALF_LIFE_DAYS: float = 30.0  # Age at which an interaction's relevance is halved, 0 = no decay
+    MEMORY_MIN_SIMILARITY: float = 0.2  # Interactions less similar than this are never returned
+    MEMORY_MAX_INTERACTIONS: int = 1000  # Newest interactions indexed per user
+    MEMORY_INDEX_CACHE_USERS: int = 1000  # Users whose index is kept in memory
+    MEMORY_EMBEDDING_PROVIDER: str = "local"  # Provider that embeds interactions, kept local so chat turns make no embedding API calls
+    INTERACTION_EMBEDDING_DTYPE: str = "float16"  # Storage type of interaction embeddings, "float16" or "float32"
+    
+    # Shared model loading
+    IMAGE_MODEL: str = "clip-ViT-B-32"
+    WARMUP_MODELS: str = ""  # Comma-separated models to pre-load, empty = EMBEDDING_MODEL and IMAGE_MODEL
+    WARMUP_MODELS_ON_STARTUP: bool = False  # Load them at startup instead of on first use
+    MODEL_LOAD_RETRY_SECONDS: float = 60.0  # Wait before retrying a model that failed to load
+    ADMIN_TOKEN: Optional[str] = None  # X-Admin-Token for /api/admin endpoints, unset = disabled
+    
+    # Micro-batched local inference (embedding and image models)
+    INFERENCE_BATCHING_ENABLED: bool = True
+    INFERENCE_MAX_BATCH_SIZE: int = 32  # Items per forward pass
+    INFERENCE_MAX_WAIT_MS: float = 5.0  # How long a batch waits to fill before it runs
+    
+    # Outbound HTTP client (shared, connection-pooled)
+    HTTP2_ENABLED: bool = True  # Falls back to HTTP/1.1 if h2 is not installed
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0  # Seconds an idle connection stays open
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 30.0
+    OPENAI_CONNECT_TIMEOUT: Optional[float] = None  # Per-provider overrides of the HTTP_* timeouts
+    OPENAI_READ_TIMEOUT: Optional[float] = None
+    MISTRAL_CONNECT_TIMEOUT: Optional[float] = None
+    MISTRAL_READ_TIMEOUT: Optional[float] = None
+    GOOGLE_CONNECT_TIMEOUT: Optional[float] = None
+    GOOGLE_READ_TIMEOUT: Optional[float] = None
     
     # LLM settings
     LLM_PROVIDER: str = "openai"
@@ -128,6 +225,24 @@ class Settings(BaseSettings):
     LLM_TEMPERATURE: float = 0.7
     LLM_MAX_TOKENS: int = 1000
     
+    # Conversation context
+    CONTEXT_TOKEN_BUDGET: int = 3000  # Tokens of conversation history sent with each request
+    CONTEXT_PAGE_SIZE: int = 20  # Messages fetched per query while filling the budget
+    CONTEXT_SUMMARY_INTERVAL: int = 6  # Messages outside the window before they are folded into the summary
+    CONTEXT_SUMMARY_MAX_TOKENS: int = 400  # Length cap for the rolling summary
+    CONTEXT_SUMMARY_BATCH: int = 50  # Most messages folded into the summary per update
+    
+    # LLM provider routing
+    LLM_ROUTER_WINDOW: int = 50  # Calls kept per provider for latency/error statistics
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5  # Consecutive failures that open a provider's circuit
+    LLM_CIRCUIT_ERROR_RATE: float = 0.5  # Windowed error rate that opens a provider's circuit
+    LLM_CIRCUIT_MIN_CALLS: int = 10  # Samples needed before error rate and p95 are trusted
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0  # Time an open circuit waits before a trial call
+    LLM_HEDGE_ENABLED: bool = False  # Send a duplicate request to the next provider when the first is slow
+    LLM_HEDGE_PERCENTILE: float = 95.0
+    LLM_HEDGE_MIN_DELAY: float = 1.0  # Never hedge sooner than this many seconds
+    LLM_HEDGE_DEFAULT_DELAY: float = 5.0  # Hedge delay until enough latency samples exist
+    
     # Fallback mode (used when API key is not valid)
     FALLBACK_MODE: bool = False
     
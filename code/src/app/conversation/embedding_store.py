@@ -0,0 +1,133 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from bson import Binary, ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Collection holding interaction embeddings, referenced by id from the interactions
+EMBEDDING_COLLECTION = "interaction_embeddings"
+
+STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16}
+
+# Fields never sent back when interactions are read; both are from before
+# embeddings were kept in EMBEDDING_COLLECTION
+INTERACTION_PROJECTION = {"embedding": 0, "metadata.image_embedding": 0}
+
+class EmbeddingStore:
+    """
+    Binary store for the text and image embeddings of interactions.
+
+    Each vector is one small document holding the raw array bytes
+    (float16 by default, 1 KB for a 512-dimensional image embedding rather
+    than a list of 512 BSON doubles). Interactions keep only the id, so
+    reading conversations no longer carries the vectors along.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, dtype: Optional[str] = None):
+        self.collection = db[EMBEDDING_COLLECTION]
+        self.dtype = (dtype or settings.INTERACTION_EMBEDDING_DTYPE).lower()
+        if self.dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype: {self.dtype}")
+
+    def _document(self, vector: np.ndarray, user_id: str, kind: str, model: Optional[str]) -> Dict[str, Any]:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        return {
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "kind": kind,
+            "model": model,
+            "dtype": self.dtype,
+            "dimension": len(vector),
+            "vector": Binary(vector.astype(STORAGE_DTYPES[self.dtype]).tobytes()),
+            "created_at": datetime.utcnow()
+        }
+
+    async def put(self, vector: np.ndarray, user_id: str, kind: str, model: Optional[str] = None) -> ObjectId:
+        """
+        Store one embedding.
+
+        Args:
+            vector: The embedding
+            user_id: Owner of the interaction
+            kind: "text" or "image"
+            model: Model the embedding came from
+
+        Returns:
+            Id to reference the embedding by
+        """
+        doc = self._document(vector, user_id, kind, model)
+        await self.collection.insert_one(doc)
+        return doc["_id"]
+
+    async def put_many(self, vectors: List[np.ndarray], user_id: str, kind: str,
+                       model: Optional[str] = None) -> List[ObjectId]:
+        """Store several embeddings in one round trip."""
+        docs = [self._document(vector, user_id, kind, model) for vector in vectors]
+        if docs:
+            await self.collection.insert_many(docs, ordered=False)
+        return [doc["_id"] for doc in docs]
+
+    async def get(self, embedding_id: ObjectId) -> Optional[np.ndarray]:
+        """Load one embedding as float32, or None if it doesn't exist."""
+        doc = await self.collection.find_one({"_id": embedding_id}, {"vector": 1, "dtype": 1})
+        return decode(doc) if doc else None
+
+    async def get_many(self, embedding_ids: List[ObjectId]) -> Dict[ObjectId, np.ndarray]:
+        """Load several embeddings by id; missing ones are left out."""
+        if not embedding_ids:
+            return {}
+        docs = await self.collection.find(
+            {"_id": {"$in": embedding_ids}}, {"vector": 1, "dtype": 1}
+        ).to_list(length=len(embedding_ids))
+        return {doc["_id"]: decode(doc) for doc in docs}
+
+    async def delete_many(self, embedding_ids: List[ObjectId]) -> int:
+        """Delete embeddings by id."""
+        if not embedding_ids:
+            return 0
+        result = await self.collection.delete_many({"_id": {"$in": embedding_ids}})
+        return result.deleted_count
+
+def decode(doc: Dict[str, Any]) -> np.ndarray:
+    """Stored embedding document to a float32 vector."""
+    dtype = STORAGE_DTYPES[doc.get("dtype", "float32")]
+    return np.frombuffer(doc["vector"], dtype=dtype).astype(np.float32)
+
+async def migrate_inline_image_embeddings(db: AsyncIOMotorDatabase, batch_size: int = 500) -> int:
+    """
+    Move image embeddings stored inline on interactions into the embedding store.
+
+    Args:
+        db: Database holding the interactions
+        batch_size: Interactions migrated per round trip
+
+    Returns:
+        Number of interactions migrated
+    """
+    store = EmbeddingStore(db)
+    query = {"metadata.image_embedding": {"$type": "array"}}
+    migrated = 0
+    while True:
+        docs = await db.conversations.find(
+            query, {"user_id": 1, "metadata.image_embedding": 1}
+        ).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            break
+        for doc in docs:
+            embedding_id = await store.put(doc["metadata"]["image_embedding"], doc.get("user_id"), "image")
+            await db.conversations.update_one(
+                {"_id": doc["_id"]},
+                {"$set": {"metadata.image_embedding_id": embedding_id}, "$unset": {"metadata.image_embedding": ""}}
+            )
+        migrated += len(docs)
+    if migrated:
+        logger.info(f"Moved {migrated} inline image embeddings to {EMBEDDING_COLLECTION}")
+    return migrated
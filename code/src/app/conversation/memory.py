@@ -1,32 +1,67 @@
 from typing import List, Dict, Any, Optional
 import json
+import logging
+import numpy as np
 from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.config import settings
+from app.conversation.embedding_store import INTERACTION_PROJECTION, EmbeddingStore
+from app.conversation.semantic_memory import SemanticMemoryStore, get_semantic_memory, interaction_text
+
+logger = logging.getLogger(__name__)
 
 class ConversationMemory:
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncIOMotorDatabase, semantic_memory: Optional[SemanticMemoryStore] = None):
         """Initialize with database connection."""
         self.db = db
+        self.embeddings = EmbeddingStore(db)
+        self.semantic_memory = semantic_memory
+        if self.semantic_memory is None and settings.SEMANTIC_MEMORY_ENABLED:
+            self.semantic_memory = get_semantic_memory(db)
         
     async def store_interaction(
         self,
         user_id: str,
         message: str,
         response: str,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        image_embedding: Optional[np.ndarray] = None
     ) -> None:
-        """Store a conversation interaction in MongoDB."""
+        """
+        Store a conversation interaction in MongoDB.
+        
+        Embeddings go to the embedding store; the interaction only keeps
+        their ids (embedding_id and metadata.image_embedding_id).
+        """
         interaction = {
             "user_id": user_id,
             "message": message,
             "response": response,
             "timestamp": datetime.utcnow(),
-            "metadata": metadata or {}
+            "metadata": dict(metadata or {})
         }
         
+        if image_embedding is not None:
+            interaction["metadata"]["image_embedding_id"] = await self.embeddings.put(image_embedding, user_id, "image")
+        
+        # Embed the exchange so it can be recalled by relevance later
+        vector = None
+        if self.semantic_memory is not None:
+            try:
+                vector = await self.semantic_memory.embed(interaction_text(message, response))
+                model_name = self.semantic_memory.provider.model_name
+                interaction["embedding_id"] = await self.embeddings.put(vector, user_id, "text", model_name)
+                interaction["embedding_model"] = model_name
+            except Exception as e:
+                # Stored without a vector; it is embedded when the user's index is next built
+                logger.warning(f"Failed to embed interaction for user {user_id}: {str(e)}")
+        
         # Store in MongoDB for long-term storage
-        await self.db.conversations.insert_one(interaction)
+        result = await self.db.conversations.insert_one(interaction)
+        
+        # Add it to the user's loaded index in place, no rebuild needed
+        if vector is not None:
+            await self.semantic_memory.add(user_id, result.inserted_id, vector, interaction["timestamp"])
         
     async def get_recent_interactions(
         self,
@@ -35,7 +70,7 @@ class ConversationMemory:
     ) -> List[Dict[str, Any]]:
         """Retrieve recent interactions from MongoDB."""
         interactions = await self.db.conversations.find(
-            {"user_id": user_id}
+            {"user_id": user_id}, INTERACTION_PROJECTION
         ).sort("timestamp", -1).limit(limit).to_list(length=limit)
         
         return interactions
@@ -43,16 +78,36 @@ class ConversationMemory:
     async def get_user_context(
         self,
         user_id: str,
-        time_window: timedelta = timedelta(days=30)
+        query: Optional[str] = None,
+        time_window: timedelta = timedelta(days=30),
+        limit: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Get user context including preferences, sentiment trends, and financial behavior."""
-        cutoff_date = datetime.utcnow() - time_window
+        """
+        Get user context: the past interactions most relevant to the current
+        message (the most recent ones if there is no message or semantic
+        memory is disabled) and the user's preferences.
         
-        # Get recent interactions
-        interactions = await self.db.conversations.find({
-            "user_id": user_id,
-            "timestamp": {"$gte": cutoff_date}
-        }).sort("timestamp", -1).limit(50).to_list(length=None)
+        Args:
+            user_id: User ID
+            query: The current message
+            time_window: How far back recent interactions are taken from, without a query
+            limit: Number of interactions (defaults to settings.MEMORY_TOP_K)
+        """
+        limit = limit or settings.MEMORY_TOP_K
+        
+        interactions = None
+        if query and self.semantic_memory is not None:
+            try:
+                interactions = await self.semantic_memory.search(user_id, query, limit)
+            except Exception as e:
+                logger.error(f"Semantic memory search failed for user {user_id}: {str(e)}")
+        
+        if interactions is None:
+            cutoff_date = datetime.utcnow() - time_window
+            interactions = await self.db.conversations.find({
+                "user_id": user_id,
+                "timestamp": {"$gte": cutoff_date}
+            }, INTERACTION_PROJECTION).sort("timestamp", -1).limit(limit).to_list(length=limit)
         
         # Get user preferences
         preferences = await self.db.user_preferences.find_one({"user_id": user_id})
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import math
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.conversation.embedding_store import INTERACTION_PROJECTION, EmbeddingStore
+from app.utils.embedding_providers import EmbeddingProvider, get_embedding_provider
+from app.utils.tokens import truncate_to_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Longest text embedded per interaction
+MEMORY_TEXT_MAX_TOKENS = 512
+
+def interaction_text(message: str, response: str) -> str:
+    """The text an interaction is embedded from."""
+    return truncate_to_tokens(f"User: {message}\nAssistant: {response}", MEMORY_TEXT_MAX_TOKENS)
+
+def recency_weight(timestamp: datetime, now: datetime, half_life_days: float) -> float:
+    """Weight halving every half_life_days of age."""
+    if half_life_days <= 0:
+        return 1.0
+    age_days = max((now - timestamp).total_seconds(), 0.0) / 86400
+    return math.pow(0.5, age_days / half_life_days)
+
+class UserMemoryIndex:
+    """
+    One user's interaction embeddings, as a growable matrix of unit rows.
+
+    Rows are appended in place (the buffer doubles when full), so a new
+    interaction never triggers a rebuild. Only the newest `capacity` rows
+    are kept, and an interaction already in the index is not added again.
+    """
+
+    def __init__(self, dimension: int, capacity: int):
+        self.capacity = capacity
+        self._vectors = np.zeros((16, dimension), dtype=np.float32)
+        self._ids: List[Any] = []
+        self._id_set: Set[Any] = set()
+        self._timestamps: List[datetime] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, interaction_id: Any, vector: np.ndarray, timestamp: datetime) -> None:
+        if interaction_id in self._id_set:
+            return
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+
+        if len(self._ids) >= self.capacity:
+            # Drop the oldest row
+            self._vectors[:len(self._ids) - 1] = self._vectors[1:len(self._ids)]
+            self._id_set.discard(self._ids.pop(0))
+            self._timestamps.pop(0)
+        elif len(self._ids) == len(self._vectors):
+            grown = np.zeros((min(len(self._vectors) * 2, self.capacity), self._vectors.shape[1]), dtype=np.float32)
+            grown[:len(self._ids)] = self._vectors[:len(self._ids)]
+            self._vectors = grown
+
+        self._vectors[len(self._ids)] = vector
+        self._ids.append(interaction_id)
+        self._id_set.add(interaction_id)
+        self._timestamps.append(timestamp)
+
+    def search(self, query: np.ndarray, k: int, half_life_days: float, min_similarity: float,
+               now: Optional[datetime] = None) -> List[Tuple[Any, float]]:
+        """
+        Top-k interactions by cosine similarity weighted by recency.
+
+        Returns:
+            List of (interaction_id, score), best first
+        """
+        if not self._ids:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        similarities = self._vectors[:len(self._ids)] @ query
+        now = now or datetime.utcnow()
+        weights = np.array([recency_weight(ts, now, half_life_days) for ts in self._timestamps], dtype=np.float32)
+        scores = np.where(similarities >= min_similarity, similarities * weights, -np.inf)
+
+        k = min(k, len(self._ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[i], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+class SemanticMemoryStore:
+    """
+    Embedding-indexed long-term memory over past interactions.
+
+    Each interaction's embedding is kept in the EmbeddingStore and
+    referenced by the interaction's embedding_id. A user's index
+    is built from those the first time the user is searched, kept in an LRU
+    of recently active users, and extended in place as new interactions
+    are stored. Interactions saved without an embedding are embedded when
+    the index is built. Embeddings come from settings.MEMORY_EMBEDDING_PROVIDER,
+    the local model by default, since every chat turn embeds twice.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, provider: Optional[EmbeddingProvider] = None,
+                 vectors: Optional[EmbeddingStore] = None):
+        self.db = db
+        self.collection = db.conversations
+        self.provider = provider or get_embedding_provider(settings.MEMORY_EMBEDDING_PROVIDER)
+        self.vectors = vectors or EmbeddingStore(db)
+        self._indexes: "OrderedDict[str, UserMemoryIndex]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed one interaction text."""
+        vectors = await self.provider.aembed([text])
+        return np.asarray(vectors[0], dtype=np.float32)
+
+    async def add(self, user_id: str, interaction_id: Any, vector: np.ndarray, timestamp: datetime) -> None:
+        """
+        Add a stored interaction to the user's index, if it is loaded.
+
+        Waits for a build of the user's index in progress: the build may
+        have read the interactions before this one was inserted, and the
+        index only becomes visible once it is built. One the build did read
+        is skipped by the index.
+        """
+        lock = self._locks.get(user_id)
+        if lock is None:
+            # Neither loaded nor being built
+            return
+        async with lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                index.add(interaction_id, vector, timestamp)
+
+    async def search(self, user_id: str, query: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Past interactions most relevant to a message.
+
+        Args:
+            user_id: User ID
+            query: The current message
+            k: Number of interactions (defaults to settings.MEMORY_TOP_K)
+
+        Returns:
+            Interaction documents (without embeddings), most relevant first
+        """
+        k = k or settings.MEMORY_TOP_K
+        index = await self._get_index(user_id)
+        if not len(index):
+            return []
+
+        query_vector = await self.embed(query)
+        ranked = index.search(
+            query_vector, k, settings.MEMORY_RECENCY_HALF_LIFE_DAYS, settings.MEMORY_MIN_SIMILARITY
+        )
+        if not ranked:
+            return []
+
+        ids = [interaction_id for interaction_id, _ in ranked]
+        docs = await self.collection.find({"_id": {"$in": ids}}, INTERACTION_PROJECTION).to_list(length=len(ids))
+        by_id = {doc["_id"]: doc for doc in docs}
+        results = []
+        for interaction_id, score in ranked:
+            doc = by_id.get(interaction_id)
+            if doc is not None:
+                doc["relevance"] = round(score, 4)
+                results.append(doc)
+        return results
+
+    async def _get_index(self, user_id: str) -> UserMemoryIndex:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            self._indexes.move_to_end(user_id)
+            return index
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                index = await self._build_index(user_id)
+                self._indexes[user_id] = index
+                while len(self._indexes) > settings.MEMORY_INDEX_CACHE_USERS:
+                    evicted, _ = self._indexes.popitem(last=False)
+                    self._locks.pop(evicted, None)
+        return index
+
+    async def _build_index(self, user_id: str) -> UserMemoryIndex:
+        """Load a user's newest interactions, embedding any stored without a vector."""
+        capacity = settings.MEMORY_MAX_INTERACTIONS
+        docs = await self.collection.find(
+            {"user_id": user_id, "message": {"$exists": True}},
+            {"message": 1, "response": 1, "timestamp": 1, "embedding_id": 1, "embedding_model": 1}
+        ).sort("timestamp", -1).limit(capacity).to_list(length=capacity)
+        docs.reverse()
+
+        # Vectors from another embedding model aren't comparable, so those are redone too
+        model_name = self.provider.model_name
+        current = [doc["embedding_id"] for doc in docs
+                   if doc.get("embedding_id") and doc.get("embedding_model") == model_name]
+        vectors = await self.vectors.get_many(current)
+        missing = [doc for doc in docs if doc.get("embedding_id") not in vectors]
+        if missing:
+            stale = [doc["embedding_id"] for doc in missing if doc.get("embedding_id")]
+            embedded = await self.provider.aembed(
+                [interaction_text(doc.get("message", ""), doc.get("response", "")) for doc in missing]
+            )
+            embedding_ids = await self.vectors.put_many(embedded, user_id, "text", model_name)
+            await self.collection.bulk_write([
+                UpdateOne(
+                    {"_id": doc["_id"]},
+                    {"$set": {"embedding_id": embedding_id, "embedding_model": model_name}, "$unset": {"embedding": ""}}
+                )
+                for doc, embedding_id in zip(missing, embedding_ids)
+            ], ordered=False)
+            for doc, embedding_id, vector in zip(missing, embedding_ids, embedded):
+                vectors[embedding_id] = np.asarray(vector, dtype=np.float32)
+                doc["embedding_id"] = embedding_id
+            await self.vectors.delete_many(stale)
+            logger.info(f"Embedded {len(missing)} stored interactions for user {user_id}")
+
+        dimension = len(next(iter(vectors.values()))) if vectors else (self.provider.dimension or 1)
+        index = UserMemoryIndex(dimension, capacity)
+        for doc in docs:
+            index.add(doc["_id"], vectors[doc["embedding_id"]], doc.get("timestamp") or datetime.utcnow())
+        return index
+
+# Memory store shared by every request in this process
+_semantic_memory: Optional[SemanticMemoryStore] = None
+
+def get_semantic_memory(db: AsyncIOMotorDatabase) -> SemanticMemoryStore:
+    """
+    Get the process-wide semantic memory store (singleton).
+
+    Args:
+        db: Database holding the interactions
+
+    Returns:
+        SemanticMemoryStore instance
+    """
+    global _semantic_memory
+    if _semantic_memory is None or _semantic_memory.db is not db:
+        _semantic_memory = SemanticMemoryStore(db)
+    return _semantic_memory
@@ -1,12 +1,17 @@
-import pandas as pd
 import os
 from pathlib import Path
 import logging
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import BulkWriteError
 
 from app.config import settings
+from app.conversation.embedding_store import migrate_inline_image_embeddings
+from app.database.mongodb import get_database
+from app.repository.chat_repository import ChatRepository
+from app.repository.transaction_rollup_repository import TransactionRollupRepository
+from app.repository.user_data_change_repository import TRACKED_COLLECTIONS, UserDataChangeRepository
+from app.utils.bulk_loader import BulkLoader
+from app.utils.delta_sync import DeltaSync
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,9 +29,8 @@ async def initialize_database(data_dir=None):
     """
     logger.info("Initializing database with sample data...")
     
-    # Connect to MongoDB
-    client = AsyncIOMotorClient(settings.MONGODB_URL)
-    db = client[settings.MONGODB_DB]
+    # Use the shared MongoDB client
+    db = await get_database()
     
     # Get existing collections
     collections = await db.list_collection_names()
@@ -52,7 +56,13 @@ async def initialize_database(data_dir=None):
     logger.info(f"Using data directory: {data_dir}")
     total_imported = 0
     
-    # Import each CSV file
+    rollups = TransactionRollupRepository(db)
+    data_changes = UserDataChangeRepository(db)
+    await data_changes.create_indexes()
+    delta_sync = DeltaSync(db)
+    
+    # Work out which collections still need loading
+    datasets = {}
     for collection_name, filename in data_files.items():
         file_path = data_dir / filename
         
@@ -63,32 +73,61 @@ async def initialize_database(data_dir=None):
         # Check if collection already has data
         existing_count = await db[collection_name].count_documents({})
         if existing_count > 0:
-            logger.info(f"Collection {collection_name} already has {existing_count} documents. Skipping import.")
             total_imported += existing_count
+            if not settings.DELTA_SYNC_ENABLED:
+                logger.info(f"Collection {collection_name} already has {existing_count} documents. Skipping import.")
+                continue
+            
+            # Apply only the rows that were added or changed since the last sync
+            try:
+                if collection_name == 'transaction_data':
+                    sync_stats = await delta_sync.sync(collection_name, file_path, on_insert=rollups.apply,
+                                                       on_change=rollups.rebuild)
+                elif collection_name in TRACKED_COLLECTIONS:
+                    sync_stats = await delta_sync.sync(collection_name, file_path, on_insert=data_changes.apply,
+                                                       on_change=data_changes.touch)
+                else:
+                    sync_stats = await delta_sync.sync(collection_name, file_path)
+                total_imported += sync_stats["inserted"] - sync_stats["deleted"]
+            except Exception as e:
+                logger.error(f"Error syncing {filename} into {collection_name}: {str(e)}")
             continue
         
-        try:
-            # Read CSV file
-            df = pd.read_csv(file_path)
-            records = df.to_dict('records')
-            
-            if records:
-                # Insert into collection
-                result = await db[collection_name].insert_many(records)
-                logger.info(f"Imported {len(result.inserted_ids)} records into {collection_name}")
-                total_imported += len(result.inserted_ids)
-                
-                # Create indexes for collections
-                if collection_name in ['demographic_data', 'account_data', 'credit_history']:
-                    await db[collection_name].create_index("user_id")
-                elif collection_name in ['investment_data', 'transaction_data', 'social_media_sentiment']:
-                    await db[collection_name].create_index("user_id")
-                elif collection_name == 'products':
-                    await db[collection_name].create_index("product_id")
-                    
-        except Exception as e:
-            logger.error(f"Error importing {filename} to {collection_name}: {str(e)}")
+        datasets[collection_name] = file_path
+    
+    # Stream the CSV files into their collections concurrently; indexes are built after each load
+    indexes = {name: ["user_id"] for name in datasets if name != 'products'}
+    indexes['products'] = ["product_id"]
+    # Keep the monthly transaction rollups in step with the raw rows, and record other per-user changes
+    on_batch = {name: data_changes.apply for name in TRACKED_COLLECTIONS}
+    on_batch['transaction_data'] = rollups.apply
     
+    load_stats = await BulkLoader(db).load_all(datasets, indexes=indexes, on_batch=on_batch)
+    for collection_name, stats in load_stats.items():
+        total_imported += stats.rows
+        if settings.DELTA_SYNC_ENABLED and stats.failed_rows == 0:
+            # Later runs only need to look at what changes after this load
+            await delta_sync.mark_synced(collection_name, datasets[collection_name])
+
+    # Backfill the rollups once if they are missing or were built with an older layout
+    if settings.TRANSACTION_ROLLUPS_ENABLED and await rollups.needs_rebuild():
+        logger.info("Transaction rollups are missing or outdated. Rebuilding them.")
+        await rollups.rebuild()
+
+    # Store message counts on conversations created before they were maintained
+    try:
+        backfilled = await ChatRepository(db).backfill_message_stats()
+        if backfilled:
+            logger.info(f"Backfilled message counts for {backfilled} conversations")
+    except Exception as e:
+        logger.error(f"Error backfilling conversation message counts: {str(e)}")
+
+    # Move image embeddings out of interactions stored before the embedding store existed
+    try:
+        await migrate_inline_image_embeddings(db)
+    except Exception as e:
+        logger.error(f"Error migrating inline image embeddings: {str(e)}")
+
     # Check if there are user records
     users_count = await db.users.count_documents({})
     if users_count == 0:
@@ -115,24 +154,11 @@ async def initialize_database(data_dir=None):
     
     logger.info(f"Generating meta-prompts for {len(user_ids)} users")
     
-    # Import the MetaPromptGenerator class
-    from app.models.meta_prompt_generator import MetaPromptGenerator
-    
-    # Create an instance of MetaPromptGenerator
-    meta_prompt_generator = MetaPromptGenerator(db)
+    # Import the MetaPromptBatchJob class
+    from app.services.meta_prompt_job import MetaPromptBatchJob
     
-    # Generate meta-prompts for each user
-    for user_id in user_ids:
-        meta_prompt = await meta_prompt_generator.generate_meta_prompt(user_id)
-        
-        # Store meta-prompt in the database
-        await db.meta_prompts.update_one(
-            {"user_id": user_id},
-            {"$set": {"user_id": user_id, "prompt_text": meta_prompt, "updated_at": pd.Timestamp.now()}},
-            upsert=True
-        )
-        
-        logger.info(f"Generated meta-prompt for user {user_id}")
+    # Prefetch, render and upsert the meta-prompts in chunks
+    await MetaPromptBatchJob(db).run(user_ids)
     
     logger.info(f"Database initialization complete. Total records imported: {total_imported}")
     
@@ -148,9 +174,8 @@ async def add_synthetic_data():
     """
     Add synthetic financial goal data to demographic records to enhance personalization.
     """
-    # Connect to MongoDB
-    client = AsyncIOMotorClient(settings.MONGODB_URL)
-    db = client[settings.MONGODB_DB]
+    # Use the shared MongoDB client
+    db = await get_database()
     
     # Check if demographic_data collection exists
     if "demographic_data" not in await db.list_collection_names():
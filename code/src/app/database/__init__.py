@@ -1,58 +1,34 @@
 # Database package
 
 import logging
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from pymongo.errors import ConnectionFailure
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import Optional
 
-from app.config import settings
+from app.database import mongodb
+from app.database.mongodb import connect_to_mongo as _connect_to_mongo, close_mongo_connection, get_mongo_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global MongoDB client
-client: Optional[AsyncIOMotorClient] = None
-database: Optional[AsyncIOMotorDatabase] = None
-
-async def connect_to_mongo():
-    """Connect to MongoDB."""
-    global client, database
+async def connect_to_mongo() -> Optional[AsyncIOMotorDatabase]:
+    """Connect to MongoDB through the shared client in app.database.mongodb."""
     try:
-        # Use the connection string from settings instead of just the URL
-        connection_string = settings.MONGODB_CONNECTION_STRING
-        logger.info(f"Connecting to MongoDB using connection string (without credentials): {connection_string.split('@')[-1]}")
-        
-        client = AsyncIOMotorClient(connection_string)
-        # Use the correct database name from settings
-        database = client[settings.MONGODB_DB]
-        
-        # Verify connection
-        await database.command("ping")
-        logger.info(f"Connected to MongoDB database: {settings.MONGODB_DB}")
-        
-        return database
-        
-    except ConnectionFailure as e:
+        await _connect_to_mongo()
+        return mongodb._mongo_db
+    except Exception as e:
         logger.error(f"Failed to connect to MongoDB: {str(e)}")
         # Don't raise the exception, to allow app to function without DB
         logger.warning("Application will run with limited functionality (no personalized financial data)")
-        database = None
         return None
-    
-    return database
-
-async def close_mongo_connection():
-    """Close MongoDB connection."""
-    global client
-    if client:
-        client.close()
-        logger.info("Closed MongoDB connection")
 
 def get_database() -> Optional[AsyncIOMotorDatabase]:
-    """Get the database instance."""
-    if database is None:
-        logger.warning("Database not initialized. Financial data will not be available.")
-    return database
+    """Get the database instance, backed by the shared client and connection pool."""
+    try:
+        get_mongo_client()
+    except Exception as e:
+        logger.warning(f"Database not initialized. Financial data will not be available: {str(e)}")
+        return None
+    return mongodb._mongo_db
 
-__all__ = ["connect_to_mongo", "close_mongo_connection", "get_database"] 
\ No newline at end of file
+__all__ = ["connect_to_mongo", "close_mongo_connection", "get_database"]
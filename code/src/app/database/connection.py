@@ -1,25 +1,23 @@
-from motor.motor_asyncio import AsyncIOMotorClient
 from app.config import settings
+from app.database.mongodb import get_database as get_shared_database, close_mongo_connection
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# MongoDB client
-mongo_client = None
+# Database handle on the shared client
 db = None
 
 async def connect_to_mongo():
     """Connect to MongoDB and initialize the database client."""
-    global mongo_client, db
+    global db
     
     try:
-        mongo_client = AsyncIOMotorClient(settings.MONGODB_URI)
-        db = mongo_client[settings.DATABASE_NAME]
+        db = await get_shared_database()
         
         # Print MongoDB connection info for verification
-        server_info = await mongo_client.server_info()
+        server_info = await db.client.server_info()
         logger.info(f"Connected to MongoDB version {server_info.get('version')}")
         
         # Create collections if they don't exist
@@ -49,14 +47,9 @@ async def connect_to_mongo():
         else:
             raise
 
-async def close_mongo_connection():
-    """Close the MongoDB connection."""
-    global mongo_client
-    if mongo_client:
-        mongo_client.close()
-        logger.info("MongoDB connection closed")
-
 # Database access functions
 async def get_database():
     """Get the database instance for dependency injection."""
+    if db is None:
+        return await get_shared_database()
     return db 
\ No newline at end of file
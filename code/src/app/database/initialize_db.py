@@ -1,19 +1,20 @@
 import logging
 import asyncio
 import os
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorDatabase
 import pandas as pd
 from datetime import datetime, date
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 
-from app.config import settings
 from app.utils.data_loader import DataLoader
 from app.database import connect_to_mongo, get_database, close_mongo_connection
+from app.database.mongodb import get_database as get_shared_database
 from app.repository.user_repository import UserRepository
 from app.repository.chat_repository import ChatRepository
 from app.repository.document_repository import DocumentRepository
 from app.repository.financial_repository import FinancialRepository
+from app.conversation.embedding_store import migrate_inline_image_embeddings
 
 # Configure logging
 logging.basicConfig(
@@ -30,15 +31,12 @@ async def connect_to_mongodb() -> AsyncIOMotorDatabase:
         AsyncIOMotorDatabase: The MongoDB database instance
     """
     try:
-        # Create a MongoDB client
-        client = AsyncIOMotorClient(settings.MONGODB_URL)
-        
-        # Access the database
-        db = client[settings.MONGODB_DB_NAME]
+        # Use the shared client and its connection pool
+        db = await get_shared_database()
         
         # Verify connection
         await db.command("ping")
-        logger.info(f"Connected to MongoDB: {settings.MONGODB_URL}, database: {settings.MONGODB_DB_NAME}")
+        logger.info(f"Connected to MongoDB database: {db.name}")
         
         return db
     
@@ -237,6 +235,14 @@ async def initialize_database():
         # Create indexes
         await create_indexes(db)
         
+        # Store message counts on conversations created before they were maintained
+        backfilled = await ChatRepository(db).backfill_message_stats()
+        if backfilled:
+            logger.info(f"Backfilled message counts for {backfilled} conversations")
+        
+        # Move image embeddings out of interactions stored before the embedding store existed
+        await migrate_inline_image_embeddings(db)
+        
         # Load data from CSV files
         loader = DataLoader(db)
         await loader.load_data()
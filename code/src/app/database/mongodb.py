@@ -1,10 +1,14 @@
 import logging
+import importlib.util
+import threading
 import urllib.parse
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
 from pymongo.errors import ConnectionFailure
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 from app.config import settings
 import asyncio
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import json
 
 # Configure logging
@@ -14,8 +18,73 @@ logger = logging.getLogger(__name__)
 # Global database connection
 _mongo_client: Optional[AsyncIOMotorClient] = None
 _mongo_db: Optional[AsyncIOMotorDatabase] = None
+_analytics_db: Optional[AsyncIOMotorDatabase] = None
 mock_db: Dict[str, List[Dict[str, Any]]] = None
 
+# Wire compressors and the module each one needs (zlib ships with Python)
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Counts connection pool events per server, for the health endpoint."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers: Dict[str, Dict[str, int]] = {}
+    
+    def _count(self, event, counter: str):
+        address = "%s:%s" % event.address
+        with self._lock:
+            counters = self._servers.setdefault(address, {
+                "created": 0, "closed": 0, "checked_out": 0, "checked_in": 0,
+                "checkout_failed": 0, "cleared": 0
+            })
+            counters[counter] += 1
+    
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Open, in-use and idle connections plus lifetime counters, per server."""
+        with self._lock:
+            servers = {address: dict(counters) for address, counters in self._servers.items()}
+        for counters in servers.values():
+            counters["open"] = counters["created"] - counters["closed"]
+            counters["in_use"] = counters["checked_out"] - counters["checked_in"]
+            counters["idle"] = counters["open"] - counters["in_use"]
+        return servers
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        self._count(event, "cleared")
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_created(self, event):
+        self._count(event, "created")
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        self._count(event, "closed")
+    
+    def connection_check_out_started(self, event):
+        pass
+    
+    def connection_check_out_failed(self, event):
+        self._count(event, "checkout_failed")
+    
+    def connection_checked_out(self, event):
+        self._count(event, "checked_out")
+    
+    def connection_checked_in(self, event):
+        self._count(event, "checked_in")
+
+pool_metrics = PoolMetrics()
+
 class MockCollection:
     def __init__(self, name: str, data: List[Dict[str, Any]] = None):
         self.name = name
@@ -137,16 +206,25 @@ async def get_database() -> AsyncIOMotorDatabase:
         await connect_to_mongo()
     return _mongo_db
 
-async def connect_to_mongo():
-    """
-    Connect to MongoDB using settings from configuration.
-    Updates the global _mongo_client and _mongo_db variables.
+async def get_analytics_database() -> AsyncIOMotorDatabase:
     """
-    global _mongo_client, _mongo_db
-    
-    if _mongo_client is not None:
-        return
+    Get the database with the analytics read preference (secondary-preferred
+    by default), for summary reads that can tolerate slightly stale data.
     
+    Returns:
+        AsyncIOMotorDatabase: The database, sharing the same client and pool.
+    """
+    global _analytics_db
+    if _analytics_db is None:
+        db = await get_database()
+        read_preference = make_read_preference(
+            read_pref_mode_from_name(settings.MONGODB_ANALYTICS_READ_PREFERENCE), None
+        )
+        _analytics_db = db.with_options(read_preference=read_preference)
+    return _analytics_db
+
+def _connection_target() -> Tuple[str, str]:
+    """Work out the MongoDB URL and database name from settings."""
     # Check if we should use local MongoDB
     if settings.USE_LOCAL_DB:
         logger.info("Using local MongoDB connection")
@@ -156,8 +234,8 @@ async def connect_to_mongo():
     else:
         logger.info("Using remote MongoDB connection")
         # URL encode username and password
-        username = urllib.parse.quote_plus(settings.MONGODB_USER)
-        password = urllib.parse.quote_plus(settings.MONGODB_PASSWORD)
+        username = urllib.parse.quote_plus(settings.MONGODB_USER or "")
+        password = urllib.parse.quote_plus(settings.MONGODB_PASSWORD or "")
         
         # Build connection string with encoded credentials
         mongo_url = settings.MONGODB_URL.replace(
@@ -165,26 +243,102 @@ async def connect_to_mongo():
             f"{username}:{password}"
         )
         db_name = settings.MONGODB_DB
+    return mongo_url, db_name
+
+def available_compressors(names: str) -> List[str]:
+    """
+    Filter a comma-separated compressor list down to those usable here.
     
-    logger.info(f"Connecting to MongoDB at {mongo_url}, database: {db_name}")
+    Args:
+        names: Compressors in order of preference, e.g. "zstd,snappy,zlib"
+        
+    Returns:
+        List of compressors whose module is installed
+    """
+    compressors = []
+    for name in (n.strip() for n in names.split(",")):
+        module = COMPRESSOR_MODULES.get(name)
+        if module and importlib.util.find_spec(module) is not None:
+            compressors.append(name)
+    return compressors
+
+def client_options() -> Dict[str, Any]:
+    """Connection pool and timeout options for the shared client."""
+    options = {
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+        "appname": settings.APP_NAME,
+        "event_listeners": [pool_metrics]
+    }
+    compressors = available_compressors(settings.MONGODB_COMPRESSORS)
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
+
+def get_mongo_client() -> AsyncIOMotorClient:
+    """
+    Get the process-wide MongoDB client (singleton).
     
-    try:
-        _mongo_client = AsyncIOMotorClient(mongo_url)
+    Every part of the application, including the loaders and scripts, goes
+    through this client so they share one connection pool.
+    
+    Returns:
+        AsyncIOMotorClient: The shared client
+    """
+    global _mongo_client, _mongo_db
+    if _mongo_client is None:
+        mongo_url, db_name = _connection_target()
+        logger.info(f"Connecting to MongoDB at {mongo_url.split('@')[-1]}, database: {db_name}")
+        _mongo_client = AsyncIOMotorClient(mongo_url, **client_options())
         _mongo_db = _mongo_client[db_name]
+    return _mongo_client
+
+async def connect_to_mongo():
+    """
+    Connect to MongoDB using settings from configuration.
+    Updates the global _mongo_client and _mongo_db variables.
+    """
+    if _mongo_client is not None:
+        return
+    
+    try:
+        get_mongo_client()
         
         # Validate connection by issuing a simple command
         await _mongo_db.command("ping")
         logger.info("Successfully connected to MongoDB")
     except Exception as e:
         logger.error(f"Failed to connect to MongoDB: {str(e)}")
+        await close_mongo_connection()
         raise
 
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Connection pool configuration and live counters, for the health endpoint.
+    
+    Returns:
+        Dictionary with pool settings and per-server connection counts
+    """
+    return {
+        "connected": _mongo_client is not None,
+        "max_pool_size": settings.MONGODB_MAX_POOL_SIZE,
+        "min_pool_size": settings.MONGODB_MIN_POOL_SIZE,
+        "compressors": available_compressors(settings.MONGODB_COMPRESSORS),
+        "servers": pool_metrics.snapshot()
+    }
+
 async def close_mongo_connection():
     """
     Close the MongoDB connection.
     """
-    global _mongo_client
+    global _mongo_client, _mongo_db, _analytics_db
     if _mongo_client:
         _mongo_client.close()
-        _mongo_client = None
-        logger.info("MongoDB connection closed") 
\ No newline at end of file
+        logger.info("MongoDB connection closed")
+    _mongo_client = None
+    _mongo_db = None
+    _analytics_db = None
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -70,14 +71,21 @@ async def get_conversation_memory():
     db = await get_database()
     return ConversationMemory(db)
 
+# Recommendation engine shared across requests
+_recommendation_engine: Optional[RecommendationEngine] = None
+
 async def get_recommendation_engine():
-    """Dependency to get the recommendation engine."""
-    db = await get_database()
-    return RecommendationEngine(db)
+    """Dependency to get the shared recommendation engine."""
+    global _recommendation_engine
+    if _recommendation_engine is None:
+        db = await get_database()
+        _recommendation_engine = RecommendationEngine(db)
+    return _recommendation_engine
 
 async def get_chatbot(
     memory: ConversationMemory = Depends(get_conversation_memory),
     recommendation_engine: RecommendationEngine = Depends(get_recommendation_engine)
 ):
     """Dependency to get the enhanced chatbot."""
-    return EnhancedChatbot(memory, recommendation_engine) 
\ No newline at end of file
+    # Its models come from the shared registry; built off the event loop in case one still has to load
+    return await asyncio.to_thread(EnhancedChatbot, memory, recommendation_engine) 
\ No newline at end of file
@@ -27,7 +27,15 @@ from app.repository.chat_repository import ChatRepository
 from app.utils.import_csv import import_csv_to_collection, csv_to_dict
 from app.api import auth, chat, document, financial, recommendations
 from app.api import onboard  # Import the new onboarding API module
+from app.api import admin
 from app.data_initializer import initialize_database, add_synthetic_data
+from app.database.mongodb import get_database, get_pool_stats
+from app.models.recommendation_engine import start_recommendation_engine, stop_recommendation_engine
+from app.utils.http_client import get_http_client, close_http_client
+from app.utils.financial_context_cache import start_financial_change_watcher, stop_financial_change_watcher
+from app.services.meta_prompt_job import start_meta_prompt_refresh, stop_meta_prompt_refresh
+from app.utils.model_registry import get_model_registry
+from app.utils.batch_executor import get_batch_executor_stats, stop_batch_executors
 
 # Set up logging
 logging.basicConfig(
@@ -70,11 +78,14 @@ app.include_router(recommendations_router, prefix="/api/recommendations", tags=[
 app.include_router(document.router, prefix="/api/documents", tags=["Documents"])
 app.include_router(financial.router, prefix="/api/financial", tags=["Financial"])
 app.include_router(onboard.router, prefix="/api/onboard", tags=["Onboarding"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 
 # Database connection events
 @app.on_event("startup")
 async def startup_db_client():
     logger.info("Starting up the application...")
+    # Open the pooled HTTP client used for LLM and embedding API calls
+    get_http_client()
     try:
         # Initialize the database with sample data
         await initialize_database()
@@ -86,10 +97,39 @@ async def startup_db_client():
             logger.info("Synthetic data added successfully")
     except Exception as e:
         logger.error(f"Error during startup: {str(e)}")
+    
+    try:
+        # Build the shared recommendation engine and its product index once
+        await start_recommendation_engine(await get_database())
+        logger.info("Recommendation engine started")
+    except Exception as e:
+        logger.error(f"Error starting recommendation engine: {str(e)}")
+    
+    try:
+        # Invalidate cached financial context from change streams, if enabled
+        start_financial_change_watcher(await get_database())
+    except Exception as e:
+        logger.error(f"Error starting financial data change watcher: {str(e)}")
+    
+    try:
+        # Periodically regenerate meta-prompts for users whose data changed, if enabled
+        start_meta_prompt_refresh(await get_database())
+    except Exception as e:
+        logger.error(f"Error starting meta-prompt refresh: {str(e)}")
+    
+    if settings.WARMUP_MODELS_ON_STARTUP:
+        # Load the chatbot's models now rather than on the first request
+        result = await get_model_registry().warm_up()
+        logger.info(f"Models warmed up: loaded {result['loaded']}, failed {list(result['failed'])}")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     logger.info("Shutting down the application...")
+    await stop_recommendation_engine()
+    await stop_financial_change_watcher()
+    await stop_meta_prompt_refresh()
+    await close_http_client()
+    stop_batch_executors()
     await close_mongo_connection()
 
 # Pydantic models for request/response
@@ -161,8 +201,13 @@ async def simple_chat_endpoint(
 
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint."""
-    return {"status": "ok"}
+    """Health check endpoint, including MongoDB connection pool metrics, loaded models and inference batching."""
+    return {
+        "status": "ok",
+        "mongodb": get_pool_stats(),
+        "models": get_model_registry().stats(),
+        "inference": get_batch_executor_stats()
+    }
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -20,6 +20,7 @@ class ChatMessage(BaseModel):
     content: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
     metadata: Dict[str, Any] = Field(default_factory=dict)
+    token_count: Optional[int] = None  # Counted once when stored, for context budgeting
     
     class Config:
         allow_population_by_field_name = True
@@ -44,6 +45,12 @@ class Conversation(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = True
     metadata: Dict[str, Any] = Field(default_factory=dict)
+    # Maintained by ChatRepository on every message write; None on conversations created before they were tracked
+    message_count: Optional[int] = None
+    last_message_preview: Optional[str] = None
+    # Rolling summary of the messages up to summarized_until, maintained by ConversationSummarizer
+    summary: Optional[str] = None
+    summarized_until: Optional[datetime] = None
     
     class Config:
         allow_population_by_field_name = True
@@ -72,6 +79,7 @@ class ConversationSummary(BaseModel):
     created_at: datetime
     updated_at: datetime
     message_count: int = 0
+    last_message_preview: Optional[str] = None
     
     class Config:
         json_encoders = {
@@ -2,13 +2,13 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import Dict, Any, Optional, List
 import pandas as pd
 import logging
-import os
 import json
-from pathlib import Path
 from datetime import datetime, timedelta
 
 from app.config import settings
+from app.repository.transaction_rollup_repository import TransactionRollupRepository, month_key
 from app.utils.data_processor import DataProcessor
+from app.utils.user_datasets import get_user_datasets
 from app.utils.meta_prompt_templates import (
     USER_PROFILE_TEMPLATE,
     FINANCIAL_CONTEXT_TEMPLATE,
@@ -25,6 +25,9 @@ from app.utils.meta_prompt_templates import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Recent transactions listed in the prompt when insights come from rollups
+TRANSACTION_LIST_LIMIT = 5
+
 class MetaPromptGenerator:
     """
     Generates personalized meta-prompts for users based on their data.
@@ -36,81 +39,32 @@ class MetaPromptGenerator:
         """Initialize the meta-prompt generator with database connection"""
         self.db = db
         self.data_processor = DataProcessor()
-        self._load_datasets()
     
-    def _load_datasets(self):
-        """Load the required datasets."""
-        data_dir = Path(settings.DATA_DIR)
-        
-        # Ensure data directory exists
-        if not os.path.exists(data_dir):
-            logger.warning(f"Data directory {data_dir} not found. Creating it.")
-            os.makedirs(data_dir, exist_ok=True)
-        
-        try:
-            # Load demographic data
-            demographic_path = data_dir / "demographic_data.csv"
-            if os.path.exists(demographic_path):
-                self.demographic_df = pd.read_csv(demographic_path)
-                logger.info(f"Loaded demographic data with {len(self.demographic_df)} records")
-            else:
-                logger.warning(f"Demographic data file not found at {demographic_path}")
-                self.demographic_df = pd.DataFrame()
-            
-            # Load account data
-            account_path = data_dir / "account_data.csv"
-            if os.path.exists(account_path):
-                self.account_df = pd.read_csv(account_path)
-                logger.info(f"Loaded account data with {len(self.account_df)} records")
-            else:
-                logger.warning(f"Account data file not found at {account_path}")
-                self.account_df = pd.DataFrame()
-            
-            # Load transaction data
-            transaction_path = data_dir / "transaction_data.csv"
-            if os.path.exists(transaction_path):
-                self.transaction_df = pd.read_csv(transaction_path)
-                logger.info(f"Loaded transaction data with {len(self.transaction_df)} records")
-            else:
-                logger.warning(f"Transaction data file not found at {transaction_path}")
-                self.transaction_df = pd.DataFrame()
-            
-            # Load credit history data
-            credit_path = data_dir / "credit_history.csv"
-            if os.path.exists(credit_path):
-                self.credit_df = pd.read_csv(credit_path)
-                logger.info(f"Loaded credit history data with {len(self.credit_df)} records")
-            else:
-                logger.warning(f"Credit history file not found at {credit_path}")
-                self.credit_df = pd.DataFrame()
-            
-            # Load investment data
-            investment_path = data_dir / "investment_data.csv"
-            if os.path.exists(investment_path):
-                self.investment_df = pd.read_csv(investment_path)
-                logger.info(f"Loaded investment data with {len(self.investment_df)} records")
-            else:
-                logger.warning(f"Investment data file not found at {investment_path}")
-                self.investment_df = pd.DataFrame()
-            
-            # Load social media sentiment data
-            sentiment_path = data_dir / "social_media_sentiment.csv"
-            if os.path.exists(sentiment_path):
-                self.sentiment_df = pd.read_csv(sentiment_path)
-                logger.info(f"Loaded social media sentiment data with {len(self.sentiment_df)} records")
-            else:
-                logger.warning(f"Social media sentiment file not found at {sentiment_path}")
-                self.sentiment_df = pd.DataFrame()
-                
-        except Exception as e:
-            logger.error(f"Error loading datasets: {str(e)}")
-            # Initialize empty dataframes in case of error
-            self.demographic_df = pd.DataFrame()
-            self.account_df = pd.DataFrame()
-            self.transaction_df = pd.DataFrame()
-            self.credit_df = pd.DataFrame()
-            self.investment_df = pd.DataFrame()
-            self.sentiment_df = pd.DataFrame()
+    # The CSV datasets are shared process-wide and only read on first access
+    
+    @property
+    def demographic_df(self) -> pd.DataFrame:
+        return get_user_datasets()["demographic"].frame
+    
+    @property
+    def account_df(self) -> pd.DataFrame:
+        return get_user_datasets()["account"].frame
+    
+    @property
+    def transaction_df(self) -> pd.DataFrame:
+        return get_user_datasets()["transaction"].frame
+    
+    @property
+    def credit_df(self) -> pd.DataFrame:
+        return get_user_datasets()["credit"].frame
+    
+    @property
+    def investment_df(self) -> pd.DataFrame:
+        return get_user_datasets()["investment"].frame
+    
+    @property
+    def sentiment_df(self) -> pd.DataFrame:
+        return get_user_datasets()["sentiment"].frame
     
     async def generate_meta_prompt(self, user_id: str) -> str:
         """
@@ -126,16 +80,36 @@ class MetaPromptGenerator:
         try:
             # Gather all user data
             user_data = await self._gather_user_data(user_id)
+        except Exception as e:
+            logger.error(f"Error gathering data for user {user_id}: {str(e)}")
+            user_data = {}
+        
+        return self.render_meta_prompt(user_id, user_data)
+    
+    @classmethod
+    def render_meta_prompt(cls, user_id: str, user_data: Dict[str, Any]) -> str:
+        """
+        Render a meta-prompt from already gathered user data.
+        
+        Pure and free of I/O, so batch jobs can run it in worker processes.
+        
+        Args:
+            user_id: The unique identifier for the user
+            user_data: Dictionary in the shape returned by _gather_user_data
             
+        Returns:
+            A formatted meta-prompt string
+        """
+        try:
             if not user_data:
                 logger.warning(f"No data found for user {user_id}, generating generic meta-prompt")
-                return self._generate_generic_meta_prompt(user_id)
+                return cls._generate_generic_meta_prompt(user_id)
             
             # Generate the sections of the meta-prompt
-            user_profile = self._generate_user_profile(user_data)
-            financial_context = self._generate_financial_context(user_data)
-            transaction_context = self._generate_transaction_context(user_data)
-            social_media_context = self._generate_social_media_context(user_data)
+            user_profile = cls._generate_user_profile(user_data)
+            financial_context = cls._generate_financial_context(user_data)
+            transaction_context = cls._generate_transaction_context(user_data)
+            social_media_context = cls._generate_social_media_context(user_data)
             
             # Combine into the full meta-prompt
             meta_prompt = FULL_META_PROMPT_TEMPLATE.format(
@@ -155,7 +129,7 @@ class MetaPromptGenerator:
             
         except Exception as e:
             logger.error(f"Error generating meta-prompt for user {user_id}: {str(e)}")
-            return self._generate_generic_meta_prompt(user_id)
+            return cls._generate_generic_meta_prompt(user_id)
     
     async def _gather_user_data(self, user_id: str) -> Dict[str, Any]:
         """
@@ -200,6 +174,15 @@ class MetaPromptGenerator:
             "date": {"$gte": thirty_days_ago}
         }).sort("date", -1)
         
+        if settings.META_PROMPT_ROLLUPS_ENABLED:
+            # Insights come from the monthly rollups; only the listed transactions are read
+            rollups = await TransactionRollupRepository(self.db).get_user_rollups(
+                user_id, start_month=month_key(thirty_days_ago), include_merchants=False
+            )
+            if rollups:
+                user_data['transaction_rollups'] = rollups
+            transaction_cursor = transaction_cursor.limit(TRANSACTION_LIST_LIMIT)
+        
         async for transaction in transaction_cursor:
             transactions.append(transaction)
         
@@ -222,7 +205,8 @@ class MetaPromptGenerator:
         
         return user_data
     
-    def _generate_user_profile(self, user_data: Dict[str, Any]) -> str:
+    @classmethod
+    def _generate_user_profile(cls, user_data: Dict[str, Any]) -> str:
         """Generate the user profile section of the meta-prompt"""
         demographics = user_data.get('demographics', {})
         
@@ -250,7 +234,8 @@ class MetaPromptGenerator:
         
         return user_profile
     
-    def _generate_financial_context(self, user_data: Dict[str, Any]) -> str:
+    @classmethod
+    def _generate_financial_context(cls, user_data: Dict[str, Any]) -> str:
         """Generate the financial context section of the meta-prompt"""
         account = user_data.get('account', {})
         credit = user_data.get('credit', {})
@@ -288,13 +273,17 @@ class MetaPromptGenerator:
         
         return financial_context
     
-    def _generate_transaction_context(self, user_data: Dict[str, Any]) -> str:
+    @classmethod
+    def _generate_transaction_context(cls, user_data: Dict[str, Any]) -> str:
         """Generate the transaction context section of the meta-prompt"""
         transactions = user_data.get('transactions', [])
         
         if not transactions:
             return "# RECENT TRANSACTIONS\nNo recent transaction data available."
         
+        if user_data.get('transaction_rollups'):
+            return cls._generate_rollup_transaction_context(transactions, user_data['transaction_rollups'])
+        
         # Find largest expense
         expenses = [t for t in transactions if float(t.get('amount', 0)) < 0]
         largest_expense = "None"
@@ -332,7 +321,45 @@ class MetaPromptGenerator:
         
         return transaction_context
     
-    def _generate_social_media_context(self, user_data: Dict[str, Any]) -> str:
+    @staticmethod
+    def _generate_rollup_transaction_context(transactions: List[Dict[str, Any]],
+                                             rollups: List[Dict[str, Any]]) -> str:
+        """Generate the transaction context section from monthly rollups"""
+        # Find largest expense (expenses are negative amounts)
+        expenses = [r['smallest'] for r in rollups if r.get('smallest') and r['smallest']['amount'] < 0]
+        largest_expense = "None"
+        if expenses:
+            largest_expense_txn = min(expenses, key=lambda x: x['amount'])
+            largest_expense = f"${abs(largest_expense_txn['amount']):,.2f} " + \
+                             f"({largest_expense_txn.get('category') or 'Unknown'}, {largest_expense_txn.get('merchant') or 'Unknown'})"
+        
+        # Find most frequent category
+        categories = {}
+        for r in rollups:
+            categories[r['category']] = categories.get(r['category'], 0) + r.get('count', 0)
+        most_frequent_category = max(categories.items(), key=lambda x: x[1])[0]
+        
+        # Look for unusual activity: categories whose extremes exceed 2x the average amount
+        total_count = sum(r.get('count', 0) for r in rollups)
+        avg_amount = sum(r.get('abs_total', 0) for r in rollups) / total_count if total_count else 0
+        unusual = {
+            r['category'] for r in rollups
+            if max(abs(r.get('min_amount', 0)), abs(r.get('max_spend', 0))) > 2 * avg_amount
+        }
+        
+        unusual_activity = "None detected"
+        if unusual:
+            unusual_activity = f"{len(unusual)} categories with transactions significantly above average spending"
+        
+        return TRANSACTION_CONTEXT_TEMPLATE.format(
+            recent_transactions=format_transaction_summary(transactions, limit=TRANSACTION_LIST_LIMIT),
+            largest_expense=largest_expense,
+            most_frequent_category=most_frequent_category,
+            unusual_activity=unusual_activity
+        )
+    
+    @classmethod
+    def _generate_social_media_context(cls, user_data: Dict[str, Any]) -> str:
         """Generate the social media context section of the meta-prompt"""
         social_posts = user_data.get('social_media', [])
         
@@ -345,7 +372,8 @@ class MetaPromptGenerator:
             financial_interests="See below"
         ) + format_social_media_insights(social_posts)
     
-    def _generate_generic_meta_prompt(self, user_id: str) -> str:
+    @staticmethod
+    def _generate_generic_meta_prompt(user_id: str) -> str:
         """Generate a generic meta-prompt when user data is unavailable"""
         return f"""
 You are a personalized financial wellness assistant. Your client's data is limited, so provide general financial advice that is helpful for a wide audience. Your advice should be:
@@ -6,53 +6,165 @@ import logging
 import os
 from pathlib import Path
 import openai
+import asyncio
 from datetime import datetime
 import re
 
 from app.config import settings
 from app.database.models import ProductRecommendation, MetaPrompt
+from app.database.mongodb import get_database
 from app.utils.vector_store import VectorStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ProductCatalog:
+    """
+    Immutable snapshot of the product catalogue and its vector index.
+    The engine swaps whole snapshots, so a request always sees a matching
+    DataFrame and index even while a reload is in progress.
+    """
+
+    def __init__(self, products_df: pd.DataFrame, vector_store: VectorStore, source: str, source_mtime: Optional[float] = None):
+        self.products_df = products_df
+        self.vector_store = vector_store
+        self.source = source
+        self.source_mtime = source_mtime
+        self.loaded_at = datetime.utcnow()
+
 class RecommendationEngine:
     """
     Engine for generating personalized financial product recommendations.
     Uses a RAG approach with user's meta-prompt and a vector store of product descriptions.
+
+    One engine is shared by the whole process (see get_recommendation_engine).
+    The catalogue is reloaded in the background when the products file changes
+    or, if enabled, when the `products` collection emits a change event.
     """
     
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncIOMotorDatabase, load: bool = True):
+        """
+        Initialize the engine.
+
+        Args:
+            db: Database used for meta-prompts and the products collection
+            load: Build the catalogue now; pass False and await reload() to build it off the event loop
+        """
         self.db = db
-        self.vector_store = VectorStore()
         openai.api_key = settings.OPENAI_API_KEY
-        self._load_products()
-    
-    def _load_products(self):
-        """Load the financial products from CSV."""
+        self._catalog = ProductCatalog(pd.DataFrame(), VectorStore(), source="empty")
+        self._reload_lock = asyncio.Lock()
+        self._reload_requested = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        if load:
+            self._catalog = self._build_catalog()
+
+    @property
+    def products_df(self) -> pd.DataFrame:
+        return self._catalog.products_df
+
+    @property
+    def vector_store(self) -> VectorStore:
+        return self._catalog.vector_store
+
+    async def reload(self, products: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Rebuild the catalogue in a worker thread and swap it in atomically.
+
+        Args:
+            products: Product documents to index instead of reading the products file
+        """
+        async with self._reload_lock:
+            try:
+                catalog = await asyncio.to_thread(self._build_catalog, products)
+            except Exception as e:
+                logger.error(f"Error reloading product catalogue, keeping the current one: {str(e)}")
+                return
+            self._catalog = catalog
+            logger.info(f"Product catalogue reloaded from {catalog.source} ({len(catalog.products_df)} products)")
+
+    def start(self) -> None:
+        """Start the background reload tasks."""
+        if self._tasks:
+            return
+        if settings.PRODUCTS_RELOAD_INTERVAL > 0:
+            self._tasks.append(asyncio.create_task(self._watch_reloads()))
+        if settings.PRODUCTS_CHANGE_STREAM_ENABLED:
+            self._tasks.append(asyncio.create_task(self._watch_products_collection()))
+
+    async def stop(self) -> None:
+        """Cancel the background reload tasks."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _watch_reloads(self) -> None:
+        """Reload when the products file changes or a change event has been seen."""
+        while True:
+            try:
+                await asyncio.wait_for(self._reload_requested.wait(), timeout=settings.PRODUCTS_RELOAD_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                if self._reload_requested.is_set():
+                    # Several change events in one interval trigger a single reload
+                    self._reload_requested.clear()
+                    products = await self.db["products"].find({}, {"_id": 0}).to_list(length=None)
+                    await self.reload(products)
+                elif self._products_file_changed():
+                    await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error checking product catalogue for changes: {str(e)}")
+
+    async def _watch_products_collection(self) -> None:
+        """Request a reload on every change to the products collection."""
         try:
-            products_path = Path(settings.PRODUCTS_FILE)
-            
-            if os.path.exists(products_path):
-                self.products_df = pd.read_csv(products_path)
-                logger.info(f"Loaded {len(self.products_df)} financial products")
-                
-                # Initialize vector store with products
-                self.vector_store.add_texts(
-                    texts=self.products_df['description'].tolist(),
-                    metadatas=[{"name": name} for name in self.products_df['name'].tolist()]
-                )
-            else:
-                logger.warning(f"Products file not found at {products_path}. Creating a sample file.")
-                self._create_sample_products()
-        
+            async with self.db["products"].watch() as stream:
+                async for _ in stream:
+                    self._reload_requested.set()
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error(f"Error loading products: {str(e)}")
+            # Change streams need a replica set; the file watcher still runs
+            logger.warning(f"Products change stream unavailable: {str(e)}")
+
+    def _products_file_changed(self) -> bool:
+        """Check whether the products file differs from the one the catalogue was built from."""
+        try:
+            mtime = os.path.getmtime(settings.PRODUCTS_FILE)
+        except OSError:
+            return False
+        return self._catalog.source == "file" and mtime != self._catalog.source_mtime
+
+    def _build_catalog(self, products: Optional[List[Dict[str, Any]]] = None) -> ProductCatalog:
+        """
+        Load the products and build their vector index. Blocking; does not touch
+        the live catalogue.
+
+        Args:
+            products: Product documents to use instead of the products file
+        """
+        if products:
+            products_df = pd.DataFrame(products)
+            return ProductCatalog(products_df, self._index_products(products_df), source="database")
+
+        products_path = Path(settings.PRODUCTS_FILE)
+        if not os.path.exists(products_path):
+            logger.warning(f"Products file not found at {products_path}. Creating a sample file.")
             self._create_sample_products()
+
+        mtime = os.path.getmtime(products_path)
+        products_df = pd.read_csv(products_path)
+        logger.info(f"Loaded {len(products_df)} financial products")
+        return ProductCatalog(products_df, self._index_products(products_df), source="file", source_mtime=mtime)
     
     def _create_sample_products(self):
-        """Create sample products if no products file exists."""
+        """Write a sample products file; only called when no products file exists."""
         # Create sample products
         products = [
             {
@@ -98,18 +210,48 @@ class RecommendationEngine:
         ]
         
         # Create DataFrame
-        self.products_df = pd.DataFrame(products)
+        products_df = pd.DataFrame(products)
         
         # Save to CSV
         os.makedirs(os.path.dirname(settings.PRODUCTS_FILE), exist_ok=True)
-        self.products_df.to_csv(settings.PRODUCTS_FILE, index=False)
-        logger.info(f"Created sample products file with {len(self.products_df)} products")
+        products_df.to_csv(settings.PRODUCTS_FILE, index=False)
+        logger.info(f"Created sample products file with {len(products_df)} products")
+    
+    def _index_products(self, products_df: pd.DataFrame) -> VectorStore:
+        """
+        Build the vector store for product descriptions.
+        Reuses the persisted index when it already covers the catalogue
+        and was built with the configured embedding model, otherwise
+        embeds the products and persists the result for the next start.
+        """
+        texts = products_df['description'].tolist()
+        metadatas = [{"name": name} for name in products_df['name'].tolist()]
+        
+        try:
+            stored = VectorStore.load(settings.VECTOR_STORE_PATH)
+            if (
+                stored is not None
+                and stored.model_name == stored.provider.model_name
+                and stored.texts == texts
+                and stored.metadatas == metadatas
+            ):
+                logger.info(f"Using persisted product index from {settings.VECTOR_STORE_PATH}")
+                stored.warm_up()
+                return stored
+        except Exception as e:
+            logger.warning(f"Could not open persisted product index: {str(e)}")
+        
+        vector_store = VectorStore()
+        vector_store.add_texts(texts=texts, metadatas=metadatas)
         
-        # Initialize vector store with products
-        self.vector_store.add_texts(
-            texts=self.products_df['description'].tolist(),
-            metadatas=[{"name": name} for name in self.products_df['name'].tolist()]
-        )
+        # Don't persist zero-vector fallbacks from a failed embedding call
+        if len(vector_store) and not vector_store.has_empty_embeddings():
+            try:
+                vector_store.save(settings.VECTOR_STORE_PATH)
+            except Exception as e:
+                logger.warning(f"Could not persist product index: {str(e)}")
+        vector_store.warm_up()
+        return vector_store
     
     async def generate_recommendations(self, user_id: str) -> List[ProductRecommendation]:
         """
@@ -128,7 +270,7 @@ class RecommendationEngine:
             meta_prompt = meta_prompt_doc["prompt_text"]
             
             # Use the vector store to retrieve relevant products
-            relevant_products = self.vector_store.similarity_search(meta_prompt, k=5)
+            relevant_products = await self.vector_store.asimilarity_search(meta_prompt, k=5)
             
             # Generate personalized recommendations with explanations
             recommendations = await self._generate_personalized_recommendations(meta_prompt, relevant_products)
@@ -336,4 +478,35 @@ FORMAT YOUR RESPONSE AS:
                 )
             )
         
-        return recommendations 
\ No newline at end of file
+        return recommendations 
+
+# Engine shared by every request in this process
+_engine: Optional[RecommendationEngine] = None
+_engine_lock = asyncio.Lock()
+
+async def start_recommendation_engine(db: AsyncIOMotorDatabase) -> RecommendationEngine:
+    """
+    Build the shared engine off the event loop and start its reload watchers.
+    Called from the application startup hook.
+    """
+    global _engine
+    async with _engine_lock:
+        if _engine is None:
+            engine = RecommendationEngine(db, load=False)
+            await engine.reload()
+            engine.start()
+            _engine = engine
+    return _engine
+
+async def stop_recommendation_engine() -> None:
+    """Stop the shared engine's background tasks."""
+    global _engine
+    if _engine is not None:
+        await _engine.stop()
+        _engine = None
+
+async def get_recommendation_engine() -> RecommendationEngine:
+    """Get the shared recommendation engine, starting it on first use."""
+    if _engine is None:
+        return await start_recommendation_engine(await get_database())
+    return _engine
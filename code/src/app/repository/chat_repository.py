@@ -3,8 +3,57 @@ from bson import ObjectId
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from pymongo import UpdateOne
+
+from app.config import settings
 from app.models.chat import ChatMessage, ChatMessageCreate, Conversation, ConversationCreate, ConversationUpdate, ConversationSummary
+from app.utils.tokens import count_tokens, truncate_to_tokens
+
+# Characters of the latest message kept on the conversation for listings
+PREVIEW_LENGTH = 120
+
+# Tokens a chat API adds per message for the role and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def message_preview(content: str) -> str:
+    """Shorten a message to a single-line preview."""
+    preview = " ".join(content.split())
+    if len(preview) > PREVIEW_LENGTH:
+        preview = preview[:PREVIEW_LENGTH - 3].rstrip() + "..."
+    return preview
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    """Tokens a stored message takes up in a prompt."""
+    token_count = message.get("token_count")
+    if token_count is None:
+        token_count = count_tokens(message.get("content", ""))
+    return token_count + MESSAGE_OVERHEAD_TOKENS
 
+def select_recent_messages(messages: List[Dict[str, Any]], token_budget: int,
+                           always_keep_latest: bool = True) -> List[Dict[str, Any]]:
+    """
+    Take messages, newest first, while they fit a token budget.
+    
+    Args:
+        messages: Stored messages, newest first
+        token_budget: Tokens available
+        always_keep_latest: Keep the newest message even if it alone exceeds the budget
+            (it is truncated to fit)
+        
+    Returns:
+        The selected messages, newest first
+    """
+    selected = []
+    for message in messages:
+        tokens = message_tokens(message)
+        if tokens > token_budget:
+            if not selected and always_keep_latest:
+                content = truncate_to_tokens(message["content"], max(token_budget - MESSAGE_OVERHEAD_TOKENS, 1))
+                selected.append({**message, "content": content, "token_count": count_tokens(content)})
+            break
+        selected.append(message)
+        token_budget -= tokens
+    return selected
 
 class ChatRepository:
     """Repository for chat-related database operations."""
@@ -19,6 +68,8 @@ class ChatRepository:
         """Create necessary indexes."""
         await self.messages_collection.create_index("conversation_id")
         await self.messages_collection.create_index("created_at")
+        # Latest message of a conversation, for previews; _id orders messages with the same created_at
+        await self.messages_collection.create_index([("conversation_id", 1), ("created_at", -1), ("_id", -1)])
         await self.conversations_collection.create_index("user_id")
         await self.conversations_collection.create_index("created_at")
     
@@ -34,7 +85,8 @@ class ChatRepository:
             created_at=now,
             updated_at=now,
             is_active=True,
-            metadata=data.metadata or {}
+            metadata=data.metadata or {},
+            message_count=0
         )
         
         await self.conversations_collection.insert_one(conversation.dict(by_alias=True))
@@ -83,25 +135,80 @@ class ChatRepository:
         return result.deleted_count > 0
     
     async def list_user_conversations(self, user_id: str, skip: int = 0, limit: int = 20) -> List[ConversationSummary]:
-        """List conversations for a user with pagination."""
+        """
+        List conversations for a user with pagination.
+        
+        Message counts and previews are read from the conversation documents.
+        Conversations created before those were maintained are counted with a
+        single aggregation over their messages.
+        """
         cursor = self.conversations_collection.find({"user_id": user_id}).sort("updated_at", -1).skip(skip).limit(limit)
         conversations = await cursor.to_list(length=limit)
         
+        legacy_ids = [str(conv["_id"]) for conv in conversations if conv.get("message_count") is None]
+        legacy_stats = await self._aggregate_message_stats(legacy_ids) if legacy_ids else {}
+        
         result = []
         for conv in conversations:
-            # Get message count for each conversation
-            count = await self.messages_collection.count_documents({"conversation_id": str(conv["_id"])})
-            conv_obj = Conversation(**conv)
+            conversation_id = str(conv["_id"])
+            stats = legacy_stats.get(conversation_id, {}) if conv.get("message_count") is None else conv
             result.append(ConversationSummary(
-                id=conv_obj.id,
-                title=conv_obj.title,
-                created_at=conv_obj.created_at,
-                updated_at=conv_obj.updated_at,
-                message_count=count
+                id=conversation_id,
+                title=conv["title"],
+                created_at=conv["created_at"],
+                updated_at=conv["updated_at"],
+                message_count=stats.get("message_count") or 0,
+                last_message_preview=stats.get("last_message_preview")
             ))
             
         return result
     
+    async def _aggregate_message_stats(self, conversation_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Message count and latest-message preview for several conversations, in one aggregation."""
+        pipeline = [
+            {"$match": {"conversation_id": {"$in": conversation_ids}}},
+            {"$sort": {"created_at": 1}},
+            {"$group": {
+                "_id": "$conversation_id",
+                "message_count": {"$sum": 1},
+                "last_content": {"$last": "$content"}
+            }}
+        ]
+        stats = {}
+        async for doc in self.messages_collection.aggregate(pipeline):
+            stats[doc["_id"]] = {
+                "message_count": doc["message_count"],
+                "last_message_preview": message_preview(doc["last_content"] or "")
+            }
+        return stats
+    
+    async def backfill_message_stats(self) -> int:
+        """
+        Store message counts and previews on conversations that predate them.
+        
+        Run while no messages are being written to those conversations, since
+        their counts only start being incremented once stored.
+        
+        Returns:
+            Number of conversations updated
+        """
+        legacy_ids = [
+            str(conv["_id"])
+            async for conv in self.conversations_collection.find({"message_count": {"$exists": False}}, {"_id": 1})
+        ]
+        if not legacy_ids:
+            return 0
+        
+        stats = await self._aggregate_message_stats(legacy_ids)
+        result = await self.conversations_collection.bulk_write([
+            UpdateOne(
+                {"_id": ObjectId(conversation_id), "message_count": {"$exists": False}},
+                {"$set": stats.get(conversation_id, {"message_count": 0, "last_message_preview": None})}
+            )
+            for conversation_id in legacy_ids
+        ], ordered=False)
+        return result.modified_count
+    
     # Message methods
     
     async def create_message(self, data: ChatMessageCreate) -> ChatMessage:
@@ -113,17 +220,23 @@ class ChatRepository:
             role=data.role,
             content=data.content,
             created_at=now,
-            metadata=data.metadata or {}
+            metadata=data.metadata or {},
+            token_count=count_tokens(data.content)
         )
         
-        # Update conversation's updated_at timestamp
+        await self.messages_collection.insert_one(message.dict(by_alias=True))
+        
+        # Update the conversation's timestamp, preview and message count in one atomic write
         if ObjectId.is_valid(data.conversation_id):
-            await self.conversations_collection.update_one(
-                {"_id": ObjectId(data.conversation_id)},
-                {"$set": {"updated_at": now}}
+            update = {"$set": {"updated_at": now, "last_message_preview": message_preview(data.content)}}
+            result = await self.conversations_collection.update_one(
+                {"_id": ObjectId(data.conversation_id), "message_count": {"$exists": True}},
+                {**update, "$inc": {"message_count": 1}}
             )
+            if result.matched_count == 0:
+                # Untracked legacy conversation: listings count its messages instead
+                await self.conversations_collection.update_one({"_id": ObjectId(data.conversation_id)}, update)
         
-        await self.messages_collection.insert_one(message.dict(by_alias=True))
         return message
     
     async def get_message(self, message_id: str) -> Optional[ChatMessage]:
@@ -151,23 +264,116 @@ class ChatRepository:
         if not ObjectId.is_valid(message_id):
             return False
             
-        result = await self.messages_collection.delete_one({"_id": ObjectId(message_id)})
-        return result.deleted_count > 0
+        deleted = await self.messages_collection.find_one_and_delete({"_id": ObjectId(message_id)})
+        if deleted is None:
+            return False
+        
+        conversation_id = deleted["conversation_id"]
+        if ObjectId.is_valid(conversation_id):
+            latest = await self.messages_collection.find(
+                {"conversation_id": conversation_id}, {"content": 1}
+            ).sort("created_at", -1).limit(1).to_list(length=1)
+            preview = message_preview(latest[0]["content"]) if latest else None
+            await self.conversations_collection.update_one(
+                {"_id": ObjectId(conversation_id), "message_count": {"$gt": 0}},
+                {"$inc": {"message_count": -1}, "$set": {"last_message_preview": preview}}
+            )
+        return True
     
-    async def get_conversation_context(self, conversation_id: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get the most recent messages from a conversation as context for AI."""
-        cursor = self.messages_collection.find({"conversation_id": conversation_id}).sort("created_at", -1).limit(limit)
-        messages = await cursor.to_list(length=limit)
+    async def get_conversation_context(self, conversation_id: str, token_budget: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Build the conversation context for the AI within a token budget.
         
-        # Reverse to get chronological order
-        messages.reverse()
+        The conversation's rolling summary (if any) comes first, followed by
+        as many of the most recent unsummarized messages as fit the budget.
+        
+        Args:
+            conversation_id: Conversation ID
+            token_budget: Tokens available for the context (defaults to settings.CONTEXT_TOKEN_BUDGET)
+            
+        Returns:
+            List of role/content dictionaries in chronological order
+        """
+        token_budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+        state = await self.get_summary_state(conversation_id)
         
-        # Convert to the format expected by AI
         context = []
-        for msg in messages:
+        if state["summary"]:
+            summary_message = {"role": "system", "content": f"Summary of the earlier conversation:\n{state['summary']}"}
+            context.append(summary_message)
+            token_budget -= count_tokens(summary_message["content"]) + MESSAGE_OVERHEAD_TOKENS
+        
+        # Page back from the newest message until the budget is used up. Pages are keyed on
+        # (created_at, _id), so messages sharing a timestamp across a page boundary aren't skipped
+        base_query: Dict[str, Any] = {"conversation_id": conversation_id}
+        if state["summarized_until"] is not None:
+            base_query["created_at"] = {"$gt": state["summarized_until"]}
+        query = base_query
+        recent: List[Dict[str, Any]] = []
+        remaining = token_budget
+        page_size = settings.CONTEXT_PAGE_SIZE
+        while True:
+            page = await self.messages_collection.find(query).sort(
+                [("created_at", -1), ("_id", -1)]
+            ).limit(page_size).to_list(length=page_size)
+            selected = select_recent_messages(page, remaining, always_keep_latest=not recent)
+            recent.extend(selected)
+            remaining -= sum(message_tokens(msg) for msg in selected)
+            if len(selected) < len(page) or len(page) < page_size:
+                break
+            last = page[-1]
+            query = {**base_query, "$or": [
+                {"created_at": {"$lt": last["created_at"]}},
+                {"created_at": last["created_at"], "_id": {"$lt": last["_id"]}}
+            ]}
+        
+        # Reverse to get chronological order, in the format expected by AI
+        for msg in reversed(recent):
             context.append({
-                "role": msg["role"].lower(),
+                "role": str(msg["role"]).lower(),
                 "content": msg["content"]
             })
             
-        return context 
\ No newline at end of file
+        return context
+    
+    # Rolling summary methods
+    
+    async def get_summary_state(self, conversation_id: str) -> Dict[str, Any]:
+        """The conversation's rolling summary and the timestamp of the last message it covers."""
+        conversation = None
+        if ObjectId.is_valid(conversation_id):
+            conversation = await self.conversations_collection.find_one(
+                {"_id": ObjectId(conversation_id)}, {"summary": 1, "summarized_until": 1}
+            )
+        conversation = conversation or {}
+        return {"summary": conversation.get("summary"), "summarized_until": conversation.get("summarized_until")}
+    
+    async def get_unsummarized_messages(self, conversation_id: str, summarized_until: Optional[datetime],
+                                        limit: int) -> List[Dict[str, Any]]:
+        """Up to `limit` of the oldest messages not yet covered by the summary, in chronological order."""
+        query: Dict[str, Any] = {"conversation_id": conversation_id}
+        if summarized_until is not None:
+            query["created_at"] = {"$gt": summarized_until}
+        return await self.messages_collection.find(query).sort("created_at", 1).limit(limit).to_list(length=limit)
+    
+    async def save_summary(self, conversation_id: str, summary: str, summarized_until: datetime,
+                           previous_until: Optional[datetime]) -> bool:
+        """
+        Store a new rolling summary, unless another update got there first.
+        
+        Args:
+            conversation_id: Conversation ID
+            summary: Summary text
+            summarized_until: Timestamp of the newest message the summary covers
+            previous_until: summarized_until of the summary this one extends
+            
+        Returns:
+            True if the summary was stored
+        """
+        if not ObjectId.is_valid(conversation_id):
+            return False
+        result = await self.conversations_collection.update_one(
+            {"_id": ObjectId(conversation_id), "summarized_until": previous_until},
+            {"$set": {"summary": summary, "summarized_until": summarized_until}}
+        )
+        return result.matched_count > 0
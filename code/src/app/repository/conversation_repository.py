@@ -21,7 +21,7 @@ class ConversationRepository:
     
     async def setup(self):
         """Setup repository with database connection if not initialized."""
-        if not self.db:
+        if self.db is None:
             self.db = await get_database()
         
         # Ensure indexes
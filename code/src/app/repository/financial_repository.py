@@ -1,12 +1,17 @@
+import inspect
 from typing import List, Optional, Dict, Any
 from bson import ObjectId
-from datetime import date, datetime
+from datetime import date, datetime, time, timedelta
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.models.financial import (
     Product, ProductCreate, Investment, InvestmentCreate, InvestmentUpdate,
     Transaction, Account, CreditHistory, Demographic
 )
+from app.repository.transaction_rollup_repository import TransactionRollupRepository, month_key
+from app.repository.user_data_change_repository import UserDataChangeRepository
+from app.utils.financial_context_cache import invalidate_financial_context
+from app.config import settings
 
 
 class FinancialRepository:
@@ -21,6 +26,8 @@ class FinancialRepository:
         self.accounts_collection = database.account_data
         self.credit_history_collection = database.credit_history
         self.demographics_collection = database.demographic_data
+        self.rollups = TransactionRollupRepository(database)
+        self.data_changes = UserDataChangeRepository(database)
     
     async def create_indexes(self):
         """Create necessary indexes."""
@@ -39,6 +46,8 @@ class FinancialRepository:
         await self.transactions_collection.create_index("date")
         await self.transactions_collection.create_index("category")
         await self.transactions_collection.create_index([("user_id", 1), ("date", -1)])
+        await self.rollups.create_indexes()
+        await self.data_changes.create_indexes()
         
         # Accounts indexes
         await self.accounts_collection.create_index("user_id", unique=True)
@@ -109,6 +118,8 @@ class FinancialRepository:
         )
         
         await self.investments_collection.insert_one(investment.dict(by_alias=True))
+        await self.data_changes.touch([investment.user_id])
+        invalidate_financial_context([investment.user_id])
         return investment
     
     async def get_investment(self, investment_id: str) -> Optional[Investment]:
@@ -136,6 +147,8 @@ class FinancialRepository:
                 {"_id": ObjectId(investment_id)},
                 {"$set": update_data}
             )
+            await self.data_changes.touch([investment.user_id])
+            invalidate_financial_context([investment.user_id])
             
         return await self.get_investment(investment_id)
     
@@ -151,10 +164,40 @@ class FinancialRepository:
         return [Investment(**investment) for investment in investments]
     
     async def get_investment_summary(self, user_id: str) -> Dict[str, Any]:
-        """Get investment summary for a user."""
-        investments = await self.get_user_investments(user_id)
-        
-        if not investments:
+        """
+        Get investment summary for a user.
+
+        Totals are computed server-side by grouping the user's investments by
+        type, so only one row per investment type leaves the database.
+        """
+        if hasattr(self.investments_collection, "aggregate"):
+            # Covered by the (user_id, investment_type) compound index
+            pipeline = [
+                {"$match": {"user_id": user_id}},
+                {"$group": {
+                    "_id": "$investment_type",
+                    "amount": {"$sum": "$amount"},
+                    "current_value": {"$sum": "$current_value"}
+                }}
+            ]
+            groups = await self.investments_collection.aggregate(pipeline).to_list(length=None)
+        else:
+            # Mock database: group the raw documents in Python
+            by_type: Dict[str, Dict[str, Any]] = {}
+            for inv in await self._find_all(self.investments_collection, {"user_id": user_id}):
+                group = by_type.setdefault(inv.get("investment_type"), {
+                    "_id": inv.get("investment_type"), "amount": 0, "current_value": 0
+                })
+                group["amount"] += inv.get("amount", 0)
+                group["current_value"] += inv.get("current_value", 0)
+            groups = list(by_type.values())
+
+        return self._build_investment_summary(groups)
+
+    @staticmethod
+    def _build_investment_summary(groups: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the investment summary from per-type totals."""
+        if not groups:
             return {
                 "total_invested": 0,
                 "total_current_value": 0,
@@ -162,27 +205,23 @@ class FinancialRepository:
                 "gain_loss_percentage": 0,
                 "investment_types": {}
             }
-        
-        total_invested = sum(inv.amount for inv in investments)
-        total_current = sum(inv.current_value for inv in investments)
-        
-        # Group by investment type
+
+        total_invested = sum(group["amount"] for group in groups)
+        total_current = sum(group["current_value"] for group in groups)
+
         types = {}
-        for inv in investments:
-            inv_type = inv.investment_type.value
-            if inv_type not in types:
-                types[inv_type] = {"amount": 0, "current_value": 0}
-            
-            types[inv_type]["amount"] += inv.amount
-            types[inv_type]["current_value"] += inv.current_value
-        
-        # Calculate percentages for each type
-        for t in types:
-            types[t]["percentage"] = round((types[t]["amount"] / total_invested) * 100, 2)
-            gain_loss = types[t]["current_value"] - types[t]["amount"]
-            types[t]["gain_loss"] = gain_loss
-            types[t]["gain_loss_percentage"] = round((gain_loss / types[t]["amount"]) * 100, 2) if types[t]["amount"] > 0 else 0
-        
+        for group in groups:
+            inv_type = getattr(group["_id"], "value", group["_id"])
+            amount = group["amount"]
+            gain_loss = group["current_value"] - amount
+            types[inv_type] = {
+                "amount": amount,
+                "current_value": group["current_value"],
+                "percentage": round((amount / total_invested) * 100, 2) if total_invested > 0 else 0,
+                "gain_loss": gain_loss,
+                "gain_loss_percentage": round((gain_loss / amount) * 100, 2) if amount > 0 else 0
+            }
+
         return {
             "total_invested": total_invested,
             "total_current_value": total_current,
@@ -190,6 +229,16 @@ class FinancialRepository:
             "gain_loss_percentage": round(((total_current - total_invested) / total_invested) * 100, 2) if total_invested > 0 else 0,
             "investment_types": types
         }
+
+    @staticmethod
+    async def _find_all(collection, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Fetch every document matching an equality query (works with the mock DB)."""
+        cursor = collection.find(query)
+        if inspect.isawaitable(cursor):
+            cursor = await cursor
+        if isinstance(cursor, list):
+            return cursor
+        return await cursor.to_list(length=None)
     
     # Transaction methods
     
@@ -216,57 +265,137 @@ class FinancialRepository:
         return [Transaction(**tx) for tx in transactions]
     
     async def get_transaction_summary(self, user_id: str, months: int = 3) -> Dict[str, Any]:
-        """Get transaction summary for a user for the last X months."""
-        from datetime import timedelta
-        
+        """
+        Get transaction summary for a user for the last X months.
+
+        Spending per category and the largest transaction come from the
+        precomputed monthly rollups, which cover whole calendar months: the
+        current month and the `months - 1` before it. Users without rollups,
+        and all users with rollups disabled, get them computed server-side
+        over every transaction in the last `30 * months` days instead. The
+        window used is returned as period_start and period_end.
+        """
         end_date = datetime.utcnow().date()
-        start_date = end_date - timedelta(days=30 * months)
-        
-        transactions = await self.get_user_transactions(user_id, start_date, end_date)
-        
-        if not transactions:
+
+        rollups = []
+        if settings.TRANSACTION_ROLLUPS_ENABLED and hasattr(self.rollups.rollups_collection, "bulk_write"):
+            month_index = end_date.year * 12 + end_date.month - months
+            start_date = date(month_index // 12, month_index % 12 + 1, 1)
+            rollups = await self.rollups.get_user_rollups(
+                user_id, start_month=month_key(start_date), include_merchants=False
+            )
+
+        if rollups:
+            category_totals = {}
+            largest_tx = None
+            for rollup in rollups:
+                if rollup.get("spend_total", 0) <= 0:
+                    continue
+                category_totals[rollup["category"]] = category_totals.get(rollup["category"], 0) + rollup["spend_total"]
+                largest = rollup.get("largest")
+                if largest and (largest_tx is None or largest["amount"] > largest_tx["amount"]):
+                    largest_tx = largest
+        else:
+            # No rollups yet (or disabled): aggregate the raw transactions
+            start_date = end_date - timedelta(days=30 * months)
+            if hasattr(self.transactions_collection, "aggregate"):
+                # The (user_id, date) compound index covers the $match. Loaded rows store
+                # dates as ISO strings and documents written by the app as datetimes; range
+                # queries only match values of the same BSON type, so both are matched
+                pipeline = [
+                    {"$match": {
+                        "user_id": user_id,
+                        "$or": [
+                            {"date": {
+                                "$gte": datetime.combine(start_date, time.min),
+                                "$lte": datetime.combine(end_date, time.max)
+                            }},
+                            {"date": {
+                                "$gte": start_date.isoformat(),
+                                "$lt": (end_date + timedelta(days=1)).isoformat()
+                            }}
+                        ],
+                        # Only count outgoing transactions (positive amounts)
+                        "amount": {"$gt": 0}
+                    }},
+                    {"$facet": {
+                        "categories": [
+                            {"$group": {"_id": "$category", "amount": {"$sum": "$amount"}}}
+                        ],
+                        "largest": [
+                            {"$sort": {"amount": -1}},
+                            {"$limit": 1},
+                            {"$project": {"_id": 0, "amount": 1, "merchant": 1, "category": 1, "date": 1}}
+                        ]
+                    }}
+                ]
+                result = await self.transactions_collection.aggregate(pipeline).to_list(length=1)
+                facets = result[0] if result else {}
+                category_totals = {group["_id"]: group["amount"] for group in facets.get("categories", [])}
+                largest = facets.get("largest") or [None]
+                largest_tx = largest[0]
+            else:
+                # Mock database: filter and reduce the raw documents in Python
+                category_totals = {}
+                largest_tx = None
+                for tx in await self._find_all(self.transactions_collection, {"user_id": user_id}):
+                    amount = tx.get("amount", 0)
+                    tx_date = tx.get("date")
+                    if isinstance(tx_date, datetime):
+                        tx_date = tx_date.date()
+                    elif isinstance(tx_date, str):
+                        tx_date = date.fromisoformat(tx_date[:10])
+                    if amount <= 0 or tx_date is None or not start_date <= tx_date <= end_date:
+                        continue
+                    category_totals[tx.get("category")] = category_totals.get(tx.get("category"), 0) + amount
+                    if largest_tx is None or amount > largest_tx["amount"]:
+                        largest_tx = tx
+
+        return self._build_transaction_summary(category_totals, largest_tx, months, start_date, end_date)
+
+    @staticmethod
+    def _build_transaction_summary(category_totals: Dict[str, float], largest_tx: Optional[Dict[str, Any]],
+                                   months: int, start_date: date, end_date: date) -> Dict[str, Any]:
+        """Build the transaction summary from per-category spending and the largest transaction."""
+        period = {"period_start": start_date.isoformat(), "period_end": end_date.isoformat()}
+        if not category_totals:
             return {
                 "total_spending": 0,
                 "average_monthly": 0,
                 "categories": {},
-                "largest_transaction": None
+                "largest_transaction": None,
+                **period
             }
-        
-        # Calculate totals and find largest transaction
-        total_spending = 0
-        largest_tx = None
-        largest_amount = 0
-        categories = {}
-        
-        for tx in transactions:
-            if tx.amount > 0:  # Only count outgoing transactions (positive amounts)
-                total_spending += tx.amount
-                
-                if tx.category not in categories:
-                    categories[tx.category] = 0
-                categories[tx.category] += tx.amount
-                
-                if tx.amount > largest_amount:
-                    largest_amount = tx.amount
-                    largest_tx = tx
-        
+
+        total_spending = sum(category_totals.values())
+
         # Convert categories to percentages
-        for cat in categories:
-            categories[cat] = {
-                "amount": categories[cat],
-                "percentage": round((categories[cat] / total_spending) * 100, 2) if total_spending > 0 else 0
+        categories = {
+            cat: {
+                "amount": amount,
+                "percentage": round((amount / total_spending) * 100, 2) if total_spending > 0 else 0
             }
-        
+            for cat, amount in category_totals.items()
+        }
+
+        largest_transaction = None
+        if largest_tx:
+            tx_date = largest_tx.get("date")
+            if isinstance(tx_date, datetime):
+                tx_date = tx_date.date()
+            largest_transaction = {
+                "amount": largest_tx["amount"],
+                "merchant": largest_tx.get("merchant"),
+                "category": largest_tx.get("category"),
+                "date": tx_date.isoformat() if isinstance(tx_date, date) else tx_date
+            }
+
         return {
             "total_spending": total_spending,
             "average_monthly": round(total_spending / months, 2),
             "categories": categories,
-            "largest_transaction": {
-                "amount": largest_tx.amount,
-                "merchant": largest_tx.merchant,
-                "category": largest_tx.category,
-                "date": largest_tx.date.isoformat()
-            } if largest_tx else None
+            "largest_transaction": largest_transaction,
+            **period
         }
     
     # Account methods
@@ -304,6 +433,8 @@ class FinancialRepository:
             return 0
             
         result = await self.investments_collection.insert_many(investments)
+        await self.data_changes.apply(investments)
+        invalidate_financial_context(doc.get("user_id") for doc in investments)
         return len(result.inserted_ids)
     
     async def bulk_load_transactions(self, transactions: List[Dict[str, Any]]) -> int:
@@ -312,6 +443,8 @@ class FinancialRepository:
             return 0
             
         result = await self.transactions_collection.insert_many(transactions)
+        await self.rollups.apply(transactions)
+        invalidate_financial_context(doc.get("user_id") for doc in transactions)
         return len(result.inserted_ids)
     
     async def bulk_load_accounts(self, accounts: List[Dict[str, Any]]) -> int:
@@ -320,6 +453,8 @@ class FinancialRepository:
             return 0
             
         result = await self.accounts_collection.insert_many(accounts)
+        await self.data_changes.apply(accounts)
+        invalidate_financial_context(doc.get("user_id") for doc in accounts)
         return len(result.inserted_ids)
     
     async def bulk_load_credit_history(self, credit_history: List[Dict[str, Any]]) -> int:
@@ -328,6 +463,7 @@ class FinancialRepository:
             return 0
             
         result = await self.credit_history_collection.insert_many(credit_history)
+        await self.data_changes.apply(credit_history)
         return len(result.inserted_ids)
     
     async def bulk_load_demographics(self, demographics: List[Dict[str, Any]]) -> int:
@@ -336,6 +472,7 @@ class FinancialRepository:
             return 0
             
         result = await self.demographics_collection.insert_many(demographics)
+        await self.data_changes.apply(demographics)
         return len(result.inserted_ids)
     
     async def bulk_load_products(self, products: List[Dict[str, Any]]) -> int:
@@ -0,0 +1,375 @@
+import asyncio
+import logging
+import weakref
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+from datetime import date, datetime, timezone
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne, UpdateOne
+
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RollupKey = Tuple[str, str, str]
+
+# Bumped when the rollup document layout changes; older rollups are rebuilt at startup
+ROLLUP_VERSION = 2
+
+# Held by a rebuild for its whole run and by apply() around its write, one per event loop
+_rebuild_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+# When the last rebuild in this process finished; it may have read transactions inserted before then
+_last_rebuild_finished: Optional[datetime] = None
+
+
+def _rebuild_lock() -> asyncio.Lock:
+    """The rebuild lock shared by every repository in this process."""
+    loop = asyncio.get_running_loop()
+    lock = _rebuild_locks.get(loop)
+    if lock is None:
+        lock = _rebuild_locks[loop] = asyncio.Lock()
+    return lock
+
+
+def month_key(value: Any) -> Optional[str]:
+    """Return the "YYYY-MM" month of a transaction date (date, datetime or ISO string)."""
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m")
+    if isinstance(value, str) and len(value) >= 7:
+        return value[:7]
+    return None
+
+
+def merchant_key(merchant: Any) -> str:
+    """Make a merchant name safe to use as a MongoDB field name."""
+    return str(merchant or "Unknown").replace(".", "．").replace("$", "＄")
+
+
+def merchant_name(key: str) -> str:
+    """Reverse merchant_key."""
+    return key.replace("．", ".").replace("＄", "$")
+
+
+def is_spend(transaction: Dict[str, Any]) -> bool:
+    """Transactions counted as spending by the transaction summary: positive amounts."""
+    return transaction.get("amount", 0) > 0
+
+
+def is_debit(transaction: Dict[str, Any]) -> bool:
+    """Transactions counted by the spending insights: those marked as debits."""
+    return transaction.get("transaction_type") == "debit"
+
+
+class TransactionRollupRepository:
+    """
+    Repository for the transaction_rollups collection.
+
+    Each document holds the counts, sums, extremes and merchant frequencies of
+    one user's transactions in one category and month, keyed by
+    (user_id, month, category). The spend_* fields and `largest` cover
+    positive amounts, as the transaction summary does; the debit_* fields,
+    `largest_debit` and `merchants` cover debits, as the spending insights
+    do. Rollups are maintained incrementally with $inc/$max/$min as
+    transactions are loaded, and can be rebuilt from the raw transactions by
+    the backfill script, so readers never have to scan raw transactions.
+    """
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        """Initialize with database connection."""
+        self.db = database
+        self.rollups_collection = database.transaction_rollups
+        self.transactions_collection = database.transaction_data
+
+    async def create_indexes(self):
+        """Create necessary indexes."""
+        await self.rollups_collection.create_index(
+            [("user_id", 1), ("month", 1), ("category", 1)], unique=True
+        )
+
+    @staticmethod
+    def _group(transactions: Iterable[Dict[str, Any]]) -> Dict[RollupKey, Dict[str, Any]]:
+        """Fold transactions into per (user, month, category) totals in memory."""
+        groups: Dict[RollupKey, Dict[str, Any]] = {}
+        for tx in transactions:
+            month = month_key(tx.get("date"))
+            if not tx.get("user_id") or month is None:
+                continue
+            key = (tx["user_id"], month, tx.get("category") or "Uncategorized")
+            amount = float(tx.get("amount", 0))
+
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {
+                    "count": 0, "total": 0.0, "abs_total": 0.0, "spend_count": 0, "spend_total": 0.0,
+                    "debit_count": 0, "debit_total": 0.0, "merchants": {},
+                    "largest": None, "largest_debit": None, "smallest": tx
+                }
+            group["count"] += 1
+            group["total"] += amount
+            group["abs_total"] += abs(amount)
+            if is_spend(tx):
+                group["spend_count"] += 1
+                group["spend_total"] += amount
+                if group["largest"] is None or amount > float(group["largest"]["amount"]):
+                    group["largest"] = tx
+            if is_debit(tx):
+                group["debit_count"] += 1
+                group["debit_total"] += amount
+                merchant = group["merchants"].setdefault(
+                    merchant_key(tx.get("merchant")), {"count": 0, "total": 0.0, "min": amount, "max": amount}
+                )
+                merchant["count"] += 1
+                merchant["total"] += amount
+                merchant["min"] = min(merchant["min"], amount)
+                merchant["max"] = max(merchant["max"], amount)
+                if group["largest_debit"] is None or amount > float(group["largest_debit"]["amount"]):
+                    group["largest_debit"] = tx
+            if amount < float(group["smallest"].get("amount", 0)):
+                group["smallest"] = tx
+        return groups
+
+    @staticmethod
+    def build_updates(transactions: Iterable[Dict[str, Any]]) -> List[UpdateOne]:
+        """
+        Build the bulk-write operations that fold transactions into their rollups.
+
+        Transactions are grouped in memory first, so each (user, month,
+        category) costs one upsert however many transactions it covers, plus
+        a conditional update for each of the largest and smallest transaction.
+
+        Args:
+            transactions: Raw transaction documents
+
+        Returns:
+            List of UpdateOne operations, to be applied in order
+        """
+        now = datetime.utcnow()
+        operations = []
+        for (user_id, month, category), group in TransactionRollupRepository._group(transactions).items():
+            key_filter = {"user_id": user_id, "month": month, "category": category}
+            increments = {
+                field: group[field]
+                for field in ("count", "total", "abs_total", "spend_count", "spend_total", "debit_count", "debit_total")
+            }
+            for merchant, stats in group["merchants"].items():
+                increments[f"merchants.{merchant}.count"] = stats["count"]
+                increments[f"merchants.{merchant}.total"] = stats["total"]
+
+            smallest = float(group["smallest"].get("amount", 0))
+            update = {
+                "$inc": increments,
+                "$min": {"min_amount": smallest},
+                "$max": {},
+                "$set": {"updated_at": now, "version": ROLLUP_VERSION}
+            }
+            for merchant, stats in group["merchants"].items():
+                update["$min"][f"merchants.{merchant}.min"] = stats["min"]
+                update["$max"][f"merchants.{merchant}.max"] = stats["max"]
+            for field, detail in (("max_spend", "largest"), ("max_debit", "largest_debit")):
+                if group[detail] is not None:
+                    update["$max"][field] = float(group[detail]["amount"])
+            if not update["$max"]:
+                del update["$max"]
+            operations.append(UpdateOne(key_filter, update, upsert=True))
+
+            # Only replace the stored details if this batch set a new extreme
+            for field, detail in (("max_spend", "largest"), ("max_debit", "largest_debit")):
+                if group[detail] is not None:
+                    operations.append(UpdateOne(
+                        {**key_filter, field: float(group[detail]["amount"])},
+                        {"$set": {detail: TransactionRollupRepository._transaction_detail(group[detail])}}
+                    ))
+            operations.append(UpdateOne(
+                {**key_filter, "min_amount": smallest},
+                {"$set": {"smallest": TransactionRollupRepository._transaction_detail(group["smallest"])}}
+            ))
+        return operations
+
+    @staticmethod
+    def build_documents(transactions: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Build complete rollup documents from all of a user's transactions.
+
+        Args:
+            transactions: Raw transaction documents
+
+        Returns:
+            List of rollup documents, one per (user, month, category)
+        """
+        now = datetime.utcnow()
+        documents = []
+        for (user_id, month, category), group in TransactionRollupRepository._group(transactions).items():
+            document = {
+                "user_id": user_id,
+                "month": month,
+                "category": category,
+                "count": group["count"],
+                "total": group["total"],
+                "abs_total": group["abs_total"],
+                "spend_count": group["spend_count"],
+                "spend_total": group["spend_total"],
+                "debit_count": group["debit_count"],
+                "debit_total": group["debit_total"],
+                "merchants": group["merchants"],
+                "min_amount": float(group["smallest"].get("amount", 0)),
+                "smallest": TransactionRollupRepository._transaction_detail(group["smallest"]),
+                "updated_at": now,
+                "version": ROLLUP_VERSION
+            }
+            for field, detail in (("max_spend", "largest"), ("max_debit", "largest_debit")):
+                if group[detail] is not None:
+                    document[field] = float(group[detail]["amount"])
+                    document[detail] = TransactionRollupRepository._transaction_detail(group[detail])
+            documents.append(document)
+        return documents
+
+    @staticmethod
+    def _transaction_detail(tx: Dict[str, Any]) -> Dict[str, Any]:
+        tx_date = tx.get("date")
+        return {
+            "amount": float(tx.get("amount", 0)),
+            "merchant": tx.get("merchant"),
+            "category": tx.get("category"),
+            "date": tx_date.isoformat() if isinstance(tx_date, (date, datetime)) else tx_date
+        }
+
+    async def apply(self, transactions: List[Dict[str, Any]]) -> int:
+        """
+        Fold newly inserted transactions into their rollups.
+
+        Waits for a rebuild running in this process to finish, as the
+        rebuild's replaced documents would overwrite the increments. Users
+        with a transaction inserted before the last rebuild finished are
+        rebuilt instead, since that rebuild may already have counted it.
+
+        Args:
+            transactions: Transactions that were just inserted
+
+        Returns:
+            Number of bulk-write operations sent
+        """
+        if not hasattr(self.rollups_collection, "bulk_write"):
+            # The mock database doesn't support bulk writes; summaries fall back to raw data there
+            return 0
+
+        async with _rebuild_lock():
+            counted = {tx.get("user_id") for tx in transactions if self._maybe_rebuilt(tx)}
+            operations = self.build_updates(tx for tx in transactions if tx.get("user_id") not in counted)
+            if operations:
+                await self.rollups_collection.bulk_write(operations, ordered=True)
+            if counted:
+                logger.info(f"Rebuilding rollups for {len(counted)} users with transactions a rebuild may have read")
+                await self._rebuild(sorted(counted), settings.TRANSACTION_ROLLUP_BATCH_SIZE)
+        return len(operations)
+
+    @staticmethod
+    def _maybe_rebuilt(transaction: Dict[str, Any]) -> bool:
+        """Whether the last rebuild may have read this transaction, going by its ObjectId's creation time."""
+        if _last_rebuild_finished is None or not isinstance(transaction.get("_id"), ObjectId):
+            return False
+        created = transaction["_id"].generation_time.astimezone(timezone.utc).replace(tzinfo=None)
+        # generation_time is truncated to the second
+        return created <= _last_rebuild_finished
+
+    async def rebuild(self, user_ids: Optional[List[str]] = None, batch_size: Optional[int] = None) -> int:
+        """
+        Recompute rollups from the raw transactions.
+
+        Each user's rollups are replaced document by document once all of
+        their transactions have been read, so readers see either the old or
+        the new rollup, never an empty collection. Rollups that no
+        transaction maps to any more are deleted at the end. apply() calls
+        in this process wait until the rebuild is done, so increments are
+        never overwritten. Writers in other processes aren't held back, so
+        run the backfill script while nothing is loading transactions.
+
+        Args:
+            user_ids: Only rebuild these users (all users if None)
+            batch_size: Transactions read per cursor batch, and rollups per bulk write
+
+        Returns:
+            Number of transactions processed
+        """
+        if not hasattr(self.rollups_collection, "bulk_write"):
+            return 0
+
+        async with _rebuild_lock():
+            return await self._rebuild(user_ids, batch_size or settings.TRANSACTION_ROLLUP_BATCH_SIZE)
+
+    async def _rebuild(self, user_ids: Optional[List[str]], batch_size: int) -> int:
+        global _last_rebuild_finished
+        try:
+            return await self._replace_rollups(user_ids, batch_size)
+        finally:
+            _last_rebuild_finished = datetime.utcnow()
+
+    async def _replace_rollups(self, user_ids: Optional[List[str]], batch_size: int) -> int:
+        query = {"user_id": {"$in": user_ids}} if user_ids else {}
+        await self.create_indexes()
+        started = datetime.utcnow()
+
+        processed = 0
+        user_transactions: List[Dict[str, Any]] = []
+        operations: List[ReplaceOne] = []
+
+        async def replace_user() -> None:
+            nonlocal processed, operations
+            for document in self.build_documents(user_transactions):
+                key_filter = {field: document[field] for field in ("user_id", "month", "category")}
+                operations.append(ReplaceOne(key_filter, document, upsert=True))
+            processed += len(user_transactions)
+            user_transactions.clear()
+            if len(operations) >= batch_size:
+                await self.rollups_collection.bulk_write(operations, ordered=False)
+                operations = []
+
+        # Sorted by user so each user's transactions arrive together
+        cursor = self.transactions_collection.find(query).sort("user_id", 1).batch_size(batch_size)
+        async for tx in cursor:
+            if user_transactions and tx.get("user_id") != user_transactions[0].get("user_id"):
+                await replace_user()
+            user_transactions.append(tx)
+        if user_transactions:
+            await replace_user()
+        if operations:
+            await self.rollups_collection.bulk_write(operations, ordered=False)
+
+        # Rollups not replaced above no longer have any transactions
+        await self.rollups_collection.delete_many({**query, "updated_at": {"$lt": started}})
+
+        logger.info(f"Rebuilt transaction rollups from {processed} transactions")
+        return processed
+
+    async def needs_rebuild(self) -> bool:
+        """Whether the rollups are missing or were built with an older layout."""
+        if not hasattr(self.rollups_collection, "bulk_write"):
+            return False
+        if await self.rollups_collection.find_one({"version": {"$ne": ROLLUP_VERSION}}, {"_id": 1}):
+            return True
+        if await self.rollups_collection.find_one({}, {"_id": 1}):
+            return False
+        return await self.transactions_collection.find_one({}, {"_id": 1}) is not None
+
+    async def get_user_rollups(self, user_id: str, start_month: Optional[str] = None,
+                               include_merchants: bool = True) -> List[Dict[str, Any]]:
+        """
+        Get a user's rollups, oldest month first.
+
+        Args:
+            user_id: User ID
+            start_month: Earliest "YYYY-MM" month to include
+            include_merchants: Whether to return the merchant frequencies
+
+        Returns:
+            List of rollup documents
+        """
+        query: Dict[str, Any] = {"user_id": user_id}
+        if start_month:
+            query["month"] = {"$gte": start_month}
+        projection = None if include_merchants else {"merchants": 0}
+
+        cursor = self.rollups_collection.find(query, projection).sort("month", 1)
+        return await cursor.to_list(length=None)
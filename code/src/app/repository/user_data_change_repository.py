@@ -0,0 +1,75 @@
+import logging
+from typing import List, Dict, Any, Iterable
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Collections a meta-prompt is rendered from, other than the transactions (tracked by their rollups)
+TRACKED_COLLECTIONS = (
+    "demographic_data",
+    "account_data",
+    "credit_history",
+    "investment_data",
+    "social_media_sentiment"
+)
+
+
+class UserDataChangeRepository:
+    """
+    Repository for the user_data_changes collection.
+
+    Holds one document per user with the time any of the user's rows in
+    TRACKED_COLLECTIONS was last written, so jobs can tell whose derived
+    data is stale without scanning those collections.
+    """
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        """Initialize with database connection."""
+        self.db = database
+        self.changes_collection = database.user_data_changes
+
+    async def create_indexes(self):
+        """Create necessary indexes."""
+        await self.changes_collection.create_index("user_id", unique=True)
+
+    async def touch(self, user_ids: Iterable[str]) -> None:
+        """
+        Record that these users' data changed now.
+
+        Args:
+            user_ids: IDs of the users whose rows were written
+        """
+        if not hasattr(self.changes_collection, "bulk_write"):
+            # The mock database doesn't support bulk writes; nothing reads the changes there
+            return
+
+        user_ids = {user_id for user_id in user_ids if user_id}
+        if not user_ids:
+            return
+
+        now = datetime.utcnow()
+        await self.changes_collection.bulk_write([
+            UpdateOne({"user_id": user_id}, {"$max": {"updated_at": now}}, upsert=True)
+            for user_id in user_ids
+        ], ordered=False)
+
+    async def apply(self, records: List[Dict[str, Any]]) -> None:
+        """Record a change for the users of newly written rows."""
+        await self.touch(record.get("user_id") for record in records)
+
+    async def get_updated_at(self, user_ids: List[str]) -> Dict[str, datetime]:
+        """
+        Get when each user's data last changed.
+
+        Args:
+            user_ids: User IDs
+
+        Returns:
+            Dictionary of user ID to last change, for users with a recorded change
+        """
+        cursor = self.changes_collection.find({"user_id": {"$in": user_ids}}, {"user_id": 1, "updated_at": 1})
+        return {doc["user_id"]: doc["updated_at"] for doc in await cursor.to_list(length=None)}
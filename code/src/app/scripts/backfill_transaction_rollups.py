@@ -0,0 +1,38 @@
+"""
+Script to rebuild the transaction_rollups collection from raw transactions.
+
+Run it while no transactions are being loaded: the app's own rebuilds hold
+back its rollup updates, but those of another process would be overwritten.
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.config import settings
+from app.database.mongodb import close_mongo_connection, get_database
+from app.repository.transaction_rollup_repository import TransactionRollupRepository
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def main(user_ids=None, batch_size=None):
+    """Rebuild rollups for the given users, or for everyone."""
+    try:
+        db = await get_database()
+
+        processed = await TransactionRollupRepository(db).rebuild(user_ids=user_ids, batch_size=batch_size)
+        logger.info(f"Backfill complete: {processed} transactions folded into rollups")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild per-user monthly transaction rollups")
+    parser.add_argument("--user-id", action="append", dest="user_ids",
+                        help="Only rebuild this user (repeatable; default: all users)")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help=f"Transactions per bulk write (default: {settings.TRANSACTION_ROLLUP_BATCH_SIZE})")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.user_ids, args.batch_size))
@@ -0,0 +1,79 @@
+"""Benchmark DataProcessor.extract_transaction_insights on synthetic transactions."""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.data_processor import DataProcessor
+
+def make_transactions(rows: int, merchants: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate synthetic transactions: a quarter of the merchants are weekly or
+    monthly subscriptions with a fixed amount, the rest are irregular shops.
+    """
+    rng = np.random.default_rng(seed)
+    merchant_ids = rng.integers(0, merchants, rows)
+    subscription = merchant_ids % 4 == 0
+    weekly = merchant_ids % 8 == 0
+
+    # Subscriptions repeat on a fixed schedule; shop visits are spread over a year
+    start = pd.Timestamp("2024-01-01")
+    sequence = pd.Series(merchant_ids).groupby(merchant_ids).cumcount().to_numpy()
+    step = np.where(weekly, 7, 30)
+    days = np.where(subscription, sequence * step, rng.integers(0, 365, rows))
+
+    amounts = np.where(
+        subscription,
+        10.0 + merchant_ids % 50,
+        np.round(rng.lognormal(3.5, 1.2, rows), 2)
+    )
+
+    return pd.DataFrame({
+        "merchant": np.char.add("merchant_", merchant_ids.astype(str)),
+        "amount": amounts,
+        "date": start + pd.to_timedelta(days, unit="D"),
+        "category": rng.choice(["groceries", "dining", "travel", "utilities", "shopping"], rows),
+        "transaction_type": np.where(rng.random(rows) < 0.9, "debit", "credit")
+    })
+
+def legacy_recurring_payments(debits: pd.DataFrame) -> list:
+    """The previous per-merchant filtering loop, for comparison."""
+    recurring_payments = []
+    merchant_counts = debits['merchant'].value_counts()
+    for merchant in merchant_counts[merchant_counts > 1].index:
+        merchant_data = debits[debits['merchant'] == merchant]
+        recurring_payments.append(f"{merchant} (${round(merchant_data['amount'].mean(), 2)} monthly)")
+    return recurring_payments
+
+def timed(label: str, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<45} {time.perf_counter() - started:8.3f}s")
+    return result
+
+def main(rows: int, merchants: int, legacy_rows: int):
+    df = timed(f"generate {rows:,} transactions", make_transactions, rows, merchants)
+    processor = DataProcessor()
+
+    insights = timed("extract_transaction_insights (DataFrame)", processor.extract_transaction_insights, df)
+    records = df.to_dict("records")
+    timed("extract_transaction_insights (list of dicts)", processor.extract_transaction_insights, records)
+
+    sample = df.head(legacy_rows)
+    debits = sample[sample["transaction_type"] == "debit"]
+    timed(f"detect_recurring_payments ({legacy_rows:,} rows)", processor.detect_recurring_payments, debits)
+    timed(f"legacy per-merchant loop ({legacy_rows:,} rows)", legacy_recurring_payments, debits)
+
+    print(f"Recurring payments: {insights.get('recurring_payments')}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark transaction insight extraction")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Synthetic transactions to generate")
+    parser.add_argument("--merchants", type=int, default=20_000, help="Distinct merchants")
+    parser.add_argument("--legacy-rows", type=int, default=20_000,
+                        help="Rows used to compare against the legacy loop, which is quadratic")
+    args = parser.parse_args()
+
+    main(args.rows, args.merchants, args.legacy_rows)
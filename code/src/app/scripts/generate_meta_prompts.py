@@ -0,0 +1,39 @@
+"""Script to regenerate stored meta-prompts for all users, or only those whose data changed."""
+
+import argparse
+import asyncio
+import logging
+
+from app.config import settings
+from app.database.mongodb import close_mongo_connection, get_database
+from app.services.meta_prompt_job import MetaPromptBatchJob
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def main(user_ids=None, changed_only=False, chunk_size=None, workers=None):
+    """Run the batch meta-prompt job against the configured database."""
+    try:
+        db = await get_database()
+
+        job = MetaPromptBatchJob(db, chunk_size=chunk_size, workers=workers)
+        stats = await job.run(user_ids=user_ids, changed_only=changed_only)
+        print(f"Generated {stats['users']} meta-prompts in {stats['seconds']}s "
+              f"({stats['users_per_second']} users/s, {stats['skipped']} unchanged users skipped)")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate meta-prompts in bulk")
+    parser.add_argument("--user-id", action="append", dest="user_ids",
+                        help="Only regenerate this user (repeatable; default: all users)")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="Skip users whose stored prompt is newer than their transaction data")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help=f"Users per chunk (default: {settings.META_PROMPT_BATCH_SIZE})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"Rendering processes, 0 = render in a thread (default: {settings.META_PROMPT_WORKERS})")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.user_ids, args.changed_only, args.chunk_size, args.workers))
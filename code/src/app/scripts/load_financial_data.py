@@ -6,10 +6,10 @@ import json
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
-from motor.motor_asyncio import AsyncIOMotorClient
 import sys
 
 from app.config import settings
+from app.database.mongodb import close_mongo_connection, get_database
 from app.models.financial import InvestmentType
 from app.utils.data_loader import DataLoader
 
@@ -57,7 +57,7 @@ async def main():
     print(f"Python version: {sys.version}")
     print(f"Current directory: {os.getcwd()}")
     print(f"MONGODB_URL: {settings.MONGODB_URL}")
-    print(f"MONGODB_DB_NAME: {settings.MONGODB_DB_NAME}")
+    print(f"MONGODB_DB: {settings.MONGODB_DB}")
     print(f"Data directory: {settings.DATA_DIR}")
     
     # Check if data files exist
@@ -73,8 +73,7 @@ async def main():
     # Connect to MongoDB
     try:
         print("Connecting to MongoDB...")
-        client = AsyncIOMotorClient(settings.MONGODB_URL)
-        db = client[settings.MONGODB_DB_NAME]
+        db = await get_database()
         
         # Ping the database
         print("Pinging MongoDB...")
@@ -101,9 +100,8 @@ async def main():
     
     finally:
         # Close MongoDB connection
-        if 'client' in locals():
-            client.close()
-            print("MongoDB connection closed")
+        await close_mongo_connection()
+        print("MongoDB connection closed")
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from app.config import settings
+from app.repository.chat_repository import (
+    ChatRepository, MESSAGE_OVERHEAD_TOKENS, message_tokens, select_recent_messages
+)
+from app.services.llm_service import LLMService, get_llm_service
+from app.utils.tokens import count_tokens, truncate_to_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_MESSAGE = (
+    "You maintain a running summary of a conversation between a user and a financial assistant. "
+    "Keep the facts, figures, goals and decisions that later answers may depend on. "
+    "Write plain prose, no headings."
+)
+
+class ConversationSummarizer:
+    """
+    Keeps a rolling summary of each conversation's older messages.
+
+    Messages that no longer fit the context token budget are folded into
+    the summary once at least CONTEXT_SUMMARY_INTERVAL of them have built
+    up, so the model is called every few turns rather than on every one,
+    and only ever sees the previous summary plus the new messages.
+    """
+
+    def __init__(self, chat_repo: ChatRepository, llm_service: Optional[LLMService] = None):
+        self.chat_repo = chat_repo
+        self.llm_service = llm_service or get_llm_service()
+
+    async def refresh(self, conversation_id: str) -> bool:
+        """
+        Fold messages that have left the context window into the summary.
+
+        Args:
+            conversation_id: Conversation ID
+
+        Returns:
+            True if the summary was updated
+        """
+        if self.llm_service.provider == "mock":
+            return False
+
+        state = await self.chat_repo.get_summary_state(conversation_id)
+        messages = await self.chat_repo.get_unsummarized_messages(
+            conversation_id, state["summarized_until"], settings.CONTEXT_SUMMARY_BATCH + settings.CONTEXT_PAGE_SIZE
+        )
+
+        # Messages still inside the window stay verbatim
+        budget = settings.CONTEXT_TOKEN_BUDGET
+        if state["summary"]:
+            budget -= count_tokens(state["summary"]) + MESSAGE_OVERHEAD_TOKENS
+        in_window = len(select_recent_messages(list(reversed(messages)), budget))
+        overflow = messages[:len(messages) - in_window][:settings.CONTEXT_SUMMARY_BATCH]
+        if len(overflow) < settings.CONTEXT_SUMMARY_INTERVAL:
+            return False
+
+        summary = await self.llm_service.generate_response_for_prompt(
+            self._build_prompt(state["summary"], overflow), SUMMARY_SYSTEM_MESSAGE
+        )
+        summary = truncate_to_tokens(summary.strip(), settings.CONTEXT_SUMMARY_MAX_TOKENS)
+        if not summary:
+            return False
+
+        saved = await self.chat_repo.save_summary(
+            conversation_id, summary, overflow[-1]["created_at"], state["summarized_until"]
+        )
+        if saved:
+            logger.info(
+                f"Folded {len(overflow)} messages ({sum(message_tokens(m) for m in overflow)} tokens) "
+                f"into the summary of conversation {conversation_id}"
+            )
+        return saved
+
+    @staticmethod
+    def _build_prompt(previous_summary: Optional[str], messages: List[Dict[str, Any]]) -> str:
+        transcript = "\n".join(f"{str(m['role']).upper()}: {m['content']}" for m in messages)
+        return (
+            f"Current summary:\n{previous_summary or '(none yet)'}\n\n"
+            f"New messages:\n{transcript}\n\n"
+            f"Rewrite the summary to include the new messages, in at most "
+            f"{settings.CONTEXT_SUMMARY_MAX_TOKENS} tokens."
+        )
+
+# Summary refreshes running in the background, kept so they aren't garbage collected
+_refresh_tasks: Set[asyncio.Task] = set()
+
+def schedule_summary_refresh(chat_repo: ChatRepository, conversation_id: str) -> None:
+    """Refresh a conversation's summary in the background, after the reply has been sent."""
+    async def refresh():
+        try:
+            await ConversationSummarizer(chat_repo).refresh(conversation_id)
+        except Exception as e:
+            logger.error(f"Error updating summary for conversation {conversation_id}: {str(e)}")
+
+    task = asyncio.create_task(refresh())
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
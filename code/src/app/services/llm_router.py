@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ProviderCall = Callable[[str], Awaitable[Any]]
+
+class ProviderStats:
+    """
+    Rolling latency and error statistics for one provider, plus its circuit breaker.
+
+    The breaker opens after `failure_threshold` consecutive failures, or when
+    the error rate over the window reaches `error_rate_threshold`. Once open,
+    calls are refused for `reset_seconds`; then a single trial call is let
+    through (half-open), which closes the breaker on success or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window: Optional[int] = None,
+        failure_threshold: Optional[int] = None,
+        error_rate_threshold: Optional[float] = None,
+        min_calls: Optional[int] = None,
+        reset_seconds: Optional[float] = None
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.LLM_CIRCUIT_FAILURE_THRESHOLD
+        self.error_rate_threshold = error_rate_threshold or settings.LLM_CIRCUIT_ERROR_RATE
+        self.min_calls = min_calls or settings.LLM_CIRCUIT_MIN_CALLS
+        self.reset_seconds = settings.LLM_CIRCUIT_RESET_SECONDS if reset_seconds is None else reset_seconds
+
+        window = window or settings.LLM_ROUTER_WINDOW
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency percentile over the window, or None with too few samples."""
+        if len(self.latencies) < self.min_calls:
+            return None
+        return float(np.percentile(np.fromiter(self.latencies, dtype=float), percentile))
+
+    def available(self, now: Optional[float] = None) -> bool:
+        """Check whether a call may be sent, moving an expired open breaker to half-open."""
+        now = time.monotonic() if now is None else now
+        if self.state == self.OPEN and now - self.opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == self.HALF_OPEN:
+            return not self._trial_in_flight
+        return self.state == self.CLOSED
+
+    def on_start(self) -> None:
+        if self.state == self.HALF_OPEN:
+            self._trial_in_flight = True
+
+    def record_success(self, latency: float) -> None:
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for LLM provider {self.name} closed")
+            # Start the new closed period with a clean error history
+            self.outcomes.clear()
+            self.outcomes.append(True)
+        self.state = self.CLOSED
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+
+        sustained = len(self.outcomes) >= self.min_calls and self.error_rate >= self.error_rate_threshold
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold or sustained:
+            if self.state != self.OPEN:
+                logger.warning(
+                    f"Circuit for LLM provider {self.name} opened "
+                    f"({self.consecutive_failures} consecutive failures, error rate {self.error_rate:.0%})"
+                )
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def record_cancelled(self, elapsed: float) -> None:
+        """Record a call abandoned after a hedge won; its latency is at least `elapsed`."""
+        self.latencies.append(elapsed)
+        self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate, 3),
+            "p50_latency": self.latency_percentile(50),
+            "p95_latency": self.latency_percentile(95),
+            "calls": len(self.outcomes)
+        }
+
+class LLMRouter:
+    """
+    Routes LLM calls across providers.
+
+    Providers are tried in priority order, skipping those whose circuit is
+    open. If the first provider hasn't answered within its p95 latency, a
+    hedged duplicate is sent to the next provider and whichever answers first
+    wins; the other call is cancelled. A failed call fails over to the next
+    provider immediately.
+    """
+
+    def __init__(
+        self,
+        hedge_enabled: Optional[bool] = None,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_delay: Optional[float] = None,
+        hedge_default_delay: Optional[float] = None
+    ):
+        self.hedge_enabled = settings.LLM_HEDGE_ENABLED if hedge_enabled is None else hedge_enabled
+        self.hedge_percentile = hedge_percentile or settings.LLM_HEDGE_PERCENTILE
+        self.hedge_min_delay = settings.LLM_HEDGE_MIN_DELAY if hedge_min_delay is None else hedge_min_delay
+        self.hedge_default_delay = settings.LLM_HEDGE_DEFAULT_DELAY if hedge_default_delay is None else hedge_default_delay
+        self.stats: Dict[str, ProviderStats] = {}
+
+    def get_stats(self, provider: str) -> ProviderStats:
+        stats = self.stats.get(provider)
+        if stats is None:
+            stats = self.stats[provider] = ProviderStats(provider)
+        return stats
+
+    def ordered(self, providers: List[str]) -> List[str]:
+        """
+        Providers that may be called now, in priority order.
+        If every circuit is open, all providers are returned so a request is
+        still attempted rather than answered with a canned response.
+        """
+        now = time.monotonic()
+        available = [p for p in providers if self.get_stats(p).available(now)]
+        return available or list(providers)
+
+    def hedge_delay(self, provider: str) -> float:
+        """How long to wait for a provider before sending a hedged request."""
+        p95 = self.get_stats(provider).latency_percentile(self.hedge_percentile)
+        if p95 is None:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, p95)
+
+    async def call(self, providers: List[str], request: ProviderCall) -> Tuple[str, Any]:
+        """
+        Send a request through the router.
+
+        Args:
+            providers: Candidate provider names in priority order
+            request: Coroutine function taking a provider name
+
+        Returns:
+            Tuple of (provider that answered, its result)
+
+        Raises:
+            The last provider error if every candidate failed
+        """
+        candidates = self.ordered(providers)
+        if not candidates:
+            raise RuntimeError("No LLM providers configured")
+
+        pending: Dict[asyncio.Future, str] = {}
+        started: Dict[str, float] = {}
+        next_index = 0
+        hedged = False
+        last_error: Optional[Exception] = None
+
+        def launch() -> None:
+            nonlocal next_index
+            name = candidates[next_index]
+            next_index += 1
+            self.get_stats(name).on_start()
+            started[name] = time.monotonic()
+            pending[asyncio.ensure_future(request(name))] = name
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge_enabled and not hedged and len(pending) == 1 and next_index < len(candidates):
+                    primary = next(iter(pending.values()))
+                    timeout = max(0.0, self.hedge_delay(primary) - (time.monotonic() - started[primary]))
+
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    logger.info(f"LLM provider {next(iter(pending.values()))} is slow, hedging with {candidates[next_index]}")
+                    launch()
+                    continue
+
+                for task in done:
+                    name = pending.pop(task)
+                    stats = self.get_stats(name)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        stats.record_failure()
+                        last_error = e
+                        logger.warning(f"LLM provider {name} failed: {str(e)}")
+                        continue
+                    stats.record_success(time.monotonic() - started[name])
+                    return name, result
+
+                # Fail over once nothing is left in flight
+                if not pending and next_index < len(candidates):
+                    launch()
+
+            raise last_error
+        finally:
+            for task, name in pending.items():
+                task.cancel()
+                self.get_stats(name).record_cancelled(time.monotonic() - started[name])
+
+# Router shared by every LLMService instance, so statistics survive across requests
+_llm_router: Optional[LLMRouter] = None
+
+def get_llm_router() -> LLMRouter:
+    """
+    Get the shared LLM router instance (singleton).
+
+    Returns:
+        LLMRouter instance
+    """
+    global _llm_router
+    if _llm_router is None:
+        _llm_router = LLMRouter()
+    return _llm_router
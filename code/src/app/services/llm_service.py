@@ -1,15 +1,19 @@
 import logging
 import httpx
+import asyncio
 import json
 import os
-from typing import List, Dict, Any, Optional
-from tenacity import retry, stop_after_attempt, wait_exponential
+import time
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import openai
 
 from app.config import settings
 from app.repository.financial_repository import FinancialRepository
 from app.database import get_database
+from app.utils.http_client import get_http_client, provider_timeout
+from app.services.llm_router import get_llm_router
+from app.utils.financial_context_cache import FinancialContextEntry, get_financial_context_cache
 
 logger = logging.getLogger(__name__)
 
@@ -23,27 +27,36 @@ class LLMService:
         self.openai_api_key = settings.OPENAI_API_KEY
         self.google_api_key = os.environ.get("GOOGLE_API_KEY") or getattr(settings, "GOOGLE_API_KEY", None)
         
-        # Default to mock provider if no valid API keys
+        # Every provider with a valid API key, in priority order; the router
+        # picks between them per request based on health and latency
+        self.providers: Dict[str, Dict[str, str]] = {}
+        if self.google_api_key and self.google_api_key != "your-google-api-key":
+            self.providers["google"] = {
+                "model": "gemini-1.5-flash",  # Using a newer model that exists in the API
+                "api_url": "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+            }
+        if self.mistral_api_key and self.mistral_api_key != "your-mistral-api-key":
+            self.providers["mistral"] = {
+                "model": "mistral-tiny",  # Using Mistral's smallest model for reliability
+                "api_url": "https://api.mistral.ai/v1/chat/completions"
+            }
+        if self.openai_api_key and self.openai_api_key != "your-openai-api-key":
+            self.providers["openai"] = {
+                "model": getattr(settings, "OPENAI_MODEL", None) or "gpt-3.5-turbo",
+                "api_url": "https://api.openai.com/v1/chat/completions"
+            }
+        
+        self.router = get_llm_router()
+        
+        # The primary provider; mock if no valid API keys
         self.provider = "mock"
         self.model = "mock"
         self.api_url = None
-        
-        # Set model and API URL based on provider - prioritize available APIs
-        if self.google_api_key and self.google_api_key != "your-google-api-key":
-            self.provider = "google"
-            self.model = "gemini-1.5-flash"  # Using a newer model that exists in the API
-            self.api_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
-            logger.info(f"Configured to use Google Gemini API with model: {self.model}")
-        elif self.mistral_api_key and self.mistral_api_key != "your-mistral-api-key":
-            self.provider = "mistral"
-            self.model = "mistral-tiny"  # Using Mistral's smallest model for reliability
-            self.api_url = "https://api.mistral.ai/v1/chat/completions"
-            logger.info(f"Configured to use Mistral AI API with model: {self.model}")
-        elif self.openai_api_key and self.openai_api_key != "your-openai-api-key":
-            self.provider = "openai"
-            self.model = getattr(settings, "OPENAI_MODEL", None) or "gpt-3.5-turbo"
-            self.api_url = "https://api.openai.com/v1/chat/completions"
-            logger.info(f"Configured to use OpenAI API with model: {self.model}")
+        if self.providers:
+            self.provider = next(iter(self.providers))
+            self.model = self.providers[self.provider]["model"]
+            self.api_url = self.providers[self.provider]["api_url"]
+            logger.info(f"Configured LLM providers: {', '.join(self.providers)}")
         else:
             logger.warning("No valid API keys found. Using mock LLM responses.")
         
@@ -54,11 +67,14 @@ class LLMService:
         # Log provider info
         logger.info(f"Using LLM provider: {self.provider} with model: {self.model}")
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     async def generate_response(self, messages: List[Dict[str, str]]) -> str:
         """
         Generate a response from the language model.
         
+        The request is routed across the configured providers: unhealthy
+        providers are skipped, a failed call fails over to the next one and,
+        if hedging is enabled, a slow call is raced against the next provider.
+        
         Args:
             messages: List of message dictionaries with 'role' and 'content' keys
             
@@ -66,175 +82,296 @@ class LLMService:
             The generated response text
         """
         # If using mock responses, return a predefined response based on input
-        if self.provider == "mock":
+        if not self.providers:
             return self._generate_mock_response(messages)
         
-        # Set a timeout for all API calls
-        timeout = 30.0  # seconds
-        
         try:
-            # Make the API call based on provider
-            if self.provider == "openai":
-                return await self._call_openai_api(messages, timeout)
-            elif self.provider == "mistral":
-                return await self._call_mistral_api(messages, timeout)
-            elif self.provider == "google":
-                return await self._call_google_api(messages, timeout)
-            else:
-                logger.error(f"Unsupported provider: {self.provider}")
-                # Fall back to mock responses
-                return self._generate_mock_response(messages)
+            provider, response = await self.router.call(
+                list(self.providers),
+                lambda name: self._call_provider(name, messages)
+            )
+            logger.debug(f"LLM response served by {provider}")
+            return response
                 
         except Exception as e:
-            logger.error(f"Error generating LLM response: {str(e)}", exc_info=True)
-            
-            # Try to fall back to another provider if available
-            if self.provider != "mock":
-                logger.info(f"Attempting fallback from {self.provider} to mock provider")
-                return self._generate_mock_response(messages)
-            else:
-                # Return a fallback response
-                return "I apologize, but I encountered an issue while processing your request. Please try again later."
-    
-    async def _call_openai_api(self, messages: List[Dict[str, str]], timeout: float) -> str:
-        """Call the OpenAI API."""
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.openai_api_key}"
-            }
-            
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": self.max_tokens,
-                "temperature": self.temperature,
-            }
-            
-            response = await client.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=timeout
-            )
-            
-            response.raise_for_status()
-            result = response.json()
+            logger.error(f"Error generating LLM response from every provider: {str(e)}", exc_info=True)
             
-            if "choices" in result and len(result["choices"]) > 0:
-                return result["choices"][0]["message"]["content"].strip()
-            else:
-                logger.error(f"Unexpected API response format: {result}")
-                return "I apologize, but I encountered an issue while processing your request."
+            # Only serve mock answers when no provider could answer
+            logger.info("Attempting fallback to mock provider")
+            return self._generate_mock_response(messages)
+    
+    async def _call_provider(self, provider: str, messages: List[Dict[str, str]]) -> str:
+        """Call one provider with its own connect/read timeouts."""
+        timeout = provider_timeout(provider)
+        if provider == "openai":
+            return await self._call_openai_api(messages, timeout)
+        elif provider == "mistral":
+            return await self._call_mistral_api(messages, timeout)
+        elif provider == "google":
+            return await self._call_google_api(messages, timeout)
+        raise ValueError(f"Unsupported provider: {provider}")
     
-    async def _call_mistral_api(self, messages: List[Dict[str, str]], timeout: float) -> str:
+    async def _call_openai_api(self, messages: List[Dict[str, str]], timeout: httpx.Timeout) -> str:
+        """Call the OpenAI API."""
+        client = get_http_client()
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.openai_api_key}"
+        }
+        
+        config = self.providers["openai"]
+        payload = {
+            "model": config["model"],
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+        }
+        
+        response = await client.post(
+            config["api_url"],
+            headers=headers,
+            json=payload,
+            timeout=timeout
+        )
+        
+        response.raise_for_status()
+        result = response.json()
+        
+        if "choices" in result and len(result["choices"]) > 0:
+            return result["choices"][0]["message"]["content"].strip()
+        raise ValueError(f"Unexpected OpenAI API response format: {result}")
+
+    async def _call_mistral_api(self, messages: List[Dict[str, str]], timeout: httpx.Timeout) -> str:
         """Call the Mistral AI API."""
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            headers = {
-                "Authorization": f"Bearer {self.mistral_api_key}",
-                "Content-Type": "application/json"
-            }
+        client = get_http_client()
+        headers = {
+            "Authorization": f"Bearer {self.mistral_api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        config = self.providers["mistral"]
+        payload = {
+            "model": config["model"],
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+        }
+        
+        response = await client.post(
+            config["api_url"],
+            headers=headers,
+            json=payload,
+            timeout=timeout
+        )
+        
+        response.raise_for_status()
+        result = response.json()
+        
+        if "choices" in result and len(result["choices"]) > 0:
+            if "message" in result["choices"][0] and "content" in result["choices"][0]["message"]:
+                return result["choices"][0]["message"]["content"].strip()
+        
+        raise ValueError(f"Unexpected Mistral API response format: {result}")
+
+    def _google_payload(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Build a Gemini request body from chat messages."""
+        # Format messages for Gemini API
+        formatted_messages = []
+        for msg in messages:
+            role = msg["role"]
+            content = msg["content"]
             
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": self.max_tokens,
+            if role == "system":
+                # Gemini doesn't have system messages, so we'll add it as a user message
+                formatted_messages.append({
+                    "role": "user",
+                    "parts": [{"text": f"SYSTEM INSTRUCTION: {content}"}]
+                })
+            elif role == "user":
+                formatted_messages.append({
+                    "role": "user", 
+                    "parts": [{"text": content}]
+                })
+            elif role == "assistant":
+                formatted_messages.append({
+                    "role": "model",
+                    "parts": [{"text": content}]
+                })
+        
+        # If only system message exists, add an empty user message
+        if len(formatted_messages) == 1 and messages[0]["role"] == "system":
+            formatted_messages.append({
+                "role": "user",
+                "parts": [{"text": "Hello, please help me with financial advice."}]
+            })
+            
+        payload = {
+            "contents": formatted_messages,
+            "generationConfig": {
+                "maxOutputTokens": self.max_tokens,
                 "temperature": self.temperature,
             }
-            
+        }
+        return payload
+    
+    async def _call_google_api(self, messages: List[Dict[str, str]], timeout: httpx.Timeout) -> str:
+        """Call the Google Gemini API."""
+        api_url = self.providers["google"]["api_url"]
+        # Add debug info for the Google API call
+        logger.debug(f"Making Google API call with key: {self.google_api_key[:5]}...{self.google_api_key[-4:]} to URL: {api_url}")
+        
+        client = get_http_client()
+        payload = self._google_payload(messages)
+        
+        # Log the payload for debugging
+        logger.debug(f"Google API payload: {json.dumps(payload)}")
+        
+        api_url_with_key = f"{api_url}?key={self.google_api_key}"
+        
+        try:
             response = await client.post(
-                self.api_url,
-                headers=headers,
+                api_url_with_key,
                 json=payload,
                 timeout=timeout
             )
             
             response.raise_for_status()
             result = response.json()
+        except Exception as e:
+            if hasattr(e, 'response') and e.response is not None:
+                logger.error(f"Google API response status: {e.response.status_code}, body: {e.response.text}")
+            raise
+        
+        logger.debug(f"Google API response status: {response.status_code}")
+        
+        if "candidates" in result and len(result["candidates"]) > 0:
+            candidate = result["candidates"][0]
+            if "content" in candidate and "parts" in candidate["content"]:
+                parts = candidate["content"]["parts"]
+                if parts and "text" in parts[0]:
+                    return parts[0]["text"].strip()
+        
+        # Raise so the router records the failure and tries another provider
+        raise ValueError(f"Unexpected Google API response format: {result}")
+
+    async def stream_response(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """
+        Stream a response from the language model as it is generated.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content' keys
             
-            if "choices" in result and len(result["choices"]) > 0:
-                if "message" in result["choices"][0] and "content" in result["choices"][0]["message"]:
-                    return result["choices"][0]["message"]["content"].strip()
-            
-            logger.error(f"Unexpected Mistral API response format: {result}")
-            return "I apologize, but I encountered an issue while processing your request."
-    
-    async def _call_google_api(self, messages: List[Dict[str, str]], timeout: float) -> str:
-        """Call the Google Gemini API."""
-        # Add debug info for the Google API call
-        logger.debug(f"Making Google API call with key: {self.google_api_key[:5]}...{self.google_api_key[-4:]} to URL: {self.api_url}")
-        
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            # Format messages for Gemini API
-            formatted_messages = []
-            for msg in messages:
-                role = msg["role"]
-                content = msg["content"]
-                
-                if role == "system":
-                    # Gemini doesn't have system messages, so we'll add it as a user message
-                    formatted_messages.append({
-                        "role": "user",
-                        "parts": [{"text": f"SYSTEM INSTRUCTION: {content}"}]
-                    })
-                elif role == "user":
-                    formatted_messages.append({
-                        "role": "user", 
-                        "parts": [{"text": content}]
-                    })
-                elif role == "assistant":
-                    formatted_messages.append({
-                        "role": "model",
-                        "parts": [{"text": content}]
-                    })
-            
-            # If only system message exists, add an empty user message
-            if len(formatted_messages) == 1 and messages[0]["role"] == "system":
-                formatted_messages.append({
-                    "role": "user",
-                    "parts": [{"text": "Hello, please help me with financial advice."}]
-                })
-                
-            payload = {
-                "contents": formatted_messages,
-                "generationConfig": {
-                    "maxOutputTokens": self.max_tokens,
-                    "temperature": self.temperature,
-                }
-            }
-            
-            # Log the payload for debugging
-            logger.debug(f"Google API payload: {json.dumps(payload)}")
-            
-            api_url_with_key = f"{self.api_url}?key={self.google_api_key}"
-            
+        Yields:
+            Text fragments in generation order
+        """
+        if not self.providers:
+            for chunk in self._chunk_text(self._generate_mock_response(messages)):
+                yield chunk
+            return
+        
+        # Fail over between providers until one starts producing text
+        for provider in self.router.ordered(list(self.providers)):
+            stats = self.router.get_stats(provider)
+            stats.on_start()
+            started_at = time.monotonic()
+            started = False
+            recorded = False
             try:
-                response = await client.post(
-                    api_url_with_key,
-                    json=payload,
-                    timeout=timeout
-                )
-                
-                response.raise_for_status()
-                result = response.json()
+                timeout = provider_timeout(provider)
+                if provider == "google":
+                    fragments = self._stream_google_api(messages, timeout)
+                else:
+                    fragments = self._stream_chat_completions_api(provider, messages, timeout)
                 
-                logger.debug(f"Google API response status: {response.status_code}")
+                async for fragment in fragments:
+                    started = True
+                    yield fragment
                 
-                if "candidates" in result and len(result["candidates"]) > 0:
-                    candidate = result["candidates"][0]
-                    if "content" in candidate and "parts" in candidate["content"]:
-                        parts = candidate["content"]["parts"]
-                        if parts and "text" in parts[0]:
-                            return parts[0]["text"].strip()
+                stats.record_success(time.monotonic() - started_at)
+                recorded = True
+                return
                 
-                logger.error(f"Unexpected Google API response format: {result}")
             except Exception as e:
-                logger.error(f"Error calling Google API: {str(e)}", exc_info=True)
-                if hasattr(e, 'response') and e.response is not None:
-                    logger.error(f"Response status: {e.response.status_code}")
-                    logger.error(f"Response body: {e.response.text}")
-            
-            return "I apologize, but I encountered an issue while processing your request with the Google API."
+                stats.record_failure()
+                recorded = True
+                logger.error(f"Error streaming LLM response from {provider}: {str(e)}", exc_info=True)
+                # Once text has been sent it can't be taken back
+                if started:
+                    raise
+            finally:
+                # The client went away (GeneratorExit/CancelledError): release a half-open trial
+                if not recorded:
+                    stats.record_cancelled(time.monotonic() - started_at)
+        
+        logger.info("Every LLM provider failed, falling back to mock provider")
+        for chunk in self._chunk_text(self._generate_mock_response(messages)):
+            yield chunk
+    
+    async def _stream_chat_completions_api(self, provider: str, messages: List[Dict[str, str]], timeout: httpx.Timeout) -> AsyncIterator[str]:
+        """Stream from an OpenAI-compatible chat completions API (OpenAI, Mistral)."""
+        config = self.providers[provider]
+        api_key = self.openai_api_key if provider == "openai" else self.mistral_api_key
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+            "Accept": "text/event-stream"
+        }
+        
+        payload = {
+            "model": config["model"],
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "stream": True,
+        }
+        
+        client = get_http_client()
+        async with client.stream("POST", config["api_url"], headers=headers, json=payload, timeout=timeout) as response:
+            response.raise_for_status()
+            async for data in self._iter_sse_data(response):
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                if not chunk.get("choices"):
+                    continue
+                content = chunk["choices"][0].get("delta", {}).get("content")
+                if content:
+                    yield content
+    
+    async def _stream_google_api(self, messages: List[Dict[str, str]], timeout: httpx.Timeout) -> AsyncIterator[str]:
+        """Stream from the Gemini streamGenerateContent API."""
+        stream_url = self.providers["google"]["api_url"].replace(":generateContent", ":streamGenerateContent")
+        payload = self._google_payload(messages)
+        params = {"alt": "sse", "key": self.google_api_key}
+        
+        client = get_http_client()
+        async with client.stream("POST", stream_url, params=params, json=payload, timeout=timeout) as response:
+            response.raise_for_status()
+            async for data in self._iter_sse_data(response):
+                chunk = json.loads(data)
+                for candidate in chunk.get("candidates", [])[:1]:
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            yield part["text"]
+    
+    @staticmethod
+    async def _iter_sse_data(response: httpx.Response) -> AsyncIterator[str]:
+        """Yield the data field of each Server-Sent Event in a streaming response."""
+        data_lines: List[str] = []
+        async for line in response.aiter_lines():
+            if line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+            elif not line and data_lines:
+                # A blank line ends the event
+                yield "\n".join(data_lines)
+                data_lines = []
+        if data_lines:
+            yield "\n".join(data_lines)
+    
+    @staticmethod
+    def _chunk_text(text: str) -> List[str]:
+        """Split a complete response into word-sized fragments for streaming."""
+        return [word + " " for word in text.split(" ")[:-1]] + [text.split(" ")[-1]]
     
     def _generate_mock_response(self, messages: List[Dict[str, str]]) -> str:
         """Generate a mock response when no API key is available."""
@@ -320,51 +457,53 @@ class LLMService:
             if self.provider == "mistral":
                 # Test Mistral API key
                 test_message = [{"role": "user", "content": "Hello"}]
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    headers = {
-                        "Content-Type": "application/json",
-                        "Authorization": f"Bearer {self.mistral_api_key}"
-                    }
-                    
-                    payload = {
-                        "model": self.model,
-                        "messages": test_message,
-                        "max_tokens": 10,  # Minimal tokens for test
-                    }
-                    
-                    response = await client.post(
-                        self.api_url,
-                        headers=headers,
-                        json=payload
-                    )
-                    
-                    if response.status_code == 200:
-                        logger.info("Mistral API key is valid!")
-                        return True
-                    else:
-                        logger.error(f"Mistral API key test failed with status: {response.status_code}")
-                        logger.error(f"Response: {response.text}")
-                        return False
-                    
+                client = get_http_client()
+                headers = {
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.mistral_api_key}"
+                }
+                
+                payload = {
+                    "model": self.model,
+                    "messages": test_message,
+                    "max_tokens": 10,  # Minimal tokens for test
+                }
+                
+                response = await client.post(
+                    self.api_url,
+                    headers=headers,
+                    json=payload,
+                    timeout=10.0
+                )
+                
+                if response.status_code == 200:
+                    logger.info("Mistral API key is valid!")
+                    return True
+                else:
+                    logger.error(f"Mistral API key test failed with status: {response.status_code}")
+                    logger.error(f"Response: {response.text}")
+                    return False
+                
             elif self.provider == "openai":
                 # Test OpenAI API key
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    headers = {
-                        "Authorization": f"Bearer {self.openai_api_key}"
-                    }
-                    
-                    response = await client.get(
-                        "https://api.openai.com/v1/models",
-                        headers=headers
-                    )
-                    
-                    if response.status_code == 200:
-                        logger.info("OpenAI API key is valid!")
-                        return True
-                    else:
-                        logger.error(f"OpenAI API key test failed with status: {response.status_code}")
-                        return False
-        
+                client = get_http_client()
+                headers = {
+                    "Authorization": f"Bearer {self.openai_api_key}"
+                }
+                
+                response = await client.get(
+                    "https://api.openai.com/v1/models",
+                    headers=headers,
+                    timeout=10.0
+                )
+                
+                if response.status_code == 200:
+                    logger.info("OpenAI API key is valid!")
+                    return True
+                else:
+                    logger.error(f"OpenAI API key test failed with status: {response.status_code}")
+                    return False
+
         except Exception as e:
             logger.error(f"Error testing API key: {str(e)}")
             return False
@@ -384,10 +523,103 @@ def get_llm_service() -> LLMService:
         _llm_service = LLMService()
     return _llm_service
 
+async def _load_financial_context(user_id: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Load a user's financial context from the database.
+    
+    The repository calls are independent, so they run concurrently.
+    
+    Args:
+        user_id: User ID
+        
+    Returns:
+        Tuple of (context, complete); complete is False if any part fell back
+        to placeholder values and the context should not be cached
+    """
+    db = get_database()
+    if db is None:
+        logger.warning("Database connection not available for financial context generation")
+        return {"note": "No financial data available"}, False
+    
+    # Create a simple fallback context in case the database access fails
+    fallback_context = {
+        "demographics": {
+            "user_id": user_id,
+            "name": "User",
+            "age": 35,
+            "occupation": "Professional",
+            "income_bracket": "Middle"
+        },
+        "account": {
+            "account_id": "default",
+            "balance": 10000,
+            "account_type": "Checking",
+            "opened_date": datetime.utcnow().isoformat()
+        },
+        "credit_history": None,
+        "investments": [],
+        "transactions": []
+    }
+    
+    try:
+        financial_repo = FinancialRepository(db)
+        
+        # Get financial data - use fallback values if any step fails
+        demographics, account, credit_history, investment_summary, transaction_summary = await asyncio.gather(
+            financial_repo.get_user_demographics(user_id),
+            financial_repo.get_user_account(user_id),
+            financial_repo.get_user_credit_history(user_id),
+            financial_repo.get_investment_summary(user_id),
+            financial_repo.get_transaction_summary(user_id),
+            return_exceptions=True
+        )
+    except Exception as repo_error:
+        logger.error(f"Error using FinancialRepository: {str(repo_error)}")
+        return fallback_context, False
+    
+    complete = True
+    for name, result in [("demographics", demographics), ("account", account), ("credit history", credit_history),
+                         ("investments", investment_summary), ("transactions", transaction_summary)]:
+        if isinstance(result, Exception):
+            logger.warning(f"Error getting {name}: {str(result)}")
+            complete = False
+    
+    if isinstance(demographics, Exception) or not demographics:
+        demographics_data = fallback_context["demographics"]
+    else:
+        demographics_data = demographics.dict()
+    
+    if isinstance(account, Exception) or not account:
+        account_data = fallback_context["account"]
+    else:
+        account_data = account.dict()
+    
+    credit_history_data = None if isinstance(credit_history, Exception) or not credit_history else credit_history.dict()
+    
+    # Combine data into context
+    context = {
+        "demographics": demographics_data,
+        "account": account_data,
+        "credit_history": credit_history_data,
+        "investments": [] if isinstance(investment_summary, Exception) else investment_summary,
+        "transactions": [] if isinstance(transaction_summary, Exception) else transaction_summary
+    }
+    
+    return context, complete
+
+
+async def _get_financial_context_entry(user_id: str) -> FinancialContextEntry:
+    """Get a user's financial context through the per-user TTL cache."""
+    return await get_financial_context_cache().get_or_load(user_id, _load_financial_context)
+
+
 async def generate_financial_context(user_id: str) -> Dict[str, Any]:
     """
     Generate financial context for a user.
     
+    Contexts are cached per user for settings.CACHE_TTL seconds and dropped
+    when the user's investments, transactions or account change.
+    
     Args:
         user_id: User ID
         
@@ -395,82 +627,8 @@ async def generate_financial_context(user_id: str) -> Dict[str, Any]:
         Dictionary with financial context
     """
     try:
-        db = get_database()
-        if not db:
-            logger.warning("Database connection not available for financial context generation")
-            return {"note": "No financial data available"}
-        
-        # Create a simple fallback context in case the database access fails
-        fallback_context = {
-            "demographics": {
-                "user_id": user_id,
-                "name": "User",
-                "age": 35,
-                "occupation": "Professional",
-                "income_bracket": "Middle"
-            },
-            "account": {
-                "account_id": "default",
-                "balance": 10000,
-                "account_type": "Checking",
-                "opened_date": datetime.utcnow().isoformat()
-            },
-            "credit_history": None,
-            "investments": [],
-            "transactions": []
-        }
-            
-        try:
-            financial_repo = FinancialRepository(db)
-            
-            # Get financial data - use fallback values if any step fails
-            try:
-                demographics = await financial_repo.get_user_demographics(user_id)
-                demographics_data = demographics.dict() if demographics else fallback_context["demographics"]
-            except Exception as e:
-                logger.warning(f"Error getting demographics: {str(e)}")
-                demographics_data = fallback_context["demographics"]
-                
-            try:
-                account = await financial_repo.get_user_account(user_id)
-                account_data = account.dict() if account else fallback_context["account"]
-            except Exception as e:
-                logger.warning(f"Error getting account: {str(e)}")
-                account_data = fallback_context["account"]
-                
-            try:
-                credit_history = await financial_repo.get_user_credit_history(user_id)
-                credit_history_data = credit_history.dict() if credit_history else None
-            except Exception as e:
-                logger.warning(f"Error getting credit history: {str(e)}")
-                credit_history_data = None
-                
-            try:
-                investment_summary = await financial_repo.get_investment_summary(user_id)
-            except Exception as e:
-                logger.warning(f"Error getting investments: {str(e)}")
-                investment_summary = []
-                
-            try:
-                transaction_summary = await financial_repo.get_transaction_summary(user_id)
-            except Exception as e:
-                logger.warning(f"Error getting transactions: {str(e)}")
-                transaction_summary = []
-            
-            # Combine data into context
-            context = {
-                "demographics": demographics_data,
-                "account": account_data,
-                "credit_history": credit_history_data,
-                "investments": investment_summary,
-                "transactions": transaction_summary
-            }
-            
-            return context
-        except Exception as repo_error:
-            logger.error(f"Error using FinancialRepository: {str(repo_error)}")
-            return fallback_context
-            
+        entry = await _get_financial_context_entry(user_id)
+        return entry.context
     except Exception as e:
         logger.exception(f"Error generating financial context: {str(e)}")
         return {"note": "Error retrieving financial data"}
@@ -487,8 +645,12 @@ async def generate_system_prompt(user_id: str) -> str:
         System prompt string
     """
     try:
-        # Get financial context
-        context = await generate_financial_context(user_id)
+        # Get financial context, rendered once per cache entry
+        try:
+            profile = (await _get_financial_context_entry(user_id)).rendered
+        except Exception as e:
+            logger.exception(f"Error generating financial context: {str(e)}")
+            profile = json.dumps({"note": "Error retrieving financial data"})
         
         # Create system prompt
         system_prompt = f"""
@@ -496,7 +658,7 @@ async def generate_system_prompt(user_id: str) -> str:
         Your goal is to provide helpful, informative, and personalized financial advice.
         
         USER FINANCIAL PROFILE:
-        {json.dumps(context, indent=2)}
+        {profile}
         
         INSTRUCTIONS:
         1. Be professional but conversational and friendly in your responses.
@@ -522,6 +684,44 @@ async def generate_system_prompt(user_id: str) -> str:
         """
 
 
+async def build_llm_messages(conversation_context: List[Dict[str, str]], user_id: str) -> List[Dict[str, str]]:
+    """
+    Build the messages for an LLM call: the personalized system prompt
+    followed by the conversation so far.
+    
+    Args:
+        conversation_context: Previous messages in the conversation
+        user_id: User ID for personalization
+        
+    Returns:
+        List of message dictionaries
+    """
+    # Generate system prompt with financial context
+    system_prompt = await generate_system_prompt(user_id)
+    
+    # Prepare messages for API call
+    messages = [
+        {"role": "system", "content": system_prompt}
+    ]
+    
+    # Add conversation context - handle empty context gracefully
+    if conversation_context and isinstance(conversation_context, list):
+        messages.extend(conversation_context)
+    else:
+        logger.warning("Empty or invalid conversation context provided")
+    
+    # Log the prompt for debugging
+    logger.info("==== SYSTEM PROMPT ====")
+    logger.info(system_prompt)
+    logger.info("==== USER CONVERSATION ====")
+    for msg in conversation_context or []:
+        if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
+            logger.info(f"{msg['role'].upper()}: {msg['content']}")
+    logger.info("========================")
+    
+    return messages
+
+
 async def generate_llm_response(conversation_context: List[Dict[str, str]], user_id: str) -> str:
     """
     Generate a response using the language model.
@@ -536,29 +736,7 @@ async def generate_llm_response(conversation_context: List[Dict[str, str]], user
     # Initialize service
     try:
         llm_service = LLMService()
-        
-        # Generate system prompt with financial context
-        system_prompt = await generate_system_prompt(user_id)
-        
-        # Prepare messages for API call
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
-        
-        # Add conversation context - handle empty context gracefully
-        if conversation_context and isinstance(conversation_context, list):
-            messages.extend(conversation_context)
-        else:
-            logger.warning("Empty or invalid conversation context provided")
-        
-        # Log the prompt for debugging
-        logger.info("==== SYSTEM PROMPT ====")
-        logger.info(system_prompt)
-        logger.info("==== USER CONVERSATION ====")
-        for msg in conversation_context:
-            if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
-                logger.info(f"{msg['role'].upper()}: {msg['content']}")
-        logger.info("========================")
+        messages = await build_llm_messages(conversation_context, user_id)
         
         # Generate response
         logger.info(f"Generating response with model: {llm_service.model}")
@@ -567,4 +745,23 @@ async def generate_llm_response(conversation_context: List[Dict[str, str]], user
         
     except Exception as e:
         logger.exception(f"Error generating LLM response: {str(e)}")
-        return "I apologize, but I encountered an error while processing your request. Please try again later." 
\ No newline at end of file
+        return "I apologize, but I encountered an error while processing your request. Please try again later."
+
+
+async def stream_llm_response(conversation_context: List[Dict[str, str]], user_id: str) -> AsyncIterator[str]:
+    """
+    Stream a response using the language model.
+    
+    Args:
+        conversation_context: Previous messages in the conversation
+        user_id: User ID for personalization
+        
+    Yields:
+        Text fragments as they are generated
+    """
+    llm_service = get_llm_service()
+    messages = await build_llm_messages(conversation_context, user_id)
+    
+    logger.info(f"Streaming response with model: {llm_service.model}")
+    async for fragment in llm_service.stream_response(messages):
+        yield fragment
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.models.meta_prompt_generator import MetaPromptGenerator, TRANSACTION_LIST_LIMIT
+from app.repository.transaction_rollup_repository import month_key
+from app.repository.user_data_change_repository import UserDataChangeRepository
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Single-document collections, keyed the way _gather_user_data names them
+SINGLE_COLLECTIONS = {
+    "demographic_data": "demographics",
+    "account_data": "account",
+    "credit_history": "credit"
+}
+
+def render_meta_prompts(items: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, str]]:
+    """
+    Render meta-prompts for a slice of users (runs in a worker process).
+
+    Args:
+        items: List of (user_id, user_data) pairs
+
+    Returns:
+        List of (user_id, prompt_text) pairs
+    """
+    return [(user_id, MetaPromptGenerator.render_meta_prompt(user_id, user_data)) for user_id, user_data in items]
+
+def create_render_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool for render_meta_prompts."""
+    # Spawned workers don't inherit the event loop or database client threads
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+class MetaPromptBatchJob:
+    """
+    Regenerates stored meta-prompts for many users at once.
+
+    Users are streamed in chunks. Each chunk's data is prefetched with one
+    $in query per collection, prompts are rendered in a process pool, and
+    the results are bulk-upserted into meta_prompts. The pool is created
+    per run unless one is passed in, which the caller then owns.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, chunk_size: Optional[int] = None, workers: Optional[int] = None,
+                 executor: Optional[Executor] = None):
+        self.db = db
+        self.chunk_size = chunk_size or settings.META_PROMPT_BATCH_SIZE
+        self.workers = settings.META_PROMPT_WORKERS if workers is None else workers
+        self.executor = executor
+        self.data_changes = UserDataChangeRepository(db)
+
+    async def run(self, user_ids: Optional[List[str]] = None, changed_only: bool = False) -> Dict[str, Any]:
+        """
+        Regenerate meta-prompts.
+
+        Args:
+            user_ids: Only these users (all users if None)
+            changed_only: Skip users whose stored prompt is newer than all of their data
+
+        Returns:
+            Dictionary with users processed, users skipped, elapsed seconds and users per second
+        """
+        started = time.perf_counter()
+        processed = 0
+        skipped = 0
+
+        executor = self.executor
+        owns_executor = executor is None and self.workers > 0
+        if owns_executor:
+            executor = create_render_pool(self.workers)
+        try:
+            async for chunk in self._iter_user_chunks(user_ids):
+                if changed_only:
+                    changed = await self._changed_users(chunk)
+                    skipped += len(chunk) - len(changed)
+                    chunk = changed
+                if not chunk:
+                    continue
+
+                user_data = await self._prefetch(chunk)
+                prompts = await self._render(list(user_data.items()), executor)
+                await self._save(prompts)
+
+                processed += len(prompts)
+                elapsed = time.perf_counter() - started
+                logger.info(f"Meta-prompts: {processed} users done ({processed / elapsed:.1f} users/s)")
+        finally:
+            if owns_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            "users": processed,
+            "skipped": skipped,
+            "seconds": round(elapsed, 2),
+            "users_per_second": round(processed / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        logger.info(f"Meta-prompt batch finished: {stats}")
+        return stats
+
+    async def _iter_user_chunks(self, user_ids: Optional[List[str]]) -> AsyncIterator[List[str]]:
+        """Yield user IDs in chunks, streaming them from the users collection if not given."""
+        if user_ids is not None:
+            for i in range(0, len(user_ids), self.chunk_size):
+                yield user_ids[i:i + self.chunk_size]
+            return
+
+        chunk = []
+        async for user in self.db.users.find({}, {"user_id": 1}).batch_size(self.chunk_size):
+            if user.get("user_id"):
+                chunk.append(user["user_id"])
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    async def _changed_users(self, user_ids: List[str]) -> List[str]:
+        """Users with no stored prompt, or whose rollups or other data changed after it was generated."""
+        query = {"user_id": {"$in": user_ids}}
+        generated = {
+            doc["user_id"]: doc.get("updated_at")
+            for doc in await self.db.meta_prompts.find(query, {"user_id": 1, "updated_at": 1}).to_list(length=None)
+        }
+        data_updated = {
+            doc["_id"]: doc["updated_at"]
+            for doc in await self.db.transaction_rollups.aggregate([
+                {"$match": query},
+                {"$group": {"_id": "$user_id", "updated_at": {"$max": "$updated_at"}}}
+            ]).to_list(length=None)
+        }
+        for user_id, updated_at in (await self.data_changes.get_updated_at(user_ids)).items():
+            if data_updated.get(user_id) is None or updated_at > data_updated[user_id]:
+                data_updated[user_id] = updated_at
+        return [
+            user_id for user_id in user_ids
+            if generated.get(user_id) is None
+            or (data_updated.get(user_id) is not None and data_updated[user_id] > generated[user_id])
+        ]
+
+    async def _prefetch(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Load a chunk's data from every collection with one $in query each.
+
+        Returns:
+            Dictionary of user ID to user data, shaped like MetaPromptGenerator._gather_user_data
+        """
+        in_chunk = {"$in": user_ids}
+        thirty_days_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        recent = {"user_id": in_chunk, "date": {"$gte": thirty_days_ago}}
+
+        queries = {
+            "demographics": self.db.demographic_data.find({"user_id": in_chunk}),
+            "account": self.db.account_data.find({"user_id": in_chunk}),
+            "credit": self.db.credit_history.find({"user_id": in_chunk}),
+            "investments": self.db.investment_data.find({"user_id": in_chunk}),
+            "transactions": self.db.transaction_data.find(recent).sort("date", -1),
+            "social_media": self.db.social_media_sentiment.find(recent).sort("date", -1)
+        }
+        if settings.META_PROMPT_ROLLUPS_ENABLED:
+            queries["transaction_rollups"] = self.db.transaction_rollups.find(
+                {"user_id": in_chunk, "month": {"$gte": month_key(thirty_days_ago)}}, {"merchants": 0}
+            ).sort("month", 1)
+
+        results = await asyncio.gather(*(cursor.to_list(length=None) for cursor in queries.values()))
+
+        user_data: Dict[str, Dict[str, Any]] = {user_id: {} for user_id in user_ids}
+        for key, docs in zip(queries, results):
+            for doc in docs:
+                data = user_data.get(doc.get("user_id"))
+                if data is None:
+                    continue
+                if key in SINGLE_COLLECTIONS.values():
+                    data.setdefault(key, doc)
+                else:
+                    data.setdefault(key, []).append(doc)
+
+        if settings.META_PROMPT_ROLLUPS_ENABLED:
+            # Only the most recent transactions are listed when insights come from rollups
+            for data in user_data.values():
+                if "transactions" in data:
+                    data["transactions"] = data["transactions"][:TRANSACTION_LIST_LIMIT]
+
+        return user_data
+
+    async def _render(self, items: List[Tuple[str, Dict[str, Any]]], executor: Optional[Executor]) -> List[Tuple[str, str]]:
+        """Render a chunk's prompts, split across the worker processes."""
+        if executor is None:
+            return await asyncio.to_thread(render_meta_prompts, items)
+
+        loop = asyncio.get_running_loop()
+        size = max(1, -(-len(items) // self.workers))
+        slices = [items[i:i + size] for i in range(0, len(items), size)]
+        rendered = await asyncio.gather(*(loop.run_in_executor(executor, render_meta_prompts, part) for part in slices))
+        return [prompt for part in rendered for prompt in part]
+
+    async def _save(self, prompts: List[Tuple[str, str]]) -> None:
+        """Bulk-upsert rendered prompts into meta_prompts."""
+        if not prompts:
+            return
+        now = datetime.utcnow()
+        await self.db.meta_prompts.bulk_write([
+            UpdateOne(
+                {"user_id": user_id},
+                {"$set": {"user_id": user_id, "prompt_text": prompt_text, "updated_at": now}},
+                upsert=True
+            )
+            for user_id, prompt_text in prompts
+        ], ordered=False)
+
+# Background refresh of changed users
+_refresh_task: Optional[asyncio.Task] = None
+
+async def _refresh_meta_prompts(db: AsyncIOMotorDatabase) -> None:
+    # One pool for the life of the task, so each tick doesn't spawn new worker processes
+    executor = create_render_pool(settings.META_PROMPT_WORKERS) if settings.META_PROMPT_WORKERS > 0 else None
+    try:
+        while True:
+            await asyncio.sleep(settings.META_PROMPT_REFRESH_INTERVAL)
+            try:
+                await MetaPromptBatchJob(db, executor=executor).run(changed_only=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Background meta-prompt refresh failed: {str(e)}")
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def start_meta_prompt_refresh(db: AsyncIOMotorDatabase) -> None:
+    """Start periodically regenerating changed users' meta-prompts, if enabled in settings."""
+    global _refresh_task
+    if settings.META_PROMPT_REFRESH_INTERVAL > 0 and _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_meta_prompts(db))
+
+async def stop_meta_prompt_refresh() -> None:
+    """Stop the background meta-prompt refresh."""
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        await asyncio.gather(_refresh_task, return_exceptions=True)
+        _refresh_task = None
@@ -0,0 +1,247 @@
+import numpy as np
+import logging
+from typing import Tuple, Optional, Any
+
+from app.config import settings
+
+try:
+    import hnswlib
+except ImportError:  # hnswlib is optional
+    hnswlib = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Scale used to store unit-length vectors as int8 (round(v * 127))
+INT8_SCALE = 127.0
+
+def dequantize(vectors: np.ndarray) -> np.ndarray:
+    """Convert stored vectors (float32, float16 or int8) back to float32."""
+    if vectors.dtype == np.int8:
+        return vectors.astype(np.float32) / INT8_SCALE
+    return np.asarray(vectors, dtype=np.float32)
+
+def inner_product(vectors: np.ndarray, query: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """
+    Score stored vectors against a float32 query.
+
+    Compact storage dtypes are upcast chunk by chunk, so the full matrix is
+    never materialized as float32.
+    """
+    if vectors.dtype == np.float32:
+        return vectors @ query
+
+    scores = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), chunk_size):
+        scores[start:start + chunk_size] = dequantize(vectors[start:start + chunk_size]) @ query
+    return scores
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Return the indices of the k highest scores, best first.
+    Uses argpartition so only the selected k entries are sorted.
+    """
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= len(scores):
+        return np.argsort(-scores)
+
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+class ExactIndex:
+    """Brute-force inner-product search over L2-normalized vectors (any storage dtype)."""
+
+    kind = "exact"
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k vectors with the highest inner product with the query.
+
+        Args:
+            query: L2-normalized query vector
+            k: Number of results to return
+
+        Returns:
+            Tuple of (indices, scores), best match first
+        """
+        scores = inner_product(self.vectors, query)
+        indices = top_k(scores, k)
+        return indices, scores[indices]
+
+class IVFFlatIndex:
+    """
+    Inverted-file index in pure NumPy.
+
+    Vectors are clustered with spherical k-means into `nlist` lists. A query
+    scores the centroids, scans only the `nprobe` closest lists exactly and
+    returns the best k among those candidates. Raising nprobe trades latency
+    for recall; nprobe == nlist is equivalent to exact search.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        n_iter: int = 10,
+        max_train_points: int = 256,
+        seed: int = 0
+    ):
+        self.vectors = vectors
+        n = len(vectors)
+
+        nlist = nlist or settings.VECTOR_IVF_NLIST or int(np.sqrt(n))
+        self.nlist = max(1, min(nlist, n))
+        self.nprobe = max(1, min(nprobe or settings.VECTOR_IVF_NPROBE, self.nlist))
+
+        self.centroids = self._train(vectors, self.nlist, n_iter, max_train_points, seed)
+
+        # Store the inverted lists as one permutation plus offsets (CSR layout)
+        assignments = self._assign(vectors, self.centroids)
+        self.order = np.argsort(assignments, kind="stable")
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=self.nlist))])
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Assign each vector to its closest centroid, in chunks to bound memory."""
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = dequantize(vectors[start:start + chunk_size])
+            assignments[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+        return assignments
+
+    @classmethod
+    def _train(cls, vectors: np.ndarray, nlist: int, n_iter: int, max_train_points: int, seed: int) -> np.ndarray:
+        """Run spherical k-means on a sample of the vectors."""
+        rng = np.random.default_rng(seed)
+        n = len(vectors)
+
+        sample_size = min(n, nlist * max_train_points)
+        sample = dequantize(vectors[np.sort(rng.choice(n, sample_size, replace=False))])
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(n_iter):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+
+            # Keep the previous centroid for lists that ended up empty
+            empty = norms[:, 0] == 0
+            sums[empty] = centroids[empty]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        return centroids
+
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find approximately the k vectors with the highest inner product with the query.
+
+        Args:
+            query: L2-normalized query vector
+            k: Number of results to return
+            nprobe: Optional override for the number of lists to scan
+
+        Returns:
+            Tuple of (indices, scores), best match first
+        """
+        nprobe = max(1, min(nprobe or self.nprobe, self.nlist))
+        probe_lists = top_k(self.centroids @ query, nprobe)
+
+        candidates = np.concatenate([
+            self.order[self.offsets[i]:self.offsets[i + 1]] for i in probe_lists
+        ])
+        if len(candidates) == 0:
+            return candidates, np.empty(0, dtype=np.float32)
+
+        scores = inner_product(self.vectors[candidates], query)
+        best = top_k(scores, k)
+        return candidates[best], scores[best]
+
+class HNSWIndex:
+    """Adapter over hnswlib's HNSW graph index using inner-product space."""
+
+    kind = "hnsw"
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        m: Optional[int] = None,
+        ef_construction: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ):
+        if hnswlib is None:
+            raise ImportError("hnswlib is not installed")
+
+        self.index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        self.index.init_index(
+            max_elements=len(vectors),
+            M=m or settings.VECTOR_HNSW_M,
+            ef_construction=ef_construction or settings.VECTOR_HNSW_EF_CONSTRUCTION
+        )
+        self.index.add_items(dequantize(vectors), np.arange(len(vectors)))
+        self.index.set_ef(ef_search or settings.VECTOR_HNSW_EF_SEARCH)
+        self.size = len(vectors)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find approximately the k vectors with the highest inner product with the query.
+
+        Args:
+            query: L2-normalized query vector
+            k: Number of results to return
+
+        Returns:
+            Tuple of (indices, scores), best match first
+        """
+        k = min(k, self.size)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        labels, distances = self.index.knn_query(query, k=k)
+        # hnswlib reports inner-product distance as 1 - <q, v>
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+# Values accepted for VECTOR_INDEX_TYPE
+INDEX_TYPES = ("exact", "ivf", "hnsw")
+
+def build_index(vectors: np.ndarray, index_type: Optional[str] = None, **params: Any):
+    """
+    Build the search index for a matrix of L2-normalized vectors.
+
+    Corpora below settings.VECTOR_INDEX_EXACT_THRESHOLD always use exact
+    search, where brute force is both faster to build and perfectly accurate.
+
+    Args:
+        vectors: (N, D) matrix with unit-length rows, stored as float32, float16 or int8
+        index_type: "exact", "ivf" or "hnsw"; defaults to settings.VECTOR_INDEX_TYPE
+        **params: Index-specific tuning parameters (nlist, nprobe, m, ef_search, ...)
+
+    Returns:
+        An index object exposing search(query, k) -> (indices, scores)
+
+    Raises:
+        ValueError: If index_type is not one of INDEX_TYPES
+    """
+    index_type = (index_type or settings.VECTOR_INDEX_TYPE).lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown vector index type '{index_type}', expected one of {', '.join(INDEX_TYPES)}")
+
+    if index_type == "exact" or len(vectors) < settings.VECTOR_INDEX_EXACT_THRESHOLD:
+        return ExactIndex(vectors)
+
+    if index_type == "hnsw":
+        if hnswlib is not None:
+            return HNSWIndex(vectors, **params)
+        logger.warning("hnswlib is not installed, falling back to the IVF index")
+        params = {}
+
+    return IVFFlatIndex(vectors, **params)
@@ -0,0 +1,218 @@
+import asyncio
+import contextlib
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BatchFunction = Callable[[List[Any]], Sequence[Any]]
+
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+def _no_grad():
+    """torch.no_grad() if torch is installed, otherwise a no-op."""
+    try:
+        import torch
+        return torch.no_grad()
+    except ImportError:
+        return contextlib.nullcontext()
+
+def _resolve(future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+class _Item:
+    __slots__ = ("value", "future", "loop", "enqueued")
+
+    def __init__(self, value: Any, future: asyncio.Future, loop: asyncio.AbstractEventLoop):
+        self.value = value
+        self.future = future
+        self.loop = loop
+        self.enqueued = time.perf_counter()
+
+class BatchExecutor:
+    """
+    Runs single-item inference requests as batched forward passes.
+
+    Callers on the event loop submit items and await a future. One worker
+    thread per executor takes the first waiting item, then collects more
+    until it has max_batch_size of them or max_wait_ms has passed, and
+    calls `fn` once on the whole batch under torch.no_grad(). Concurrent
+    requests therefore share forward passes instead of queueing for the
+    model one by one, and the event loop never runs the model itself.
+
+    `fn` takes a list of items and returns one result per item, in order.
+    """
+
+    def __init__(self, name: str, fn: BatchFunction, max_batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None):
+        self.name = name
+        self.fn = fn
+        self.max_batch_size = max_batch_size or settings.INFERENCE_MAX_BATCH_SIZE
+        self.max_wait = (settings.INFERENCE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+        self._queue: "queue.Queue[Optional[_Item]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.wait_seconds = 0.0
+        self.compute_seconds = 0.0
+        self.batch_sizes: Dict[int, int] = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name=f"batch-{self.name}", daemon=True)
+                    self._thread.start()
+
+    def submit(self, value: Any) -> asyncio.Future:
+        """
+        Queue one item.
+
+        Args:
+            value: Input for `fn`
+
+        Returns:
+            Future resolved with the item's result
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._ensure_worker()
+        self._queue.put(_Item(value, future, loop))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return future
+
+    def submit_many(self, values: Sequence[Any]) -> List[asyncio.Future]:
+        """Queue several items; they may be split across batches or share them with others."""
+        return [self.submit(value) for value in values]
+
+    async def run(self, value: Any) -> Any:
+        """Run one item and wait for its result."""
+        return await self.submit(value)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                try:
+                    # Whatever is already queued joins without waiting
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._process(batch)
+            if stopping:
+                return
+
+    def _process(self, batch: List[_Item]) -> None:
+        started = time.perf_counter()
+        results: Sequence[Any] = []
+        error: Optional[BaseException] = None
+        try:
+            with _no_grad():
+                results = self.fn([item.value for item in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name} returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            error = e
+            self.errors += 1
+            logger.error(f"Batched inference in {self.name} failed for {len(batch)} items: {str(e)}")
+        finished = time.perf_counter()
+
+        self.batches += 1
+        self.items += len(batch)
+        self.compute_seconds += finished - started
+        self.wait_seconds += sum(started - item.enqueued for item in batch)
+        bucket = next((b for b in BATCH_SIZE_BUCKETS if len(batch) <= b), BATCH_SIZE_BUCKETS[-1])
+        self.batch_sizes[bucket] += 1
+
+        for index, item in enumerate(batch):
+            try:
+                item.loop.call_soon_threadsafe(
+                    _resolve, item.future, None if error else results[index], error
+                )
+            except RuntimeError:
+                # The caller's event loop has closed
+                pass
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Finish the queued items and stop the worker thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, batch size histogram and timings."""
+        return {
+            "name": self.name,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "avg_wait_ms": round(self.wait_seconds / self.items * 1000, 2) if self.items else 0.0,
+            "avg_batch_ms": round(self.compute_seconds / self.batches * 1000, 2) if self.batches else 0.0,
+            "batch_sizes": {f"<={bucket}": count for bucket, count in self.batch_sizes.items()}
+        }
+
+# Executors shared by the whole process, one per model
+_executors: Dict[str, BatchExecutor] = {}
+_executors_lock = threading.Lock()
+
+def get_batch_executor(name: str, fn: BatchFunction) -> BatchExecutor:
+    """
+    Get the shared executor for a model, creating it on first use.
+
+    Args:
+        name: Executor name, e.g. "text:<model>"
+        fn: Batch function, only used when the executor is created
+
+    Returns:
+        BatchExecutor instance
+    """
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = BatchExecutor(name, fn)
+                _executors[name] = executor
+    return executor
+
+def get_batch_executor_stats() -> List[Dict[str, Any]]:
+    """Stats of every shared executor."""
+    return [executor.stats() for executor in list(_executors.values())]
+
+def stop_batch_executors() -> None:
+    """Stop every shared executor's worker thread."""
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.stop()
+        _executors.clear()
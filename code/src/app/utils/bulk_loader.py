@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+from pymongo.errors import AutoReconnect, BulkWriteError, ExecutionTimeout, NetworkTimeout
+
+from app.config import settings
+from app.utils.columnar import columnar_enabled, convert_csv_to_parquet, iter_parquet_records
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Duplicate key: the document was already inserted by an earlier attempt
+DUPLICATE_KEY_ERROR = 11000
+
+# Errors after which a batch is worth sending again
+TRANSIENT_ERRORS = (AutoReconnect, NetworkTimeout, ExecutionTimeout)
+
+RecordBatchHandler = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+IndexSpec = Union[str, List[tuple]]
+
+class LoadStats:
+    """Counters for one collection load."""
+
+    def __init__(self, collection: str):
+        self.collection = collection
+        self.rows = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_rows = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "collection": self.collection,
+            "rows": self.rows,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed_rows": self.failed_rows,
+            "seconds": round(self.seconds, 2),
+            "rows_per_second": round(self.rows_per_second, 1)
+        }
+
+class BulkLoader:
+    """
+    Streams large CSV files into MongoDB.
+
+    Files are read in chunks (from their Parquet copy when columnar
+    ingestion is enabled) and sent as unordered insert_many batches, with up
+    to `max_in_flight` batches outstanding per collection. Failed batches
+    are retried; because insert_many assigns _id values to the documents
+    before sending them, a retry can't create duplicates. Indexes are built
+    once the data is in.
+    """
+
+    def __init__(
+        self,
+        db,
+        batch_size: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_delay: float = 0.5
+    ):
+        self.db = db
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self.max_in_flight = max_in_flight or settings.INGEST_MAX_IN_FLIGHT
+        self.max_retries = settings.INGEST_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_delay = retry_delay
+
+    def _iter_batches(self, csv_path: Path) -> Iterator[List[Dict[str, Any]]]:
+        if columnar_enabled():
+            yield from iter_parquet_records(convert_csv_to_parquet(csv_path), self.batch_size)
+            return
+        for chunk in pd.read_csv(csv_path, chunksize=self.batch_size):
+            yield chunk.to_dict("records")
+
+    async def load_collection(
+        self,
+        collection_name: str,
+        csv_path: Path,
+        indexes: Optional[List[IndexSpec]] = None,
+        on_batch: Optional[RecordBatchHandler] = None
+    ) -> LoadStats:
+        """
+        Load one CSV file into a collection.
+
+        Args:
+            collection_name: Target collection
+            csv_path: Source CSV file
+            indexes: Index specs to create after the load
+            on_batch: Coroutine function called with each inserted batch
+
+        Returns:
+            LoadStats for the load
+        """
+        collection = self.db[collection_name]
+        stats = LoadStats(collection_name)
+        started = time.perf_counter()
+
+        batches = self._iter_batches(Path(csv_path))
+        in_flight = set()
+        try:
+            while True:
+                records = await asyncio.to_thread(next, batches, None)
+                if records is None:
+                    break
+                if not records:
+                    continue
+                if len(in_flight) >= self.max_in_flight:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                in_flight.add(asyncio.create_task(self._send(collection, records, stats, on_batch)))
+            await asyncio.gather(*in_flight)
+        except BaseException:
+            for task in in_flight:
+                task.cancel()
+            raise
+
+        # Building indexes after the load is cheaper than maintaining them per insert
+        for index in indexes or []:
+            await collection.create_index(index)
+
+        stats.seconds = time.perf_counter() - started
+        logger.info(
+            f"Loaded {stats.rows} rows into {collection_name} in {stats.seconds:.1f}s "
+            f"({stats.rows_per_second:.0f} rows/s, {stats.retries} retries, {stats.failed_rows} failed)"
+        )
+        return stats
+
+    async def _send(self, collection, records: List[Dict[str, Any]], stats: LoadStats,
+                    on_batch: Optional[RecordBatchHandler]) -> None:
+        """Insert one batch, retrying transient failures and rows that failed for other reasons."""
+        pending = records
+        inserted = 0
+        existing = set()
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                stats.retries += 1
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+            try:
+                result = await collection.insert_many(pending, ordered=False)
+                inserted += len(result.inserted_ids)
+                pending = []
+                break
+            except BulkWriteError as e:
+                inserted += e.details.get("nInserted", 0)
+                errors = e.details.get("writeErrors", [])
+                duplicates = [pending[error["index"]] for error in errors if error.get("code") == DUPLICATE_KEY_ERROR]
+                if attempt:
+                    # Duplicates on a retry were inserted by the attempt that failed
+                    inserted += len(duplicates)
+                else:
+                    # Duplicates on the first attempt were there before this load
+                    existing.update(id(record) for record in duplicates)
+                pending = [pending[error["index"]] for error in errors if error.get("code") != DUPLICATE_KEY_ERROR]
+                if not pending:
+                    break
+                logger.warning(f"{len(pending)} rows failed to insert into {collection.name}: {errors[0].get('errmsg')}")
+            except TRANSIENT_ERRORS as e:
+                logger.warning(f"Batch insert into {collection.name} failed, retrying: {str(e)}")
+
+        stats.rows += inserted
+        stats.batches += 1
+        stats.failed_rows += len(pending)
+        if on_batch is not None:
+            skipped = existing | {id(record) for record in pending}
+            await on_batch([record for record in records if id(record) not in skipped])
+
+    async def load_all(self, datasets: Dict[str, Path], indexes: Optional[Dict[str, List[IndexSpec]]] = None,
+                       on_batch: Optional[Dict[str, RecordBatchHandler]] = None) -> Dict[str, LoadStats]:
+        """
+        Load several independent collections concurrently.
+
+        Args:
+            datasets: Collection name to source CSV file
+            indexes: Collection name to index specs created after its load
+            on_batch: Collection name to batch callback
+
+        Returns:
+            Collection name to LoadStats; collections whose load failed are omitted
+        """
+        indexes = indexes or {}
+        on_batch = on_batch or {}
+        names = list(datasets)
+        results = await asyncio.gather(
+            *(self.load_collection(name, datasets[name], indexes.get(name), on_batch.get(name)) for name in names),
+            return_exceptions=True
+        )
+
+        stats = {}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Error loading {datasets[name]} into {name}: {str(result)}")
+            else:
+                stats[name] = result
+        total_rows = sum(s.rows for s in stats.values())
+        slowest = max((s.seconds for s in stats.values()), default=0.0)
+        if slowest:
+            logger.info(f"Bulk load finished: {total_rows} rows in {slowest:.1f}s ({total_rows / slowest:.0f} rows/s)")
+        return stats
@@ -0,0 +1,112 @@
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; callers fall back to parsing CSV
+    pa = None
+
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Explicit column types for each source CSV. Dates and timestamps stay
+# strings so documents look the same as with the CSV loaders.
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    "demographic_data": {
+        "user_id": "int64", "age": "int64", "gender": "string", "location": "string",
+        "occupation": "string", "income_level": "string"
+    },
+    "account_data": {
+        "user_id": "int64", "account_id": "int64", "account_type": "string", "balance": "float64",
+        "interest_rate": "float64", "opening_date": "string"
+    },
+    "credit_history": {
+        "user_id": "int64", "loan_id": "int64", "loan_type": "string", "amount": "float64",
+        "interest_rate": "float64", "term_months": "int64", "status": "string", "start_date": "string"
+    },
+    "investment_data": {
+        "user_id": "int64", "investment_id": "int64", "investment_type": "string", "amount": "float64",
+        "current_value": "float64", "start_date": "string"
+    },
+    "transaction_data": {
+        "user_id": "int64", "transaction_id": "int64", "date": "string", "amount": "float64",
+        "merchant": "string", "category": "string", "transaction_type": "string"
+    },
+    "social_media_sentiment": {
+        "user_id": "int64", "post_id": "int64", "platform": "string", "content": "string",
+        "timestamp": "string", "sentiment_score": "float64", "intent": "string"
+    },
+    "products": {
+        "product_id": "int64", "name": "string", "category": "string", "interest_rate": "float64",
+        "term_years": "int64", "minimum_investment": "float64", "description": "string",
+        "risk_level": "string", "suitable_for": "string"
+    }
+}
+
+def columnar_enabled() -> bool:
+    """Whether CSVs should be ingested through Parquet (enabled and pyarrow installed)."""
+    return settings.COLUMNAR_INGESTION_ENABLED and pa is not None
+
+def parquet_path_for(csv_path: Path) -> Path:
+    """Where the Parquet copy of a CSV file is kept."""
+    csv_path = Path(csv_path)
+    parquet_dir = Path(settings.PARQUET_DIR) if settings.PARQUET_DIR else csv_path.parent / "parquet"
+    return parquet_dir / f"{csv_path.stem}.parquet"
+
+def convert_csv_to_parquet(csv_path: Path, parquet_path: Optional[Path] = None) -> Path:
+    """
+    Convert a CSV file to Parquet, unless an up-to-date copy already exists.
+
+    Columns listed in SCHEMAS are parsed with their declared types; other
+    files fall back to pyarrow's type inference, which also only runs once.
+
+    Args:
+        csv_path: Source CSV file
+        parquet_path: Destination (defaults to parquet_path_for(csv_path))
+
+    Returns:
+        Path of the Parquet file
+    """
+    if pa is None:
+        raise ImportError("pyarrow is not installed")
+
+    csv_path = Path(csv_path)
+    parquet_path = Path(parquet_path) if parquet_path else parquet_path_for(csv_path)
+    if parquet_path.exists() and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+        return parquet_path
+
+    schema = SCHEMAS.get(csv_path.stem)
+    convert_options = pa_csv.ConvertOptions(
+        column_types={name: pa.type_for_alias(alias) for name, alias in (schema or {}).items()}
+    )
+    table = pa_csv.read_csv(csv_path, convert_options=convert_options)
+
+    parquet_path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first so a crash never leaves a truncated copy behind
+    tmp_path = parquet_path.with_suffix(".parquet.tmp")
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, parquet_path)
+    logger.info(f"Converted {csv_path.name} to Parquet ({table.num_rows} rows)")
+    return parquet_path
+
+def iter_parquet_records(parquet_path: Path, batch_size: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Stream a Parquet file as batches of documents.
+
+    Args:
+        parquet_path: Parquet file
+        batch_size: Rows per batch
+
+    Yields:
+        Lists of row dictionaries
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    for batch in pq.ParquetFile(parquet_path).iter_batches(batch_size=batch_size):
+        yield batch.to_pylist()
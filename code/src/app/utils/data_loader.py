@@ -1,12 +1,14 @@
-import pandas as pd
 import os
 from pathlib import Path
 import logging
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from pymongo.errors import BulkWriteError
 import json
+from typing import Optional
 
 from app.config import settings
+from app.utils.bulk_loader import BulkLoader
+from app.utils.delta_sync import DeltaSync
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -45,13 +47,15 @@ class DataLoader:
         logger.info("Finished loading all datasets into MongoDB.")
         return True
     
-    async def load_dataset(self, filename: str, collection_name: str):
+    async def load_dataset(self, filename: str, collection_name: str, incremental: Optional[bool] = None):
         """
         Load a specific dataset into a MongoDB collection.
         
         Args:
             filename: The CSV file name
             collection_name: The MongoDB collection name
+            incremental: Apply only changed rows to an already loaded collection
+                         (defaults to settings.DELTA_SYNC_ENABLED)
         """
         file_path = self.data_dir / filename
         
@@ -59,31 +63,33 @@ class DataLoader:
             logger.warning(f"Dataset file {file_path} not found. Skipping.")
             return False
         
+        if incremental is None:
+            incremental = settings.DELTA_SYNC_ENABLED
+        
         try:
-            # Read the CSV file
-            df = pd.read_csv(file_path)
-            logger.info(f"Loaded {len(df)} records from {filename}")
-            
-            # Convert to list of dictionaries for MongoDB
-            records = df.to_dict("records")
+            delta_sync = DeltaSync(self.db)
+            if incremental and await self.db[collection_name].count_documents({}) > 0:
+                await delta_sync.sync(collection_name, file_path)
+                return True
             
             # Clear existing collection
             await self.db[collection_name].delete_many({})
             
-            # Insert data
-            if records:
-                result = await self.db[collection_name].insert_many(records)
-                logger.info(f"Inserted {len(result.inserted_ids)} records into {collection_name} collection")
-            
-            # Create indexes based on collection
+            # Index specs based on collection, built once the data is loaded
+            indexes = []
             if collection_name == "demographics" or collection_name == "accounts" or collection_name == "credit_history":
-                await self.db[collection_name].create_index("user_id")
+                indexes = ["user_id"]
             
             elif collection_name == "investments" or collection_name == "transactions" or collection_name == "social_media":
-                await self.db[collection_name].create_index([("user_id", 1)])
+                indexes = [[("user_id", 1)]]
             
             elif collection_name == "products":
-                await self.db[collection_name].create_index("product_id")
+                indexes = ["product_id"]
+            
+            # Stream the file in batches rather than materializing every record at once
+            stats = await BulkLoader(self.db).load_collection(collection_name, file_path, indexes=indexes)
+            if stats.failed_rows == 0:
+                await delta_sync.mark_synced(collection_name, file_path)
             
             return True
         
@@ -1,14 +1,28 @@
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 import logging
 from datetime import datetime
 import numpy as np
 from collections import Counter
 
+from app.repository.transaction_rollup_repository import merchant_name
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Debits above this amount are reported as large transactions
+LARGE_TRANSACTION_THRESHOLD = 1000
+# Maximum spread of a recurring payment's amounts, relative to their median
+RECURRING_AMOUNT_TOLERANCE = 0.2
+# Accepted median gap in days between payments for each cadence
+RECURRING_CADENCES = {
+    "weekly": (5, 9),
+    "monthly": (26, 35)
+}
+# Average month length, to turn cadences into payments per month for rollups
+DAYS_PER_MONTH = 30.44
+
 class DataProcessor:
     """
     Utility for processing user data and extracting insights.
@@ -19,22 +33,22 @@ class DataProcessor:
         """Initialize the processor."""
         pass
     
-    def extract_transaction_insights(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def extract_transaction_insights(self, transactions: Union[List[Dict[str, Any]], pd.DataFrame]) -> Dict[str, Any]:
         """
         Extract insights from transaction data.
         
         Args:
-            transactions: List of transaction dictionaries
+            transactions: List of transaction dictionaries, or a DataFrame of them
             
         Returns:
             Dictionary of insights
         """
-        if not transactions:
+        if transactions is None or len(transactions) == 0:
             return {}
         
         try:
             # Convert to DataFrame for easier analysis
-            df = pd.DataFrame(transactions)
+            df = transactions if isinstance(transactions, pd.DataFrame) else pd.DataFrame(transactions)
             
             # Calculate monthly spending (debits only)
             debits = df[df['transaction_type'] == 'debit']
@@ -47,21 +61,18 @@ class DataProcessor:
             else:
                 top_categories = []
             
-            # Find large transactions (above 1000)
-            large_transactions = []
-            for _, row in debits[debits['amount'] > 1000].iterrows():
-                large_transactions.append(f"{row['merchant']} (${row['amount']})")
-            
-            # Detect recurring payments (same merchant, similar amount)
-            recurring_payments = []
-            merchant_counts = debits['merchant'].value_counts()
-            recurring_merchants = merchant_counts[merchant_counts > 1].index
+            # Find large transactions
+            large = debits[debits['amount'] > LARGE_TRANSACTION_THRESHOLD]
+            large_transactions = [
+                f"{merchant} (${amount})" for merchant, amount in zip(large['merchant'], large['amount'])
+            ]
             
-            for merchant in recurring_merchants:
-                merchant_data = debits[debits['merchant'] == merchant]
-                if len(merchant_data) >= 2:
-                    avg_amount = merchant_data['amount'].mean()
-                    recurring_payments.append(f"{merchant} (${round(avg_amount, 2)} monthly)")
+            # Detect recurring payments (same merchant, similar amount, regular cadence)
+            recurring = self.detect_recurring_payments(debits)
+            recurring_payments = [
+                f"{merchant} (${round(amount, 2)} {cadence})"
+                for merchant, amount, cadence in zip(recurring.index, recurring['mean'], recurring['cadence'])
+            ]
             
             return {
                 'monthly_spending': monthly_spending,
@@ -74,6 +85,151 @@ class DataProcessor:
             logger.error(f"Error extracting transaction insights: {str(e)}")
             return {}
     
+    def detect_recurring_payments(self, debits: pd.DataFrame) -> pd.DataFrame:
+        """
+        Find recurring payments in one grouped pass over the transactions.
+        
+        A merchant is recurring when it was paid at least twice, every amount
+        is within RECURRING_AMOUNT_TOLERANCE of the merchant's median, and the
+        median gap between payments matches one of RECURRING_CADENCES. Without
+        a date column only the amount check applies and payments are assumed
+        monthly.
+        
+        Args:
+            debits: DataFrame of outgoing transactions with merchant and amount columns
+            
+        Returns:
+            DataFrame indexed by merchant with count, mean amount and cadence,
+            most frequent first
+        """
+        if debits.empty:
+            return pd.DataFrame(columns=['count', 'mean', 'cadence'])
+        
+        stats = debits.groupby('merchant', sort=False)['amount'].agg(['count', 'mean', 'median', 'min', 'max'])
+        stats = stats[stats['count'] >= 2]
+        spread = (stats['max'] - stats['min']) / stats['median'].abs()
+        stats = stats[spread <= RECURRING_AMOUNT_TOLERANCE]
+        
+        if 'date' in debits.columns:
+            dated = debits.loc[debits['merchant'].isin(stats.index), ['merchant', 'date']]
+            dated = dated.assign(date=pd.to_datetime(dated['date'], errors='coerce')).dropna(subset=['date'])
+            dated = dated.sort_values(['merchant', 'date'], kind='stable')
+            gaps = dated.groupby('merchant', sort=False)['date'].diff().dt.days
+            interval = gaps.groupby(dated['merchant']).median().reindex(stats.index)
+            
+            cadence = pd.Series(None, index=stats.index, dtype=object)
+            for name, (shortest, longest) in RECURRING_CADENCES.items():
+                cadence[interval.between(shortest, longest)] = name
+            stats = stats.assign(cadence=cadence)
+            stats = stats[stats['cadence'].notna()]
+        else:
+            stats = stats.assign(cadence='monthly')
+        
+        return stats[['count', 'mean', 'cadence']].sort_values('count', ascending=False, kind='stable')
+    
+    def extract_rollup_insights(self, rollups: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Extract transaction insights from precomputed monthly rollups.
+        
+        Returns the same keys as extract_transaction_insights without
+        touching the raw transactions. Large transactions are limited to the
+        largest one per month and category.
+        
+        Args:
+            rollups: List of transaction rollup documents
+            
+        Returns:
+            Dictionary of insights
+        """
+        if not rollups:
+            return {}
+        
+        try:
+            # Calculate monthly spending (debits only)
+            months = {rollup["month"] for rollup in rollups}
+            debit_total = sum(rollup.get("debit_total", 0) for rollup in rollups)
+            monthly_spending = round(debit_total / len(months), 2)
+            
+            # Top spending categories by number of debits
+            category_counts = Counter()
+            merchant_months: Dict[str, Counter] = {}
+            merchant_stats: Dict[str, Dict[str, float]] = {}
+            large_transactions = []
+            for rollup in rollups:
+                if rollup.get("debit_count"):
+                    category_counts[rollup["category"]] += rollup["debit_count"]
+                for key, stats in (rollup.get("merchants") or {}).items():
+                    name = merchant_name(key)
+                    merchant_months.setdefault(name, Counter())[rollup["month"]] += stats.get("count", 0)
+                    totals = merchant_stats.setdefault(
+                        name, {"count": 0, "total": 0.0, "min": stats.get("min", 0), "max": stats.get("max", 0)}
+                    )
+                    totals["count"] += stats.get("count", 0)
+                    totals["total"] += stats.get("total", 0)
+                    totals["min"] = min(totals["min"], stats.get("min", 0))
+                    totals["max"] = max(totals["max"], stats.get("max", 0))
+                largest = rollup.get("largest_debit")
+                if largest and largest["amount"] > LARGE_TRANSACTION_THRESHOLD:
+                    large_transactions.append(f"{largest['merchant']} (${largest['amount']})")
+            top_categories = [category for category, _ in category_counts.most_common(3)]
+            
+            recurring = self.detect_rollup_recurring_payments(merchant_months, merchant_stats)
+            recurring_payments = [
+                f"{merchant} (${round(mean, 2)} {cadence})" for merchant, _, mean, cadence in recurring
+            ]
+            
+            return {
+                'monthly_spending': monthly_spending,
+                'top_categories': top_categories,
+                'large_transactions': ", ".join(large_transactions) if large_transactions else None,
+                'recurring_payments': ", ".join(recurring_payments[:3]) if recurring_payments else None
+            }
+            
+        except Exception as e:
+            logger.error(f"Error extracting rollup insights: {str(e)}")
+            return {}
+    
+    def detect_rollup_recurring_payments(self, merchant_months: Dict[str, Counter],
+                                         merchant_stats: Dict[str, Dict[str, float]]) -> List[tuple]:
+        """
+        Find recurring payments from per-month merchant counts.
+        
+        The rollups keep no payment dates, so the cadence is judged from how
+        many payments a merchant gets per month instead of the gaps between
+        them: a merchant is recurring when it was paid at least twice, in
+        every month between its first and last, every amount is within
+        RECURRING_AMOUNT_TOLERANCE of the mean, and its median payments per
+        month match one of RECURRING_CADENCES.
+        
+        Args:
+            merchant_months: Number of debits per merchant and "YYYY-MM" month
+            merchant_stats: Count, total, min and max debit per merchant
+            
+        Returns:
+            List of (merchant, count, mean amount, cadence), most frequent first
+        """
+        recurring = []
+        for merchant, per_month in merchant_months.items():
+            stats = merchant_stats[merchant]
+            if stats["count"] < 2:
+                continue
+            mean = stats["total"] / stats["count"]
+            if mean == 0 or (stats["max"] - stats["min"]) / abs(mean) > RECURRING_AMOUNT_TOLERANCE:
+                continue
+            
+            active = sorted(per_month)
+            first, last = (int(month[:4]) * 12 + int(month[5:7]) for month in (active[0], active[-1]))
+            if last - first + 1 > len(active):
+                continue
+            
+            per_month_count = float(np.median(list(per_month.values())))
+            for name, (shortest, longest) in RECURRING_CADENCES.items():
+                if DAYS_PER_MONTH / longest <= per_month_count <= DAYS_PER_MONTH / shortest:
+                    recurring.append((merchant, stats["count"], mean, name))
+                    break
+        
+        return sorted(recurring, key=lambda payment: payment[1], reverse=True)
+    
     def extract_sentiment_insights(self, social_media: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Extract insights from social media sentiment data.
@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """
+    Two-level cache of text embeddings keyed by (model, sha256(text)).
+
+    An in-process LRU sits in front of a SQLite table, so identical text is
+    embedded once per model and survives process restarts. Vectors are stored
+    as raw float32 bytes.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_size: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite database file, defaults to settings.EMBEDDING_CACHE_PATH
+            memory_size: Maximum number of vectors held in the in-process LRU
+        """
+        self.path = path or settings.EMBEDDING_CACHE_PATH
+        self.memory_size = memory_size if memory_size is not None else settings.EMBEDDING_CACHE_MEMORY_SIZE
+        self._memory: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Return the cache key for a text."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up embeddings for several texts.
+
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+
+        Returns:
+            One vector per text, or None where the text is not cached
+        """
+        hashes = [self.hash_text(text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing = {}
+
+        with self._lock:
+            for i, text_hash in enumerate(hashes):
+                vector = self._memory.get((model, text_hash))
+                if vector is not None:
+                    self._memory.move_to_end((model, text_hash))
+                    results[i] = vector
+                else:
+                    missing.setdefault(text_hash, []).append(i)
+
+            if missing:
+                found = self._select(model, list(missing))
+                for text_hash, vector in found.items():
+                    self._remember((model, text_hash), vector)
+                    for i in missing[text_hash]:
+                        results[i] = vector
+
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """
+        Store embeddings for several texts.
+
+        Args:
+            model: Embedding model name
+            texts: Texts the vectors were computed from
+            vectors: One embedding per text
+        """
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                text_hash = self.hash_text(text)
+                array = np.asarray(vector, dtype=np.float32)
+                self._remember((model, text_hash), array)
+                rows.append((model, text_hash, array.tobytes()))
+
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not persist {len(rows)} embeddings to cache: {str(e)}")
+
+    def _select(self, model: str, hashes: List[str], chunk_size: int = 500) -> dict:
+        """Fetch stored vectors from SQLite, chunked to stay under the parameter limit."""
+        found = {}
+        try:
+            for start in range(0, len(hashes), chunk_size):
+                chunk = hashes[start:start + chunk_size]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk]
+                )
+                for text_hash, blob in cursor:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading embedding cache: {str(e)}")
+        return found
+
+    def _remember(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        """Insert into the in-process LRU, evicting the oldest entries."""
+        if self.memory_size <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        with self._lock:
+            self._conn.close()
+
+# Shared cache instance
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Get the shared embedding cache (singleton).
+
+    Returns:
+        EmbeddingCache instance, or None if caching is disabled or unavailable
+    """
+    global _embedding_cache
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                try:
+                    _embedding_cache = EmbeddingCache()
+                except Exception as e:
+                    logger.error(f"Could not open embedding cache, continuing without it: {str(e)}")
+                    return None
+    return _embedding_cache
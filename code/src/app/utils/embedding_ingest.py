@@ -0,0 +1,269 @@
+import asyncio
+import logging
+import random
+import time
+from typing import AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+from app.utils.http_client import get_http_client
+from app.utils.tokens import count_tokens, truncate_to_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# HTTP status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+EmbedFunction = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+class BatchResult:
+    """Outcome of embedding one batch, including its throughput."""
+
+    def __init__(
+        self,
+        batch_index: int,
+        start: int,
+        texts: List[str],
+        tokens: int,
+        embeddings: Optional[List[List[float]]] = None,
+        attempts: int = 0,
+        elapsed: float = 0.0,
+        error: Optional[Exception] = None
+    ):
+        self.batch_index = batch_index
+        self.start = start
+        self.texts = texts
+        self.tokens = tokens
+        self.embeddings = embeddings
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def texts_per_second(self) -> float:
+        return len(self.texts) / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.tokens / self.elapsed if self.elapsed > 0 else 0.0
+
+class OpenAIEmbeddingClient:
+    """
+    Async client for an OpenAI-compatible /embeddings endpoint.
+    Requests go through the shared pooled HTTP client unless one is passed in.
+    Point base_url at a local stub server to test ingestion offline.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        model: str = "text-embedding-ada-002",
+        timeout: Optional[float] = None,
+        client: Optional[httpx.AsyncClient] = None
+    ):
+        self.base_url = (base_url or settings.EMBEDDING_API_BASE).rstrip("/")
+        self.api_key = api_key or settings.OPENAI_API_KEY
+        self.model = model
+        self.timeout = timeout or settings.EMBEDDING_REQUEST_TIMEOUT
+        self._client = client
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch of texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One embedding per text, in input order
+        """
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        payload = {"model": self.model, "input": texts}
+        url = f"{self.base_url}/embeddings"
+
+        client = self._client or get_http_client()
+        response = await client.post(url, headers=headers, json=payload, timeout=self.timeout)
+
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item.get("index", 0))
+        if len(data) != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings, got {len(data)}")
+        return [item["embedding"] for item in data]
+
+class _TokenRateLimiter:
+    """Token bucket that spaces out requests to stay under a tokens-per-minute quota."""
+
+    def __init__(self, tokens_per_minute: int):
+        self.rate = tokens_per_minute / 60.0
+        self.capacity = float(tokens_per_minute)
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return
+                await asyncio.sleep((tokens - self.available) / self.rate)
+
+class EmbeddingIngestor:
+    """
+    Streaming, concurrent embedding pipeline for bulk indexing.
+
+    Input is split into batches bounded by a token budget and a text count.
+    Up to max_in_flight batches are embedded concurrently; each batch is
+    retried on its own with exponential backoff (honouring Retry-After),
+    so one failing batch never forces the others to be re-sent. Results are
+    yielded per batch as they complete, with throughput figures.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Optional[EmbedFunction] = None,
+        max_tokens_per_batch: Optional[int] = None,
+        max_texts_per_batch: Optional[int] = None,
+        max_tokens_per_text: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        tokens_per_minute: Optional[int] = None
+    ):
+        self.embed_fn = embed_fn or OpenAIEmbeddingClient().embed
+        self.max_tokens_per_batch = max_tokens_per_batch or settings.EMBEDDING_BATCH_MAX_TOKENS
+        self.max_texts_per_batch = max_texts_per_batch or settings.EMBEDDING_BATCH_MAX_TEXTS
+        self.max_tokens_per_text = max_tokens_per_text or settings.EMBEDDING_MAX_TOKENS_PER_TEXT
+        self.max_in_flight = max_in_flight or settings.EMBEDDING_MAX_IN_FLIGHT
+        self.max_retries = settings.EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        tokens_per_minute = settings.EMBEDDING_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute
+        self._rate_limiter = _TokenRateLimiter(tokens_per_minute) if tokens_per_minute > 0 else None
+
+    def make_batches(self, texts: List[str]) -> Iterator[Tuple[int, List[str], int]]:
+        """
+        Split texts into token-budgeted batches.
+
+        Yields:
+            Tuples of (offset of the first text, batch texts, batch token count)
+        """
+        batch: List[str] = []
+        batch_tokens = 0
+        start = 0
+
+        for i, text in enumerate(texts):
+            text = truncate_to_tokens(text, self.max_tokens_per_text)
+            tokens = count_tokens(text)
+
+            if batch and (batch_tokens + tokens > self.max_tokens_per_batch or len(batch) >= self.max_texts_per_batch):
+                yield start, batch, batch_tokens
+                batch, batch_tokens, start = [], 0, i
+
+            batch.append(text)
+            batch_tokens += tokens
+
+        if batch:
+            yield start, batch, batch_tokens
+
+    async def ingest(self, texts: List[str]) -> AsyncIterator[BatchResult]:
+        """
+        Embed texts batch by batch.
+
+        Args:
+            texts: Texts to embed
+
+        Yields:
+            A BatchResult per batch in completion order; failed batches carry
+            the final error instead of embeddings
+        """
+        batches = enumerate(self.make_batches(texts))
+        pending = set()
+
+        def schedule_next() -> bool:
+            try:
+                batch_index, (start, batch, tokens) = next(batches)
+            except StopIteration:
+                return False
+            pending.add(asyncio.ensure_future(self._run_batch(batch_index, start, batch, tokens)))
+            return True
+
+        while len(pending) < self.max_in_flight and schedule_next():
+            pass
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result.ok:
+                        logger.info(
+                            f"Embedded batch {result.batch_index} ({len(result.texts)} texts, {result.tokens} tokens) "
+                            f"in {result.elapsed:.2f}s: {result.texts_per_second:.1f} texts/s, "
+                            f"{result.tokens_per_second:.0f} tokens/s, {result.attempts} attempt(s)"
+                        )
+                    else:
+                        logger.error(f"Batch {result.batch_index} failed after {result.attempts} attempt(s): {str(result.error)}")
+                    schedule_next()
+                    yield result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _run_batch(self, batch_index: int, start: int, texts: List[str], tokens: int) -> BatchResult:
+        """Embed one batch, retrying transient failures with backoff."""
+        result = BatchResult(batch_index, start, texts, tokens)
+        started = time.monotonic()
+
+        for attempt in range(self.max_retries + 1):
+            result.attempts = attempt + 1
+            try:
+                if self._rate_limiter is not None:
+                    await self._rate_limiter.acquire(tokens)
+                result.embeddings = await self.embed_fn(texts)
+                result.error = None
+                break
+            except Exception as e:
+                result.error = e
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    break
+                delay = self._backoff_delay(attempt, e)
+                logger.warning(f"Batch {batch_index} attempt {attempt + 1} failed ({str(e)}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+        result.elapsed = time.monotonic() - started
+        return result
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Exponential backoff with full jitter, or the server's Retry-After if given."""
+        if isinstance(error, httpx.HTTPStatusError):
+            retry_after = error.response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.backoff_max)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import openai
+
+from app.config import settings
+from app.utils.batch_executor import get_batch_executor
+from app.utils.embedding_ingest import OpenAIEmbeddingClient
+from app.utils.model_registry import get_model_registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# OpenAI embedding model and its output dimension
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+OPENAI_EMBEDDING_DIMENSION = 1536
+
+# Thread pool for blocking embedding calls, shared by all providers
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.EMBEDDING_THREAD_POOL_SIZE,
+                    thread_name_prefix="embedding"
+                )
+    return _executor
+
+class EmbeddingProvider(ABC):
+    """
+    Base class for embedding backends used by VectorStore.
+
+    Subclasses implement embed(), a blocking call that raises on failure.
+    aembed() runs it in a shared thread pool so callers on the event loop
+    are never blocked by inference or network I/O.
+    """
+
+    model_name: str = ""
+    dimension: Optional[int] = None
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a batch of texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            (len(texts), dimension) float32 array
+        """
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        embeddings = await loop.run_in_executor(_get_executor(), self.embed, texts)
+        return embeddings.tolist()
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """Embeddings from the OpenAI API (text-embedding-ada-002)."""
+
+    model_name = OPENAI_EMBEDDING_MODEL
+    dimension = OPENAI_EMBEDDING_DIMENSION
+
+    def __init__(self):
+        openai.api_key = settings.OPENAI_API_KEY
+        self._client = OpenAIEmbeddingClient(model=self.model_name)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        response = openai.Embedding.create(input=texts, model=self.model_name)
+        return np.asarray([data["embedding"] for data in response["data"]], dtype=np.float32)
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        # The HTTP client is natively async, no thread needed
+        return await self._client.embed(texts)
+
+def load_sentence_transformer(model_name: str):
+    """
+    Load a SentenceTransformer model once per process.
+
+    Uses the registry's default device, as the chatbot and model warm-up
+    do, so they all share one instance of the model.
+    """
+    return get_model_registry().get(model_name)
+
+class SentenceTransformerEmbeddingProvider(EmbeddingProvider):
+    """
+    Local embeddings from a sentence-transformers model
+    (settings.EMBEDDING_MODEL by default), on the GPU if there is one.
+    Runs fully offline.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, batch_size: Optional[int] = None):
+        self.model_name = model_name or settings.EMBEDDING_MODEL
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = load_sentence_transformer(self.model_name)
+        return self._model
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        embeddings = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        # Small requests (a chat message, a query) are micro-batched with concurrent ones;
+        # anything already a full batch runs on its own
+        if not settings.INFERENCE_BATCHING_ENABLED or len(texts) >= settings.INFERENCE_MAX_BATCH_SIZE:
+            return await super().aembed(texts)
+        executor = get_batch_executor(f"text:{self.model_name}", self.embed)
+        vectors = await asyncio.gather(*executor.submit_many(texts))
+        return [vector.tolist() for vector in vectors]
+
+# Provider instances, one per configured name
+_providers: Dict[str, EmbeddingProvider] = {}
+
+def get_embedding_provider(name: Optional[str] = None) -> EmbeddingProvider:
+    """
+    Get a shared embedding provider.
+
+    Args:
+        name: "openai" or "local"; defaults to settings.EMBEDDING_PROVIDER
+
+    Returns:
+        EmbeddingProvider instance
+    """
+    name = (name or settings.EMBEDDING_PROVIDER).lower()
+    provider = _providers.get(name)
+    if provider is None:
+        if name in ("local", "sentence-transformers"):
+            provider = SentenceTransformerEmbeddingProvider()
+        else:
+            if name != "openai":
+                logger.warning(f"Unknown embedding provider '{name}', using OpenAI")
+            provider = OpenAIEmbeddingProvider()
+        _providers[name] = provider
+    return provider
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Collections whose changes make a user's cached financial context stale
+WATCHED_COLLECTIONS = ["investment_data", "transaction_data", "account_data"]
+
+ContextLoader = Callable[[str], Awaitable[Tuple[Dict[str, Any], bool]]]
+
+class FinancialContextEntry:
+    """A user's financial context plus its compact JSON rendering for prompts."""
+
+    def __init__(self, context: Dict[str, Any], expires_at: float):
+        self.context = context
+        self.rendered = json.dumps(context, separators=(",", ":"), default=str)
+        self.expires_at = expires_at
+
+class FinancialContextCache:
+    """
+    Per-user cache of the financial context used in system prompts.
+
+    Entries expire after `ttl` seconds and are dropped as soon as the user's
+    investments, transactions or account change. Concurrent misses for the
+    same user share a single load.
+    """
+
+    def __init__(self, ttl: Optional[int] = None, max_entries: Optional[int] = None):
+        self.ttl = settings.CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or settings.FINANCIAL_CONTEXT_CACHE_SIZE
+        self._entries: "OrderedDict[str, FinancialContextEntry]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # A load that started before a write is not cached: users invalidated while
+        # their load is in flight are tracked here, and clear() bumps the epoch
+        self._invalidated: Set[str] = set()
+        self._epoch = 0
+
+    def get(self, user_id: str) -> Optional[FinancialContextEntry]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def set(self, user_id: str, context: Dict[str, Any]) -> FinancialContextEntry:
+        entry = FinancialContextEntry(context, time.monotonic() + self.ttl)
+        self._entries[user_id] = entry
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    async def get_or_load(self, user_id: str, loader: ContextLoader) -> FinancialContextEntry:
+        """
+        Return the cached context for a user, loading it on a miss.
+
+        Args:
+            user_id: User ID
+            loader: Coroutine function returning (context, cacheable); incomplete
+                contexts built from fallbacks are returned but not cached
+
+        Returns:
+            FinancialContextEntry for the user
+        """
+        entry = self.get(user_id)
+        if entry is not None:
+            return entry
+
+        pending = self._loading.get(user_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[user_id] = future
+        epoch = self._epoch
+        try:
+            context, cacheable = await loader(user_id)
+            if cacheable and self._epoch == epoch and user_id not in self._invalidated:
+                entry = self.set(user_id, context)
+            else:
+                entry = FinancialContextEntry(context, 0.0)
+            future.set_result(entry)
+            return entry
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise the error; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        finally:
+            del self._loading[user_id]
+            self._invalidated.discard(user_id)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user's cached context."""
+        if user_id in self._loading:
+            self._invalidated.add(user_id)
+        self._entries.pop(user_id, None)
+
+    def invalidate_many(self, user_ids: Iterable[str]) -> None:
+        for user_id in set(user_ids):
+            self.invalidate(user_id)
+
+    def clear(self) -> None:
+        """Drop every cached context, including loads still in flight."""
+        self._epoch += 1
+        self._entries.clear()
+
+# Process-wide cache instance
+_financial_context_cache: Optional[FinancialContextCache] = None
+_change_watcher: Optional[asyncio.Task] = None
+
+def get_financial_context_cache() -> FinancialContextCache:
+    """
+    Get the shared financial context cache (singleton).
+
+    Returns:
+        FinancialContextCache instance
+    """
+    global _financial_context_cache
+    if _financial_context_cache is None:
+        _financial_context_cache = FinancialContextCache()
+    return _financial_context_cache
+
+def invalidate_financial_context(user_ids: Iterable[str]) -> None:
+    """Drop cached financial context for users whose data was written."""
+    get_financial_context_cache().invalidate_many(user_id for user_id in user_ids if user_id)
+
+async def _watch_financial_changes(db) -> None:
+    """Invalidate cached contexts from change-stream events on the watched collections."""
+    pipeline = [{"$match": {"ns.coll": {"$in": WATCHED_COLLECTIONS}}}]
+    cache = get_financial_context_cache()
+    try:
+        async with db.watch(pipeline, full_document="updateLookup") as stream:
+            async for change in stream:
+                user_id = (change.get("fullDocument") or {}).get("user_id")
+                if user_id:
+                    cache.invalidate(user_id)
+                else:
+                    # Deletes don't carry the document, so drop everything
+                    cache.clear()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # Change streams need a replica set; TTL expiry and write-path invalidation still apply
+        logger.warning(f"Financial data change stream unavailable: {str(e)}")
+
+def start_financial_change_watcher(db) -> None:
+    """Start the change-stream watcher if enabled in settings."""
+    global _change_watcher
+    if settings.FINANCIAL_CONTEXT_CHANGE_STREAM_ENABLED and _change_watcher is None:
+        _change_watcher = asyncio.create_task(_watch_financial_changes(db))
+
+async def stop_financial_change_watcher() -> None:
+    """Stop the change-stream watcher."""
+    global _change_watcher
+    if _change_watcher is not None:
+        _change_watcher.cancel()
+        await asyncio.gather(_change_watcher, return_exceptions=True)
+        _change_watcher = None
@@ -0,0 +1,66 @@
+import importlib.util
+import logging
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Long-lived client shared by every outbound API call in this process
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared, connection-pooled HTTP client.
+
+    Connections are kept alive between requests, so LLM and embedding calls
+    skip the TCP and TLS handshake after the first request to each host.
+    HTTP/2 is used when the h2 package is installed.
+
+    Returns:
+        httpx.AsyncClient instance
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        http2 = settings.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+        if settings.HTTP2_ENABLED and not http2:
+            logger.warning("h2 is not installed, using HTTP/1.1 for outbound API calls")
+
+        _http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=provider_timeout()
+        )
+        logger.info(f"Created shared HTTP client (http2={http2}, max_connections={settings.HTTP_MAX_CONNECTIONS})")
+    return _http_client
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client and its pooled connections."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logger.info("Shared HTTP client closed")
+
+def provider_timeout(provider: Optional[str] = None) -> httpx.Timeout:
+    """
+    Build the timeout for calls to an API provider.
+
+    Args:
+        provider: "openai", "mistral" or "google"; None for the defaults
+
+    Returns:
+        httpx.Timeout with the provider's connect and read timeouts
+    """
+    prefix = provider.upper() if provider else "HTTP"
+    connect = getattr(settings, f"{prefix}_CONNECT_TIMEOUT", None) or settings.HTTP_CONNECT_TIMEOUT
+    read = getattr(settings, f"{prefix}_READ_TIMEOUT", None) or settings.HTTP_READ_TIMEOUT
+    return httpx.Timeout(read, connect=connect)
@@ -4,10 +4,15 @@ import os
 import csv
 import asyncio
 import logging
-from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import BulkWriteError
 
 from app.config import settings
+from app.database.mongodb import get_database
+from app.repository.transaction_rollup_repository import TransactionRollupRepository
+from app.repository.user_data_change_repository import TRACKED_COLLECTIONS, UserDataChangeRepository
+from app.utils.bulk_loader import BulkLoader
+from app.utils.columnar import columnar_enabled
+from app.utils.delta_sync import DeltaSync
 
 # Configure logging
 logging.basicConfig(
@@ -22,12 +27,12 @@ DATA_DIR = "data"
 async def connect_to_mongo():
     """Connect to MongoDB."""
     try:
-        client = AsyncIOMotorClient(settings.MONGODB_URL)
-        db = client[settings.MONGODB_DB]
+        # Use the shared client and its connection pool
+        db = await get_database()
         
         # Verify connection
         await db.command("ping")
-        logger.info(f"Connected to MongoDB: {settings.MONGODB_URL}, database: {settings.MONGODB_DB}")
+        logger.info(f"Connected to MongoDB database: {db.name}")
         
         return db
     except Exception as e:
@@ -59,24 +64,53 @@ async def import_csv_to_collection(db, collection_name, file_name):
         logger.warning(f"CSV file not found: {csv_path}")
         return 0
     
-    data = csv_to_dict(csv_path)
-    if not data:
-        logger.warning(f"No data found in {csv_path}")
-        return 0
+    # Keep the monthly transaction rollups in step with the raw rows, and record other per-user changes
+    on_batch = None
+    on_change = None
+    if collection_name == "transaction_data":
+        rollups = TransactionRollupRepository(db)
+        await rollups.create_indexes()
+        on_batch = rollups.apply
+        on_change = rollups.rebuild
+    elif collection_name in TRACKED_COLLECTIONS:
+        data_changes = UserDataChangeRepository(db)
+        await data_changes.create_indexes()
+        on_batch = data_changes.apply
+        on_change = data_changes.touch
     
     # Check if collection already has data
     count = await db[collection_name].count_documents({})
     if count > 0:
-        logger.info(f"Collection {collection_name} already has {count} documents. Skipping import.")
-        return count
+        if not settings.DELTA_SYNC_ENABLED:
+            logger.info(f"Collection {collection_name} already has {count} documents. Skipping import.")
+            return count
+        # Apply only the rows that were added or changed since the last import
+        stats = await DeltaSync(db).sync(collection_name, csv_path, on_insert=on_batch, on_change=on_change)
+        return count + stats["inserted"] - stats["deleted"]
     
     # Create index on user_id for better lookup performance
     await db[collection_name].create_index("user_id")
     
     try:
-        result = await db[collection_name].insert_many(data)
-        logger.info(f"Imported {len(result.inserted_ids)} records into {collection_name}")
-        return len(result.inserted_ids)
+        if columnar_enabled():
+            # Stream record batches from the typed Parquet copy of the CSV
+            stats = await BulkLoader(db).load_collection(collection_name, csv_path, on_batch=on_batch)
+            imported = stats.rows
+        else:
+            data = csv_to_dict(csv_path)
+            if not data:
+                logger.warning(f"No data found in {csv_path}")
+                return 0
+            result = await db[collection_name].insert_many(data)
+            imported = len(result.inserted_ids)
+            if on_batch is not None:
+                await on_batch(data)
+        
+        if settings.DELTA_SYNC_ENABLED:
+            await DeltaSync(db).mark_synced(collection_name, csv_path)
+        
+        logger.info(f"Imported {imported} records into {collection_name}")
+        return imported
     except BulkWriteError as e:
         logger.error(f"Bulk write error: {str(e)}")
         return 0
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ModelLoader = Callable[[str, str], Any]
+
+def load_sentence_transformer_model(name: str, device: str) -> Any:
+    """Default loader: a sentence-transformers model on the given device."""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name, device=device)
+
+def default_device() -> str:
+    """Device models are loaded on unless one is given: the GPU if there is one."""
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        return "cpu"
+
+def model_memory_bytes(model: Any) -> int:
+    """Bytes held by a torch model's parameters and buffers, 0 for anything else."""
+    total = 0
+    for tensors in (getattr(model, "parameters", None), getattr(model, "buffers", None)):
+        if tensors is None:
+            continue
+        try:
+            total += sum(t.numel() * t.element_size() for t in tensors())
+        except Exception:
+            pass
+    return total
+
+class _Entry:
+    """A model slot: the loaded model, or the last load error."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.model: Any = None
+        self.load_seconds: Optional[float] = None
+        self.memory_bytes = 0
+        self.error: Optional[str] = None
+        self.failed_at: Optional[float] = None
+        self.hits = 0
+
+class ModelRegistry:
+    """
+    Loads each model once per process and shares it between requests.
+
+    Models are keyed by name and device and loaded on first use (or by
+    warm_up). Concurrent first requests for the same model wait for a
+    single load. A failed load is not retried for
+    MODEL_LOAD_RETRY_SECONDS, so a missing model doesn't stall every
+    request with another attempt.
+    """
+
+    def __init__(self, loader: Optional[ModelLoader] = None):
+        self.loader = loader or load_sentence_transformer_model
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, name: str, device: str) -> _Entry:
+        key = (name, device)
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.setdefault(key, _Entry())
+        return entry
+
+    def get(self, name: str, device: Optional[str] = None) -> Any:
+        """
+        Get a model, loading it if needed. Blocks while it loads.
+
+        Args:
+            name: Model name
+            device: Device to load it on (defaults to the GPU if there is one)
+
+        Returns:
+            The shared model instance
+
+        Raises:
+            RuntimeError: If the model failed to load
+        """
+        device = device or default_device()
+        entry = self._entry(name, device)
+        if entry.model is None:
+            with entry.lock:
+                if entry.model is None:
+                    self._load(name, device, entry)
+        entry.hits += 1
+        return entry.model
+
+    async def aget(self, name: str, device: Optional[str] = None) -> Any:
+        """Get a model without blocking the event loop while it loads."""
+        device = device or default_device()
+        entry = self._entry(name, device)
+        if entry.model is not None:
+            entry.hits += 1
+            return entry.model
+        return await asyncio.to_thread(self.get, name, device)
+
+    def _load(self, name: str, device: str, entry: _Entry) -> None:
+        if entry.failed_at is not None and time.time() - entry.failed_at < settings.MODEL_LOAD_RETRY_SECONDS:
+            raise RuntimeError(f"Model {name} failed to load: {entry.error}")
+
+        started = time.perf_counter()
+        try:
+            model = self.loader(name, device)
+        except Exception as e:
+            entry.error = str(e)
+            entry.failed_at = time.time()
+            logger.error(f"Failed to load model {name} on {device}: {str(e)}")
+            raise RuntimeError(f"Model {name} failed to load: {str(e)}") from e
+
+        entry.load_seconds = time.perf_counter() - started
+        entry.memory_bytes = model_memory_bytes(model)
+        entry.error = None
+        entry.failed_at = None
+        entry.model = model
+        logger.info(
+            f"Loaded model {name} on {device} in {entry.load_seconds:.1f}s "
+            f"({entry.memory_bytes / 1024 / 1024:.0f} MB)"
+        )
+
+    async def warm_up(self, names: Optional[List[str]] = None, device: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Load models ahead of traffic.
+
+        Args:
+            names: Models to load (defaults to settings.WARMUP_MODELS)
+            device: Device to load them on (defaults to the GPU if there is one)
+
+        Returns:
+            Dictionary with the loaded and failed model names and the registry stats
+        """
+        names = names if names is not None else configured_models()
+        loaded, failed = [], {}
+        for name in names:
+            try:
+                await self.aget(name, device)
+                loaded.append(name)
+            except RuntimeError as e:
+                failed[name] = str(e)
+        return {"loaded": loaded, "failed": failed, "models": self.stats()}
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Load time, memory footprint and use count of every model seen so far."""
+        return [
+            {
+                "name": name,
+                "device": device,
+                "loaded": entry.model is not None,
+                "load_seconds": round(entry.load_seconds, 2) if entry.load_seconds is not None else None,
+                "memory_mb": round(entry.memory_bytes / 1024 / 1024, 1),
+                "hits": entry.hits,
+                "error": entry.error
+            }
+            for (name, device), entry in list(self._entries.items())
+        ]
+
+def configured_models() -> List[str]:
+    """Models named in settings.WARMUP_MODELS, or the chatbot's embedding and image models."""
+    names = [name.strip() for name in settings.WARMUP_MODELS.split(",") if name.strip()]
+    return names or [settings.EMBEDDING_MODEL, settings.IMAGE_MODEL]
+
+# Registry shared by the whole process
+_model_registry: Optional[ModelRegistry] = None
+
+def get_model_registry() -> ModelRegistry:
+    """
+    Get the process-wide model registry (singleton).
+
+    Returns:
+        ModelRegistry instance
+    """
+    global _model_registry
+    if _model_registry is None:
+        _model_registry = ModelRegistry()
+    return _model_registry
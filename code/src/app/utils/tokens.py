@@ -0,0 +1,53 @@
+import logging
+import threading
+from typing import Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English text, used when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+def _get_encoding():
+    """Load the cl100k_base tokenizer once; return None if it can't be loaded."""
+    global _encoding, _encoding_failed
+    if _encoding is not None or _encoding_failed:
+        return _encoding
+
+    with _encoding_lock:
+        if _encoding is None and not _encoding_failed:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # tiktoken may be missing, or unable to download its BPE files
+                logger.warning(f"tiktoken unavailable, using approximate token counts: {str(e)}")
+                _encoding_failed = True
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in a text with the local cl100k_base tokenizer.
+    Falls back to a characters-per-token estimate if tiktoken is unavailable.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def truncate_to_tokens(text: str, max_tokens: Optional[int]) -> str:
+    """Truncate a text to at most max_tokens tokens."""
+    if not text or not max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * CHARS_PER_TOKEN]
@@ -0,0 +1,112 @@
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+import pandas as pd
+
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# CSV file behind each per-user dataset
+DATASET_FILES = {
+    "demographic": "demographic_data.csv",
+    "account": "account_data.csv",
+    "transaction": "transaction_data.csv",
+    "credit": "credit_history.csv",
+    "investment": "investment_data.csv",
+    "sentiment": "social_media_sentiment.csv"
+}
+
+class UserDataset:
+    """
+    A CSV dataset loaded on first use and reloaded if the file changes.
+
+    The frame is returned as read, with user_id as a column. Each user's
+    row positions are indexed when the file is loaded, so looking up one
+    user's rows is a dictionary lookup rather than a scan.
+    """
+
+    def __init__(self, name: str, path: Path):
+        self.name = name
+        self.path = Path(path)
+        self._frame: Optional[pd.DataFrame] = None
+        self._rows: Dict[str, np.ndarray] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """The whole dataset (empty if the file is missing)."""
+        return self._current()[0]
+
+    def _current(self) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+        mtime = os.path.getmtime(self.path) if self.path.exists() else None
+        if self._frame is None or mtime != self._mtime:
+            with self._lock:
+                if self._frame is None or mtime != self._mtime:
+                    self._frame, self._rows = self._load()
+                    self._mtime = mtime
+        return self._frame, self._rows
+
+    def _load(self) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+        if not self.path.exists():
+            logger.warning(f"{self.name.capitalize()} data file not found at {self.path}")
+            return pd.DataFrame(), {}
+
+        try:
+            df = pd.read_csv(self.path)
+        except Exception as e:
+            logger.error(f"Error loading {self.name} data: {str(e)}")
+            return pd.DataFrame(), {}
+
+        # Row positions of each user, in file order
+        rows = df.groupby("user_id", sort=False).indices if "user_id" in df.columns else {}
+        logger.info(f"Loaded {self.name} data with {len(df)} records")
+        return df, rows
+
+    def for_user(self, user_id: str) -> pd.DataFrame:
+        """
+        Rows belonging to one user.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            DataFrame of the user's rows, user_id column included (empty if none)
+        """
+        frame, rows = self._current()
+        positions = rows.get(user_id)
+        if positions is None:
+            return frame.iloc[0:0]
+        return frame.iloc[positions]
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+# Datasets shared by every caller in this process
+_datasets: Optional[Dict[str, UserDataset]] = None
+_datasets_lock = threading.Lock()
+
+def get_user_datasets() -> Dict[str, UserDataset]:
+    """
+    Get the process-wide per-user datasets (singleton).
+
+    Nothing is read until a dataset is first used.
+
+    Returns:
+        Dictionary of dataset name to UserDataset
+    """
+    global _datasets
+    if _datasets is None:
+        with _datasets_lock:
+            if _datasets is None:
+                data_dir = Path(settings.DATA_DIR)
+                _datasets = {name: UserDataset(name, data_dir / filename) for name, filename in DATASET_FILES.items()}
+    return _datasets
@@ -1,25 +1,151 @@
 import numpy as np
-import openai
 import logging
+import os
+import json
+import threading
+import time
 from typing import List, Dict, Any, Optional
 from app.config import settings
+from app.utils.ann_index import build_index, INT8_SCALE
+from app.utils.embedding_cache import get_embedding_cache
+from app.utils.embedding_ingest import EmbeddingIngestor
+from app.utils.embedding_providers import (
+    EmbeddingProvider,
+    get_embedding_provider,
+    OPENAI_EMBEDDING_MODEL,
+    OPENAI_EMBEDDING_DIMENSION
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# File names used by a persisted index directory
+EMBEDDINGS_FILE = "embeddings.npy"
+DOCUMENTS_FILE = "documents.json"
+
+# Supported on-disk / in-memory dtypes for the embedding matrix
+STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# Stores opened from disk, shared by every caller in this process
+_shared_stores: Dict[str, "VectorStore"] = {}
+_shared_stores_lock = threading.Lock()
+
 class VectorStore:
     """
-    A simple vector store implementation using OpenAI embeddings.
-    Allows for storing text embeddings and performing similarity searches.
+    A simple vector store implementation over a pluggable embedding provider
+    (OpenAI or a local sentence-transformers model, see
+    app.utils.embedding_providers). Allows for storing text embeddings and
+    performing similarity searches.
+    
+    Embeddings are kept as a single contiguous matrix of L2-normalized rows,
+    so a search is one matrix-vector product. The matrix is float32 by
+    default; float16 halves its size and int8 quarters it at a small cost
+    in recall. A store can be persisted
+    with save() and reopened with load(), in which case the matrix is
+    memory-mapped read-only and shared through the OS page cache by every
+    worker process that opens the same index.
+    
+    Searches go through a pluggable nearest-neighbour index (see
+    app.utils.ann_index), built lazily after the last insert.
     """
     
-    def __init__(self):
-        """Initialize an empty vector store."""
-        self.embeddings = []
-        self.texts = []
-        self.metadatas = []
-        openai.api_key = settings.OPENAI_API_KEY
+    def __init__(
+        self,
+        index_path: Optional[str] = None,
+        index_type: Optional[str] = None,
+        index_params: Optional[Dict[str, Any]] = None,
+        provider: Optional[EmbeddingProvider] = None,
+        storage_dtype: Optional[str] = None
+    ):
+        """
+        Initialize an empty vector store.
+        
+        Args:
+            index_path: Optional persisted index directory to load lazily on first use
+            index_type: Search index ("exact", "ivf" or "hnsw"), defaults to settings.VECTOR_INDEX_TYPE
+            index_params: Optional tuning parameters passed to the search index
+            provider: Embedding provider, defaults to settings.EMBEDDING_PROVIDER
+            storage_dtype: "float32", "float16" or "int8", defaults to settings.VECTOR_STORE_DTYPE
+        """
+        storage_dtype = (storage_dtype or settings.VECTOR_STORE_DTYPE).lower()
+        if storage_dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported vector store dtype: {storage_dtype}")
+        
+        self._matrix: Optional[np.ndarray] = None
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._index_path = index_path
+        self._loaded = index_path is None
+        self._load_lock = threading.Lock()
+        self._index = None
+        self._index_type = index_type
+        self._index_params = index_params or {}
+        self._index_lock = threading.Lock()
+        self.provider = provider or get_embedding_provider()
+        self.storage_dtype = storage_dtype
+        # Model that produced the stored vectors; read from the sidecar for persisted stores
+        self._model_name: Optional[str] = None
+    
+    @classmethod
+    def load(cls, index_path: Optional[str] = None) -> Optional["VectorStore"]:
+        """
+        Open a persisted index. Nothing is read until the store is first used.
+        
+        Stores are cached per process and reopened only when the index on disk
+        has been rewritten, so repeated calls are cheap.
+        
+        Args:
+            index_path: Index directory, defaults to settings.VECTOR_STORE_PATH
+        
+        Returns:
+            The shared VectorStore, or None if no index exists at the path
+        """
+        index_path = os.path.abspath(index_path or settings.VECTOR_STORE_PATH)
+        documents_path = os.path.join(index_path, DOCUMENTS_FILE)
+        embeddings_path = os.path.join(index_path, EMBEDDINGS_FILE)
+        
+        if not (os.path.exists(documents_path) and os.path.exists(embeddings_path)):
+            return None
+        
+        cache_key = f"{index_path}:{os.stat(documents_path).st_mtime_ns}"
+        with _shared_stores_lock:
+            store = _shared_stores.get(cache_key)
+            if store is None:
+                # Drop stale entries for the same path so old mappings can be released
+                for key in [k for k in _shared_stores if k.rsplit(":", 1)[0] == index_path]:
+                    del _shared_stores[key]
+                store = cls(index_path=index_path)
+                _shared_stores[cache_key] = store
+        return store
+    
+    @property
+    def embeddings(self) -> np.ndarray:
+        """The (N, D) matrix of normalized embeddings, in the storage dtype."""
+        self._ensure_loaded()
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=STORAGE_DTYPES[self.storage_dtype])
+        return self._matrix
+    
+    @property
+    def model_name(self) -> str:
+        """Name of the embedding model the stored vectors came from."""
+        self._ensure_loaded()
+        return self._model_name or self.provider.model_name
+    
+    @property
+    def texts(self) -> List[str]:
+        self._ensure_loaded()
+        return self._texts
+    
+    @property
+    def metadatas(self) -> List[Dict[str, Any]]:
+        self._ensure_loaded()
+        return self._metadatas
+    
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._texts)
     
     def add_texts(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
         """
@@ -38,17 +164,122 @@ class VectorStore:
         # Generate embeddings for all texts
         try:
             embeddings = self._get_embeddings(texts)
-            
-            # Store texts, embeddings, and metadata
-            self.texts.extend(texts)
-            self.embeddings.extend(embeddings)
-            self.metadatas.extend(metadatas)
+            self.add_embeddings(texts, embeddings, metadatas)
             
             logger.info(f"Added {len(texts)} texts to vector store")
         
         except Exception as e:
             logger.error(f"Error adding texts to vector store: {str(e)}")
     
+    async def aadd_texts(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ingestor: Optional[EmbeddingIngestor] = None
+    ) -> Dict[str, Any]:
+        """
+        Bulk-add texts through the concurrent ingestion pipeline.
+        
+        Cached embeddings are reused; the rest are embedded in token-budgeted
+        batches with per-batch retries. Texts whose batch ultimately fails are
+        skipped rather than stored as zero vectors.
+        
+        Args:
+            texts: List of text strings to embed and store
+            metadatas: Optional list of metadata dictionaries corresponding to each text
+            ingestor: Optional pipeline to use instead of one over the store's provider
+        
+        Returns:
+            Dictionary with counts of added, cached and failed texts and throughput
+        """
+        if metadatas is None:
+            metadatas = [{} for _ in texts]
+        
+        if ingestor is None:
+            ingestor = EmbeddingIngestor(self.provider.aembed)
+        
+        processed_texts = [self._prepare_text(text) for text in texts]
+        
+        cache = get_embedding_cache()
+        embeddings: List[Optional[Any]] = [None] * len(texts)
+        if cache is not None:
+            embeddings = cache.get_many(self.provider.model_name, processed_texts)
+        cached = sum(1 for embedding in embeddings if embedding is not None)
+        
+        miss_positions = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        miss_texts = [processed_texts[i] for i in miss_positions]
+        
+        failed = 0
+        failed_batches = 0
+        started = time.monotonic()
+        async for batch in ingestor.ingest(miss_texts):
+            positions = miss_positions[batch.start:batch.start + len(batch.texts)]
+            if not batch.ok:
+                failed += len(positions)
+                failed_batches += 1
+                continue
+            for i, embedding in zip(positions, batch.embeddings):
+                embeddings[i] = embedding
+            if cache is not None:
+                cache.put_many(self.provider.model_name, [processed_texts[i] for i in positions], batch.embeddings)
+        elapsed = time.monotonic() - started
+        
+        keep = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+        if keep:
+            self.add_embeddings(
+                [texts[i] for i in keep],
+                [embeddings[i] for i in keep],
+                [metadatas[i] for i in keep]
+            )
+        
+        embedded = len(miss_texts) - failed
+        logger.info(
+            f"Ingested {len(keep)} texts into vector store ({cached} cached, {embedded} embedded, "
+            f"{failed} failed in {failed_batches} batches) in {elapsed:.2f}s"
+        )
+        return {
+            "added": len(keep),
+            "cached": cached,
+            "embedded": embedded,
+            "failed": failed,
+            "failed_batches": failed_batches,
+            "elapsed_seconds": round(elapsed, 3),
+            "texts_per_second": round(embedded / elapsed, 1) if elapsed > 0 else 0.0
+        }
+    
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        """
+        Add precomputed embeddings with their texts and metadata.
+        
+        Args:
+            texts: List of text strings the embeddings were computed from
+            embeddings: One embedding vector per text
+            metadatas: Optional list of metadata dictionaries corresponding to each text
+        """
+        if metadatas is None:
+            metadatas = [{} for _ in texts]
+        
+        self._ensure_loaded()
+        vectors = self._quantize(self._normalize(np.asarray(embeddings, dtype=np.float32)))
+        
+        if self._matrix is None or len(self._matrix) == 0:
+            self._matrix = np.ascontiguousarray(vectors)
+        else:
+            # A memory-mapped matrix is read-only, so appending always builds a new array
+            self._matrix = np.concatenate([self._matrix, vectors])
+        
+        self._texts.extend(texts)
+        self._metadatas.extend(metadatas)
+        self._model_name = self.provider.model_name
+        
+        # The search index is rebuilt on the next query
+        self._index = None
+    
     def similarity_search(self, query: str, k: int = 4) -> List[Dict[str, Any]]:
         """
         Search for texts similar to the query.
@@ -60,94 +291,239 @@ class VectorStore:
         Returns:
             List of dictionaries with keys 'page_content' and 'metadata'
         """
-        if not self.embeddings:
+        if len(self) == 0:
             logger.warning("Vector store is empty, returning empty results")
             return []
         
         try:
             # Generate embedding for the query
             query_embedding = self._get_embeddings([query])[0]
-            
-            # Calculate cosine similarity between query and all stored embeddings
-            similarities = self._cosine_similarity(query_embedding, self.embeddings)
-            
-            # Get indices of top k similar items
-            if k > len(similarities):
-                k = len(similarities)
-            
-            top_indices = np.argsort(similarities)[-k:][::-1]
-            
-            # Prepare results
-            results = []
-            for idx in top_indices:
-                results.append({
-                    "page_content": self.texts[idx],
-                    "metadata": self.metadatas[idx],
-                    "similarity": similarities[idx]
-                })
-            
-            return results
+            return self._search_by_vector(query_embedding, k)
         
         except Exception as e:
             logger.error(f"Error during similarity search: {str(e)}")
             return []
     
-    def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+    async def asimilarity_search(self, query: str, k: int = 4) -> List[Dict[str, Any]]:
         """
-        Get embeddings for a list of texts using OpenAI API.
+        Search for texts similar to the query without blocking the event loop.
+        
+        The query is embedded through the provider's async path (a worker
+        thread for local models, a non-blocking HTTP call for OpenAI).
         
         Args:
-            texts: List of text strings to embed
-            
+            query: The query text to search for
+            k: Number of results to return
+        
         Returns:
-            List of embedding vectors
+            List of dictionaries with keys 'page_content' and 'metadata'
         """
+        if len(self) == 0:
+            logger.warning("Vector store is empty, returning empty results")
+            return []
+        
         try:
-            # Ensure each text is within token limits (rough approximation)
-            processed_texts = [text[:8000] for text in texts]
-            
-            response = openai.Embedding.create(
-                input=processed_texts,
-                model="text-embedding-ada-002"  # Use the appropriate embedding model
-            )
-            
-            # Extract embeddings from response
-            embeddings = [data["embedding"] for data in response["data"]]
-            return embeddings
+            text = self._prepare_text(query)
+            cache = get_embedding_cache()
+            query_embedding = cache.get_many(self.provider.model_name, [text])[0] if cache is not None else None
+            if query_embedding is None:
+                query_embedding = (await self.provider.aembed([text]))[0]
+                if cache is not None:
+                    cache.put_many(self.provider.model_name, [text], [query_embedding])
+            return self._search_by_vector(query_embedding, k)
         
         except Exception as e:
-            logger.error(f"Error getting embeddings from OpenAI: {str(e)}")
-            # Return zero embeddings as fallback
-            dimension = 1536  # OpenAI ada-002 embedding dimension
-            return [np.zeros(dimension).tolist() for _ in texts]
+            logger.error(f"Error during similarity search: {str(e)}")
+            return []
     
-    def _cosine_similarity(self, query_embedding: List[float], embeddings: List[List[float]]) -> np.ndarray:
+    def _search_by_vector(self, query_embedding: List[float], k: int) -> List[Dict[str, Any]]:
+        """Return the k stored texts closest to an embedding."""
+        query_vector = self._normalize(np.asarray([query_embedding], dtype=np.float32))[0]
+        
+        # Rows are pre-normalized, so inner product is the cosine similarity
+        top_indices, similarities = self._get_index().search(query_vector, k)
+        
+        # Prepare results
+        results = []
+        for idx, similarity in zip(top_indices, similarities):
+            results.append({
+                "page_content": self._texts[idx],
+                "metadata": self._metadatas[idx],
+                "similarity": float(similarity)
+            })
+        
+        return results
+    
+    def _get_index(self):
+        """Return the search index, building it if the store changed since the last query."""
+        index = self._index
+        if index is not None:
+            return index
+        
+        with self._index_lock:
+            if self._index is None:
+                self._index = build_index(self.embeddings, self._index_type, **self._index_params)
+                logger.info(f"Built {self._index.kind} index over {len(self._texts)} vectors")
+            return self._index
+    
+    def warm_up(self) -> None:
+        """Open the persisted index and build the search index ahead of the first query."""
+        if len(self):
+            self._get_index()
+    
+    def has_empty_embeddings(self) -> bool:
+        """Check whether any stored row is a zero vector (a failed embedding)."""
+        if len(self) == 0:
+            return False
+        return bool(np.any(~self._matrix.any(axis=1)))
+    
+    def save(self, index_path: Optional[str] = None) -> str:
         """
-        Calculate cosine similarity between a query embedding and a list of embeddings.
+        Persist the store as a .npy matrix (in the storage dtype) plus a JSON sidecar.
+        
+        Both files are written to temporary names and moved into place, so
+        readers never observe a half-written index.
         
         Args:
-            query_embedding: The query embedding vector
-            embeddings: List of embedding vectors to compare against
-            
+            index_path: Index directory, defaults to settings.VECTOR_STORE_PATH
+        
         Returns:
-            Array of similarity scores
+            The directory the index was written to
         """
-        query_array = np.array(query_embedding)
-        embeddings_array = np.array(embeddings)
+        index_path = os.path.abspath(index_path or self._index_path or settings.VECTOR_STORE_PATH)
+        os.makedirs(index_path, exist_ok=True)
+        
+        matrix = self.embeddings
+        embeddings_path = os.path.join(index_path, EMBEDDINGS_FILE)
+        documents_path = os.path.join(index_path, DOCUMENTS_FILE)
+        
+        tmp_embeddings_path = f"{embeddings_path}.{os.getpid()}.tmp"
+        with open(tmp_embeddings_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix))
+        os.replace(tmp_embeddings_path, embeddings_path)
+        
+        # The sidecar is written last; load() keys its cache on this file
+        tmp_documents_path = f"{documents_path}.{os.getpid()}.tmp"
+        with open(tmp_documents_path, "w") as f:
+            json.dump({
+                "count": len(self._texts),
+                "dimension": int(matrix.shape[1]) if matrix.size else 0,
+                "dtype": str(matrix.dtype),
+                "model": self._model_name,
+                "texts": self._texts,
+                "metadatas": self._metadatas
+            }, f, default=str)
+        os.replace(tmp_documents_path, documents_path)
         
-        # Normalize the vectors
-        query_norm = np.linalg.norm(query_array)
-        embeddings_norm = np.linalg.norm(embeddings_array, axis=1)
+        logger.info(f"Saved vector store with {len(self._texts)} entries to {index_path}")
+        return index_path
+    
+    def _ensure_loaded(self) -> None:
+        """Open the persisted index on first use."""
+        if self._loaded:
+            return
+        
+        with self._load_lock:
+            if self._loaded:
+                return
+            
+            documents_path = os.path.join(self._index_path, DOCUMENTS_FILE)
+            embeddings_path = os.path.join(self._index_path, EMBEDDINGS_FILE)
+            
+            with open(documents_path, "r") as f:
+                documents = json.load(f)
+            
+            matrix = np.load(embeddings_path, mmap_mode="r")
+            if len(matrix) != documents["count"]:
+                raise ValueError(
+                    f"Vector store at {self._index_path} is inconsistent: "
+                    f"{len(matrix)} embeddings for {documents['count']} documents"
+                )
+            
+            self._matrix = matrix if len(matrix) else None
+            self.storage_dtype = str(matrix.dtype)
+            # Indexes written before providers existed were always built with OpenAI
+            self._model_name = documents.get("model") or OPENAI_EMBEDDING_MODEL
+            self._texts = documents["texts"]
+            self._metadatas = documents["metadatas"]
+            self._loaded = True
+            
+            logger.info(f"Opened vector store with {len(self._texts)} entries from {self._index_path}")
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows, leaving zero vectors untouched."""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+    
+    def _quantize(self, vectors: np.ndarray) -> np.ndarray:
+        """Convert normalized float32 rows to the storage dtype."""
+        if self.storage_dtype == "int8":
+            return np.round(vectors * INT8_SCALE).astype(np.int8)
+        return vectors.astype(STORAGE_DTYPES[self.storage_dtype], copy=False)
+    
+    def _embedding_dimension(self) -> int:
+        """Dimension for zero-vector fallbacks when the provider cannot be reached."""
+        if self._matrix is not None and self._matrix.size:
+            return int(self._matrix.shape[1])
+        try:
+            return self.provider.dimension or OPENAI_EMBEDDING_DIMENSION
+        except Exception:
+            return OPENAI_EMBEDDING_DIMENSION
+    
+    @staticmethod
+    def _prepare_text(text: str) -> str:
+        """Ensure a text is within token limits (rough approximation)."""
+        return text[:8000]
+    
+    def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Get embeddings for a list of texts from the embedding provider.
         
-        # Avoid division by zero
-        if query_norm == 0:
-            query_norm = 1e-10
-        embeddings_norm = np.where(embeddings_norm == 0, 1e-10, embeddings_norm)
+        Texts already in the embedding cache are served locally; only cache
+        misses (deduplicated) are sent upstream, and the results are merged
+        back in the original order.
         
-        # Calculate dot product
-        dot_product = np.dot(embeddings_array, query_array)
+        Args:
+            texts: List of text strings to embed
+            
+        Returns:
+            List of embedding vectors
+        """
+        processed_texts = [self._prepare_text(text) for text in texts]
+            
+        cache = get_embedding_cache()
+        embeddings: List[Optional[Any]] = [None] * len(processed_texts)
+        if cache is not None:
+            embeddings = cache.get_many(self.provider.model_name, processed_texts)
+            
+        # Group positions of uncached texts so duplicates are embedded once
+        misses: Dict[str, List[int]] = {}
+        for i, embedding in enumerate(embeddings):
+            if embedding is None:
+                misses.setdefault(processed_texts[i], []).append(i)
         
-        # Calculate cosine similarity
-        similarities = dot_product / (embeddings_norm * query_norm)
+        if misses:
+            miss_texts = list(misses)
+            try:
+                fetched = self.provider.embed(miss_texts)
+                if cache is not None:
+                    cache.put_many(self.provider.model_name, miss_texts, fetched)
+    
+                for text, embedding in zip(miss_texts, fetched):
+                    for i in misses[text]:
+                        embeddings[i] = embedding
         
-        return similarities 
\ No newline at end of file
+            except Exception as e:
+                logger.error(f"Error getting embeddings from {self.provider.model_name}: {str(e)}")
+                # Return zero embeddings as fallback for the texts we couldn't embed
+                dimension = self._embedding_dimension()
+                for positions in misses.values():
+                    for i in positions:
+                        embeddings[i] = np.zeros(dimension).tolist()
+            
+        return [
+            embedding.tolist() if isinstance(embedding, np.ndarray) else embedding
+            for embedding in embeddings
+        ]
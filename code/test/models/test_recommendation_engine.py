@@ -0,0 +1,59 @@
+import os
+import pytest
+import pandas as pd
+from unittest.mock import patch
+
+from app.config import settings
+from app.models.recommendation_engine import RecommendationEngine
+from app.utils.vector_store import VectorStore
+
+def write_products(path, names):
+    pd.DataFrame([{"name": name, "description": f"{name} description"} for name in names]).to_csv(path, index=False)
+
+class TestRecommendationEngineCatalog:
+
+    @pytest.fixture
+    def products_file(self, tmp_path):
+        """Point the engine at a temporary products file and skip embedding."""
+        path = tmp_path / "products.csv"
+        write_products(path, ["Savings", "Mortgage", "Card"])
+        with patch.object(settings, "PRODUCTS_FILE", str(path)), \
+             patch.object(RecommendationEngine, "_index_products", side_effect=lambda df: VectorStore()):
+            yield path
+
+    @pytest.mark.asyncio
+    async def test_reload_swaps_whole_catalog(self, products_file):
+        """A reload replaces the products and the index together."""
+        engine = RecommendationEngine(db=None, load=False)
+        assert engine.products_df.empty
+
+        await engine.reload()
+        first = engine._catalog
+        assert first.products_df["name"].tolist() == ["Savings", "Mortgage", "Card"]
+
+        write_products(products_file, ["Savings", "Auto Loan"])
+        os.utime(products_file, (first.source_mtime + 10, first.source_mtime + 10))
+        assert engine._products_file_changed()
+
+        await engine.reload()
+        assert engine._catalog is not first
+        assert engine.products_df["name"].tolist() == ["Savings", "Auto Loan"]
+        assert not engine._products_file_changed()
+
+    @pytest.mark.asyncio
+    async def test_failed_reload_keeps_current_catalog(self, products_file):
+        """Requests keep the last good catalogue if a rebuild fails."""
+        engine = RecommendationEngine(db=None, load=False)
+        await engine.reload()
+        current = engine._catalog
+
+        with patch.object(RecommendationEngine, "_build_catalog", side_effect=RuntimeError("bad csv")):
+            await engine.reload()
+
+        assert engine._catalog is current
+
+    def test_existing_products_file_is_never_overwritten(self, products_file):
+        """The sample catalogue is only written when no products file exists."""
+        with patch.object(RecommendationEngine, "_create_sample_products") as create_sample:
+            RecommendationEngine(db=None)
+        create_sample.assert_not_called()
@@ -0,0 +1,206 @@
+import pytest
+from bson import ObjectId
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.config import settings
+
+from app.models.chat import ChatMessageCreate, ConversationCreate
+from app.repository.chat_repository import ChatRepository, PREVIEW_LENGTH
+from app.services.conversation_summary import ConversationSummarizer
+
+def matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, branch) for branch in condition):
+                return False
+            continue
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            if "$exists" in condition and (field in doc) != condition["$exists"]:
+                return False
+            if "$gt" in condition and (value is None or value <= condition["$gt"]):
+                return False
+            if "$lt" in condition and (value is None or value >= condition["$lt"]):
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction=1):
+        keys = field if isinstance(field, list) else [(field, direction)]
+        for key, key_direction in reversed(keys):
+            self.docs.sort(key=lambda d: d[key], reverse=key_direction == -1)
+        return self
+
+    def skip(self, n):
+        self.docs = self.docs[n:]
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+        self.calls = []
+
+    def find(self, query, projection=None):
+        self.calls.append("find")
+        return FakeCursor([dict(doc) for doc in self.docs if matches(doc, query)])
+
+    async def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if matches(d, query)), None)
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    async def update_one(self, query, update):
+        doc = next((d for d in self.docs if matches(d, query)), None)
+        if doc is not None:
+            doc.update(update.get("$set", {}))
+            for field, amount in update.get("$inc", {}).items():
+                doc[field] = doc.get(field, 0) + amount
+        return SimpleNamespace(matched_count=int(doc is not None))
+
+    async def find_one_and_delete(self, query):
+        doc = next((d for d in self.docs if matches(d, query)), None)
+        if doc is not None:
+            self.docs.remove(doc)
+        return doc
+
+    def aggregate(self, pipeline):
+        self.calls.append("aggregate")
+        ids = pipeline[0]["$match"]["conversation_id"]["$in"]
+        groups = {}
+        for doc in sorted(self.docs, key=lambda d: d["created_at"]):
+            if doc["conversation_id"] in ids:
+                group = groups.setdefault(doc["conversation_id"], {"_id": doc["conversation_id"], "message_count": 0})
+                group["message_count"] += 1
+                group["last_content"] = doc["content"]
+        return FakeCursor(list(groups.values()))
+
+def make_repository():
+    return ChatRepository(SimpleNamespace(chat_messages=FakeCollection(), conversations=FakeCollection()))
+
+class TestChatRepository:
+
+    @pytest.mark.asyncio
+    async def test_counts_and_previews_are_maintained(self):
+        repo = make_repository()
+        conversation = await repo.create_conversation(ConversationCreate(user_id="u1", title="Budget"), "u1")
+        conversation_id = str(conversation.id)
+
+        first = await repo.create_message(ChatMessageCreate(conversation_id=conversation_id, role="user", content="Hello"))
+        await repo.create_message(ChatMessageCreate(conversation_id=conversation_id, role="assistant", content="x" * 500))
+
+        stored = repo.conversations_collection.docs[0]
+        assert stored["message_count"] == 2
+        assert len(stored["last_message_preview"]) == PREVIEW_LENGTH
+
+        assert await repo.delete_message(str(first.id))
+        assert stored["message_count"] == 1
+
+        summaries = await repo.list_user_conversations("u1")
+        assert summaries[0].message_count == 1
+        # One query for the listing, no per-conversation counts
+        assert repo.conversations_collection.calls == ["find"]
+        assert "aggregate" not in repo.messages_collection.calls
+
+    @pytest.mark.asyncio
+    async def test_legacy_conversations_use_one_aggregation(self):
+        repo = make_repository()
+        now = datetime.utcnow()
+        legacy = [ObjectId(), ObjectId()]
+        for i, conversation_id in enumerate(legacy):
+            repo.conversations_collection.docs.append({
+                "_id": conversation_id, "user_id": "u1", "title": f"Old {i}",
+                "created_at": now, "updated_at": now - timedelta(minutes=i)
+            })
+        for minute, content in enumerate(["first", "second", "latest"]):
+            repo.messages_collection.docs.append({
+                "_id": ObjectId(), "conversation_id": str(legacy[0]), "role": "user",
+                "content": content, "created_at": now + timedelta(minutes=minute)
+            })
+
+        summaries = await repo.list_user_conversations("u1")
+
+        assert [(s.message_count, s.last_message_preview) for s in summaries] == [(3, "latest"), (0, None)]
+        assert repo.messages_collection.calls == ["aggregate"]
+
+    @pytest.mark.asyncio
+    async def test_context_fits_token_budget_after_summary(self):
+        repo = make_repository()
+        conversation = await repo.create_conversation(ConversationCreate(user_id="u1", title="Long"), "u1")
+        conversation_id = str(conversation.id)
+        for i in range(12):
+            role = "user" if i % 2 == 0 else "assistant"
+            await repo.create_message(ChatMessageCreate(conversation_id=conversation_id, role=role, content=f"turn {i} " * 40))
+            # Distinct timestamps so ordering is deterministic
+            repo.messages_collection.docs[-1]["created_at"] += timedelta(seconds=i)
+
+        context = await repo.get_conversation_context(conversation_id, token_budget=400)
+        assert context[-1]["content"].startswith("turn 11")
+        assert 1 < len(context) < 12
+        turns = [int(m["content"].split()[1]) for m in context]
+        assert turns == list(range(12 - len(context), 12))
+
+        class FakeLLM:
+            provider = "openai"
+            prompts = []
+
+            async def generate_response_for_prompt(self, prompt, system_message=""):
+                self.prompts.append(prompt)
+                return "User is saving for a house."
+
+        with patch.object(settings, "CONTEXT_TOKEN_BUDGET", 400), patch.object(settings, "CONTEXT_SUMMARY_INTERVAL", 4):
+            summarizer = ConversationSummarizer(repo, llm_service=FakeLLM())
+            assert await summarizer.refresh(conversation_id)
+            # Nothing new has left the window since
+            assert not await summarizer.refresh(conversation_id)
+
+        state = await repo.get_summary_state(conversation_id)
+        assert state["summary"] == "User is saving for a house."
+        assert "turn 0" in FakeLLM.prompts[0]
+
+        context = await repo.get_conversation_context(conversation_id, token_budget=400)
+        assert context[0]["role"] == "system"
+        assert "saving for a house" in context[0]["content"]
+        assert not any(m["content"].startswith("turn 0 ") for m in context[1:])
+        assert context[-1]["content"].startswith("turn 11")
+
+    @pytest.mark.asyncio
+    async def test_context_pages_through_messages_with_the_same_timestamp(self):
+        repo = make_repository()
+        conversation = await repo.create_conversation(ConversationCreate(user_id="u1", title="Burst"), "u1")
+        conversation_id = str(conversation.id)
+        created_at = datetime.utcnow()
+        for i in range(7):
+            await repo.create_message(ChatMessageCreate(conversation_id=conversation_id, role="user", content=f"turn {i}"))
+            repo.messages_collection.docs[-1]["created_at"] = created_at
+
+        with patch.object(settings, "CONTEXT_PAGE_SIZE", 3):
+            context = await repo.get_conversation_context(conversation_id, token_budget=10000)
+
+        assert [m["content"] for m in context] == [f"turn {i}" for i in range(7)]
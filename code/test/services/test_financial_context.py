@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from app.services import llm_service
+from app.utils.financial_context_cache import FinancialContextCache
+
+class FakeFinancialRepository:
+    """Repository stub that counts calls and tracks how many run at once."""
+
+    calls = 0
+    in_flight = 0
+    max_in_flight = 0
+    fail_accounts = False
+
+    def __init__(self, db):
+        pass
+
+    async def _call(self, value):
+        cls = FakeFinancialRepository
+        cls.calls += 1
+        cls.in_flight += 1
+        cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        await asyncio.sleep(0.01)
+        cls.in_flight -= 1
+        return value
+
+    async def get_user_demographics(self, user_id):
+        return await self._call(None)
+
+    async def get_user_account(self, user_id):
+        if FakeFinancialRepository.fail_accounts:
+            raise RuntimeError("timeout")
+        return await self._call(None)
+
+    async def get_user_credit_history(self, user_id):
+        return await self._call(None)
+
+    async def get_investment_summary(self, user_id):
+        return await self._call({"total_invested": 100})
+
+    async def get_transaction_summary(self, user_id):
+        return await self._call({"total_spending": 50})
+
+class TestFinancialContextCache:
+
+    @pytest.fixture(autouse=True)
+    def fake_backend(self):
+        FakeFinancialRepository.calls = 0
+        FakeFinancialRepository.max_in_flight = 0
+        FakeFinancialRepository.fail_accounts = False
+        cache = FinancialContextCache(ttl=60)
+        with patch.object(llm_service, "FinancialRepository", FakeFinancialRepository), \
+             patch.object(llm_service, "get_database", return_value=object()), \
+             patch.object(llm_service, "get_financial_context_cache", return_value=cache):
+            yield cache
+
+    @pytest.mark.asyncio
+    async def test_miss_runs_queries_concurrently_and_hit_skips_db(self):
+        """A miss issues all repository calls at once; a hit issues none."""
+        context = await llm_service.generate_financial_context("u1")
+        assert context["investments"] == {"total_invested": 100}
+        assert FakeFinancialRepository.calls == 5
+        assert FakeFinancialRepository.max_in_flight == 5
+
+        await llm_service.generate_financial_context("u1")
+        await llm_service.generate_system_prompt("u1")
+        assert FakeFinancialRepository.calls == 5
+
+    @pytest.mark.asyncio
+    async def test_invalidation_forces_reload(self, fake_backend):
+        """Writing a user's financial data drops their cached context."""
+        await llm_service.generate_financial_context("u1")
+        fake_backend.invalidate("u1")
+        await llm_service.generate_financial_context("u1")
+        assert FakeFinancialRepository.calls == 10
+
+    @pytest.mark.asyncio
+    async def test_partial_failures_are_not_cached(self):
+        """Contexts built with fallback values are served but reloaded next time."""
+        FakeFinancialRepository.fail_accounts = True
+        context = await llm_service.generate_financial_context("u1")
+        assert context["account"]["account_id"] == "default"
+
+        FakeFinancialRepository.fail_accounts = False
+        await llm_service.generate_financial_context("u1")
+        assert FakeFinancialRepository.calls == 9
+
+    @pytest.mark.asyncio
+    async def test_writes_during_a_load_are_not_overwritten(self, fake_backend):
+        """A load that overlaps an invalidation or clear() is served but not cached."""
+        loads = [llm_service.generate_financial_context(user) for user in ("u1", "u2")]
+        tasks = [asyncio.create_task(load) for load in loads]
+        await asyncio.sleep(0)
+        fake_backend.invalidate("u1")
+        fake_backend.clear()
+        await asyncio.gather(*tasks)
+
+        assert fake_backend.get("u1") is None
+        assert fake_backend.get("u2") is None
+        assert not fake_backend._invalidated
+
+        await llm_service.generate_financial_context("u2")
+        assert fake_backend.get("u2") is not None
@@ -0,0 +1,149 @@
+import pytest
+import operator
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.database.mongodb import MockCollection
+from app.repository.financial_repository import FinancialRepository
+
+RANGE_OPERATORS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+def bson_type(value):
+    """Comparison bracket of a value: ints and floats compare as numbers."""
+    return "number" if isinstance(value, (int, float)) else type(value)
+
+
+def matches(document, query):
+    """Evaluate the equality, range and $or filters used by the summaries, the way MongoDB does.
+
+    As in MongoDB, a range only matches values of the same type as its bound.
+    """
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(document, branch) for branch in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = document.get(field)
+            for op, bound in condition.items():
+                if bson_type(value) != bson_type(bound) or not RANGE_OPERATORS[op](value, bound):
+                    return False
+        elif document.get(field) != condition:
+            return False
+    return True
+
+
+class AggregatingCollection(MockCollection):
+    """Mock collection that runs the transaction summary's $match/$facet pipeline."""
+
+    def aggregate(self, pipeline):
+        match, facet = pipeline[0]["$match"], pipeline[1]["$facet"]
+        documents = [doc for doc in self.data if matches(doc, match)]
+        totals = {}
+        for doc in documents:
+            totals[doc["category"]] = totals.get(doc["category"], 0) + doc["amount"]
+        largest = sorted(documents, key=lambda doc: doc["amount"], reverse=True)[:1]
+        fields = facet["largest"][-1]["$project"]
+        result = [{
+            "categories": [{"_id": category, "amount": amount} for category, amount in totals.items()],
+            "largest": [{key: doc[key] for key in fields if key in doc} for doc in largest]
+        }]
+        return SimpleNamespace(to_list=lambda length=None: _resolved(result))
+
+
+async def _resolved(value):
+    return value
+
+
+def make_repository(investments=None, transactions=None, transactions_class=MockCollection):
+    """Repository over mock collections, which have no aggregate() unless transactions_class adds it."""
+    db = SimpleNamespace(**{
+        name: MockCollection(name)
+        for name in ["products", "account_data", "credit_history", "demographic_data", "user_data_changes"]
+    })
+    db.investment_data = MockCollection("investment_data", investments)
+    db.transaction_rollups = MockCollection("transaction_rollups")
+    db.transaction_data = transactions_class("transaction_data", transactions)
+    return FinancialRepository(db)
+
+class TestFinancialRepositorySummaries:
+
+    @pytest.mark.asyncio
+    async def test_investment_summary_groups_by_type(self):
+        repo = make_repository(investments=[
+            {"user_id": "u1", "investment_type": "stocks", "amount": 100.0, "current_value": 150.0},
+            {"user_id": "u1", "investment_type": "stocks", "amount": 100.0, "current_value": 50.0},
+            {"user_id": "u1", "investment_type": "bonds", "amount": 200.0, "current_value": 220.0},
+            {"user_id": "u2", "investment_type": "bonds", "amount": 999.0, "current_value": 999.0},
+        ])
+
+        summary = await repo.get_investment_summary("u1")
+
+        assert summary["total_invested"] == 400.0
+        assert summary["total_current_value"] == 420.0
+        assert summary["gain_loss_percentage"] == 5.0
+        assert summary["investment_types"]["stocks"] == {
+            "amount": 200.0, "current_value": 200.0, "percentage": 50.0, "gain_loss": 0.0, "gain_loss_percentage": 0
+        }
+        assert summary["investment_types"]["bonds"]["gain_loss"] == 20.0
+
+    @pytest.mark.asyncio
+    async def test_transaction_summary_counts_every_transaction(self):
+        """Totals cover all transactions in the window, not just the latest 100."""
+        today = datetime.utcnow()
+        transactions = [
+            {"user_id": "u1", "date": today - timedelta(days=i % 60), "amount": 10.0,
+             "merchant": "Shop", "category": "groceries"}
+            for i in range(250)
+        ]
+        transactions += [
+            {"user_id": "u1", "date": today - timedelta(days=1), "amount": 500.0, "merchant": "Airline", "category": "travel"},
+            {"user_id": "u1", "date": today - timedelta(days=2), "amount": -1000.0, "merchant": "Employer", "category": "salary"},
+            # Positive amounts count whatever their transaction type, as before
+            {"user_id": "u1", "date": today - timedelta(days=3), "amount": 20.0, "merchant": "Shop", "category": "refunds",
+             "transaction_type": "credit"},
+            {"user_id": "u1", "date": today - timedelta(days=200), "amount": 900.0, "merchant": "Old", "category": "travel"},
+        ]
+        repo = make_repository(transactions=transactions)
+
+        summary = await repo.get_transaction_summary("u1", months=3)
+
+        assert summary["total_spending"] == 3020.0
+        assert summary["average_monthly"] == 1006.67
+        assert summary["categories"]["groceries"] == {"amount": 2500.0, "percentage": 82.78}
+        assert summary["categories"]["refunds"]["amount"] == 20.0
+        assert "salary" not in summary["categories"]
+        assert summary["largest_transaction"]["merchant"] == "Airline"
+        assert summary["largest_transaction"]["date"] == (today - timedelta(days=1)).date().isoformat()
+        assert summary["period_start"] == (today - timedelta(days=90)).date().isoformat()
+
+    @pytest.mark.asyncio
+    async def test_empty_summaries(self):
+        repo = make_repository()
+        assert (await repo.get_investment_summary("u1"))["investment_types"] == {}
+        assert (await repo.get_transaction_summary("u1"))["largest_transaction"] is None
+
+    @pytest.mark.asyncio
+    async def test_aggregated_summary_matches_string_dates(self):
+        """Loaded transactions store ISO date strings; the aggregation must still find them."""
+        today = datetime.utcnow()
+        transactions = [
+            {"user_id": "u1", "date": (today - timedelta(days=5)).date().isoformat(), "amount": 40.0,
+             "merchant": "Shop", "category": "groceries"},
+            {"user_id": "u1", "date": today.date().isoformat(), "amount": 60.0,
+             "merchant": "Cafe", "category": "dining"},
+            {"user_id": "u1", "date": today - timedelta(days=1), "amount": 25.0,
+             "merchant": "Shop", "category": "groceries"},
+            {"user_id": "u1", "date": (today - timedelta(days=200)).date().isoformat(), "amount": 900.0,
+             "merchant": "Old", "category": "travel"},
+            {"user_id": "u2", "date": today.date().isoformat(), "amount": 70.0,
+             "merchant": "Shop", "category": "groceries"},
+        ]
+        repo = make_repository(transactions=transactions, transactions_class=AggregatingCollection)
+
+        summary = await repo.get_transaction_summary("u1", months=1)
+
+        assert summary["total_spending"] == 125.0
+        assert summary["categories"]["groceries"]["amount"] == 65.0
+        assert "travel" not in summary["categories"]
+        assert summary["largest_transaction"]["merchant"] == "Cafe"
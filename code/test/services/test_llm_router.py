@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+
+from app.services.llm_router import LLMRouter, ProviderStats
+
+def make_router(**kwargs):
+    kwargs.setdefault("hedge_enabled", False)
+    return LLMRouter(**kwargs)
+
+class TestLLMRouter:
+
+    @pytest.mark.asyncio
+    async def test_fails_over_to_next_provider(self):
+        """A failing provider is skipped for the next one instead of returning a mock answer."""
+        router = make_router()
+
+        async def request(name):
+            if name == "google":
+                raise RuntimeError("503")
+            return f"answer from {name}"
+
+        provider, result = await router.call(["google", "mistral"], request)
+
+        assert (provider, result) == ("mistral", "answer from mistral")
+        assert router.get_stats("google").consecutive_failures == 1
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_is_skipped_until_reset(self):
+        """After repeated failures a provider is not called until its reset period passes."""
+        router = make_router()
+        router.stats["google"] = ProviderStats("google", failure_threshold=2, reset_seconds=60)
+        calls = []
+
+        async def request(name):
+            calls.append(name)
+            if name == "google":
+                raise RuntimeError("down")
+            return "ok"
+
+        await router.call(["google", "openai"], request)
+        await router.call(["google", "openai"], request)
+        assert router.get_stats("google").state == ProviderStats.OPEN
+
+        calls.clear()
+        await router.call(["google", "openai"], request)
+        assert calls == ["openai"]
+
+        # Once the reset period has passed, one trial call is let through
+        router.get_stats("google").opened_at -= 61
+        assert router.ordered(["google", "openai"]) == ["google", "openai"]
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_wins_when_primary_is_slow(self):
+        """A slow primary is raced against the next provider and the loser is cancelled."""
+        router = make_router(hedge_enabled=True, hedge_default_delay=0.01, hedge_min_delay=0.0)
+        cancelled = []
+
+        async def request(name):
+            if name == "slow":
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(name)
+                    raise
+            return name
+
+        provider, result = await asyncio.wait_for(router.call(["slow", "fast"], request), timeout=1)
+        await asyncio.sleep(0)
+
+        assert provider == "fast"
+        assert cancelled == ["slow"]
+        assert router.get_stats("slow").state == ProviderStats.CLOSED
+
+    def test_hedge_delay_uses_p95(self):
+        """With enough samples the hedge delay tracks the provider's p95 latency."""
+        router = make_router(hedge_min_delay=0.0)
+        stats = router.get_stats("openai")
+        for latency in [1.0] * 19 + [3.0]:
+            stats.record_success(latency)
+
+        assert 1.0 < router.hedge_delay("openai") <= 3.0
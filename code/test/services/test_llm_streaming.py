@@ -0,0 +1,85 @@
+import json
+import pytest
+import httpx
+from unittest.mock import patch
+
+from app.services.llm_router import LLMRouter
+from app.services.llm_service import LLMService
+
+def sse_body(events):
+    return "".join(f"data: {event}\n\n" for event in events).encode()
+
+def make_service(provider, api_url, handler):
+    service = LLMService()
+    service.providers = {provider: {"model": "test-model", "api_url": api_url}}
+    service.router = LLMRouter()
+    service.google_api_key = "test-key"
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service, patch("app.services.llm_service.get_http_client", return_value=client)
+
+class TestLLMStreaming:
+
+    @pytest.mark.asyncio
+    async def test_chat_completions_stream(self):
+        """OpenAI/Mistral deltas are yielded in order and [DONE] ends the stream."""
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            chunks = [json.dumps({"choices": [{"delta": {"content": text}}]}) for text in ["Save ", "early", "."]]
+            return httpx.Response(200, content=sse_body([json.dumps({"choices": [{"delta": {"role": "assistant"}}]})] + chunks + ["[DONE]"]))
+
+        service, client_patch = make_service("mistral", "https://api.mistral.ai/v1/chat/completions", handler)
+        with client_patch:
+            fragments = [f async for f in service.stream_response([{"role": "user", "content": "hi"}])]
+
+        assert fragments == ["Save ", "early", "."]
+        assert requests[0]["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_gemini_stream(self):
+        """Gemini streamGenerateContent is called with alt=sse and its parts are yielded."""
+        urls = []
+
+        def handler(request):
+            urls.append(request.url)
+            chunks = [json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}) for text in ["Budget ", "first"]]
+            return httpx.Response(200, content=sse_body(chunks))
+
+        api_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+        service, client_patch = make_service("google", api_url, handler)
+        with client_patch:
+            fragments = [f async for f in service.stream_response([{"role": "user", "content": "hi"}])]
+
+        assert fragments == ["Budget ", "first"]
+        assert urls[0].path.endswith(":streamGenerateContent")
+        assert urls[0].params["alt"] == "sse"
+
+    @pytest.mark.asyncio
+    async def test_falls_back_before_first_token(self):
+        """An upstream error before any text is sent falls back to the mock response."""
+        service, client_patch = make_service("openai", "https://api.openai.com/v1/chat/completions", lambda request: httpx.Response(503))
+        messages = [{"role": "user", "content": "how should I budget?"}]
+        with client_patch:
+            fragments = [f async for f in service.stream_response(messages)]
+
+        assert "".join(fragments) == service._generate_mock_response(messages)
+
+    @pytest.mark.asyncio
+    async def test_closing_the_stream_releases_a_half_open_trial(self):
+        """A client disconnect mid-stream doesn't leave the half-open trial marked in flight."""
+        def handler(request):
+            chunks = [json.dumps({"choices": [{"delta": {"content": text}}]}) for text in ["Save ", "early", "."]]
+            return httpx.Response(200, content=sse_body(chunks + ["[DONE]"]))
+
+        service, client_patch = make_service("mistral", "https://api.mistral.ai/v1/chat/completions", handler)
+        stats = service.router.get_stats("mistral")
+        stats.state = stats.HALF_OPEN
+        with client_patch:
+            stream = service.stream_response([{"role": "user", "content": "hi"}])
+            assert await stream.__anext__() == "Save "
+            assert not stats.available()
+            await stream.aclose()
+
+        assert stats.state == stats.HALF_OPEN
+        assert stats.available()
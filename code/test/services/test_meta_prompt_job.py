@@ -0,0 +1,188 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.config import settings
+from app.models.meta_prompt_generator import MetaPromptGenerator
+from app.services.meta_prompt_job import MetaPromptBatchJob
+
+def matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$gte" in condition and (value is None or value < condition["$gte"]):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction=1):
+        self.docs.sort(key=lambda d: d.get(field), reverse=direction == -1)
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class FakeCollection:
+    """Just enough of a Motor collection for the batch job."""
+
+    def __init__(self, docs=None):
+        self.docs = docs or []
+        self.queries = 0
+
+    def find(self, query, projection=None):
+        self.queries += 1
+        return FakeCursor([dict(doc) for doc in self.docs if matches(doc, query)])
+
+    def aggregate(self, pipeline):
+        docs = [doc for doc in self.docs if matches(doc, pipeline[0]["$match"])]
+        latest = {}
+        for doc in docs:
+            latest[doc["user_id"]] = max(latest.get(doc["user_id"], doc["updated_at"]), doc["updated_at"])
+        return FakeCursor([{"_id": user_id, "updated_at": updated} for user_id, updated in latest.items()])
+
+    async def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            existing = next((doc for doc in self.docs if matches(doc, op._filter)), None)
+            if existing is None:
+                self.docs.append(dict(op._doc["$set"]))
+            else:
+                existing.update(op._doc["$set"])
+
+class FakeDatabase:
+    def __init__(self, **collections):
+        self.collections = collections
+
+    def __getattr__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+def make_db():
+    today = datetime.now().strftime('%Y-%m-%d')
+    return FakeDatabase(
+        users=FakeCollection([{"user_id": f"u{i}"} for i in range(5)]),
+        demographic_data=FakeCollection([
+            {"user_id": f"u{i}", "name": f"User {i}", "age": 30 + i, "annual_income": 50000} for i in range(5)
+        ]),
+        account_data=FakeCollection([{"user_id": "u1", "account_balance": 1200, "savings_balance": 300}]),
+        investment_data=FakeCollection([
+            {"user_id": "u1", "investment_type": "stocks", "amount": 100, "current_value": 120, "start_date": "2023-01-01"}
+        ]),
+        transaction_data=FakeCollection([
+            {"user_id": "u1", "date": today, "amount": -40.0, "category": "dining", "merchant": "Cafe"}
+        ])
+    )
+
+class TestMetaPromptBatchJob:
+
+    @pytest.fixture(autouse=True)
+    def without_rollups(self):
+        with patch.object(settings, "META_PROMPT_ROLLUPS_ENABLED", False):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_prompts_match_single_user_generation(self):
+        """Batch prompts are identical to generating each user individually."""
+        db = make_db()
+        job = MetaPromptBatchJob(db, chunk_size=2, workers=0)
+
+        stats = await job.run()
+
+        assert stats["users"] == 5
+        # Three chunks, one query per chunk for each collection
+        assert db.investment_data.queries == 3
+        stored = {doc["user_id"]: doc["prompt_text"] for doc in db.meta_prompts.docs}
+        expected = await job._prefetch(["u1"])
+        assert stored["u1"] == MetaPromptGenerator.render_meta_prompt("u1", expected["u1"])
+        assert "User 1" in stored["u1"] and "Cafe" in stored["u1"]
+
+    @pytest.mark.asyncio
+    async def test_changed_only_skips_fresh_prompts(self):
+        db = make_db()
+        now = datetime.utcnow()
+        db.meta_prompts.docs = [
+            {"user_id": "u0", "prompt_text": "old", "updated_at": now},
+            {"user_id": "u1", "prompt_text": "old", "updated_at": now - timedelta(days=1)},
+        ]
+        db.transaction_rollups.docs = [{"user_id": "u1", "updated_at": now}]
+
+        stats = await MetaPromptBatchJob(db, workers=0).run(changed_only=True)
+
+        assert stats["users"] == 4
+        assert stats["skipped"] == 1
+        prompts = {doc["user_id"]: doc["prompt_text"] for doc in db.meta_prompts.docs}
+        assert prompts["u0"] == "old"
+        assert prompts["u1"] != "old"
+
+    @pytest.mark.asyncio
+    async def test_changed_only_sees_changes_outside_transactions(self):
+        db = make_db()
+        now = datetime.utcnow()
+        db.meta_prompts.docs = [
+            {"user_id": f"u{i}", "prompt_text": "old", "updated_at": now - timedelta(days=1)} for i in range(5)
+        ]
+        # u2's investments changed after its prompt was generated; u3's before
+        db.user_data_changes.docs = [
+            {"user_id": "u2", "updated_at": now},
+            {"user_id": "u3", "updated_at": now - timedelta(days=2)},
+        ]
+
+        stats = await MetaPromptBatchJob(db, workers=0).run(changed_only=True)
+
+        assert stats["users"] == 1
+        prompts = {doc["user_id"]: doc["prompt_text"] for doc in db.meta_prompts.docs}
+        assert prompts["u2"] != "old"
+        assert prompts["u3"] == "old"
+
+    @pytest.mark.asyncio
+    async def test_rollup_prompts_are_opt_in(self):
+        """With rollups on for summaries only, prompts are rendered from the raw 30-day transactions."""
+        db = make_db()
+        today = datetime.now().strftime('%Y-%m-%d')
+        db.transaction_data.docs += [
+            {"user_id": "u1", "date": today, "amount": -45.0, "category": "dining", "merchant": f"Cafe {i}"}
+            for i in range(6)
+        ]
+        # Whole-month rollup that also covers a large expense from outside the 30-day window
+        db.transaction_rollups.docs = [{
+            "user_id": "u1", "month": today[:7], "category": "travel", "count": 1, "abs_total": 900.0,
+            "min_amount": -900.0, "max_spend": 0.0,
+            "smallest": {"amount": -900.0, "merchant": "Airline", "category": "travel", "date": "2000-01-01"}
+        }]
+        raw = {"u1": {}}
+        raw["u1"]["demographics"] = db.demographic_data.docs[1]
+        raw["u1"]["account"] = db.account_data.docs[0]
+        raw["u1"]["investments"] = db.investment_data.docs
+        raw["u1"]["transactions"] = sorted(db.transaction_data.docs, key=lambda d: d["date"], reverse=True)
+
+        with patch.object(settings, "TRANSACTION_ROLLUPS_ENABLED", True):
+            data = await MetaPromptBatchJob(db, workers=0)._prefetch(["u1"])
+            assert "transaction_rollups" not in data["u1"]
+            assert len(data["u1"]["transactions"]) == 7
+            prompt = MetaPromptGenerator.render_meta_prompt("u1", data["u1"])
+            assert prompt == MetaPromptGenerator.render_meta_prompt("u1", raw["u1"])
+            assert "Airline" not in prompt
+
+            with patch.object(settings, "META_PROMPT_ROLLUPS_ENABLED", True):
+                data = await MetaPromptBatchJob(db, workers=0)._prefetch(["u1"])
+            # The rollup path lists fewer transactions and judges whole months by category
+            assert len(data["u1"]["transactions"]) == 5
+            assert "Airline" in MetaPromptGenerator.render_meta_prompt("u1", data["u1"])
@@ -0,0 +1,227 @@
+import asyncio
+import pytest
+import numpy as np
+from bson import ObjectId
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.conversation.memory import ConversationMemory
+from app.conversation.semantic_memory import SemanticMemoryStore, UserMemoryIndex
+from app.utils.embedding_providers import EmbeddingProvider
+
+TOPICS = ["mortgage", "stocks", "budget"]
+
+class KeywordProvider(EmbeddingProvider):
+    """One dimension per topic word, so similarities are predictable."""
+
+    model_name = "keywords"
+    dimension = len(TOPICS)
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        return np.array([[float(topic in text.lower()) for topic in TOPICS] for text in texts], dtype=np.float32)
+
+class GatedProvider(KeywordProvider):
+    """Holds its first batch (the index build's) until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.building = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def aembed(self, texts):
+        if not self.building.is_set():
+            self.building.set()
+            await self.release.wait()
+        return await super().aembed(texts)
+
+def matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            if "$exists" in condition and (field in doc) != condition["$exists"]:
+                return False
+            if "$gte" in condition and (value is None or value < condition["$gte"]):
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction=1):
+        self.docs.sort(key=lambda d: d[field], reverse=direction == -1)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+        self.finds = 0
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        excluded = [field for field, include in (projection or {}).items() if not include]
+        return FakeCursor([
+            {k: v for k, v in doc.items() if k not in excluded} for doc in self.docs if matches(doc, query)
+        ])
+
+    async def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if matches(d, query)), None)
+
+    async def insert_one(self, doc):
+        doc = {"_id": ObjectId(), **doc}
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        self.docs.extend(dict(doc) for doc in docs)
+
+    async def update_one(self, query, update):
+        doc = next((d for d in self.docs if matches(d, query)), None)
+        if doc is not None:
+            for field in update.get("$unset", {}):
+                doc.pop(field, None)
+            doc.update(update["$set"])
+
+    async def bulk_write(self, operations, ordered=True):
+        self.bulk_writes = getattr(self, "bulk_writes", 0) + 1
+        for op in operations:
+            await self.update_one(op._filter, op._doc)
+
+    async def delete_many(self, query):
+        before = len(self.docs)
+        self.docs = [doc for doc in self.docs if not matches(doc, query)]
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+class FakeDatabase:
+    def __init__(self):
+        self.conversations = FakeCollection()
+        self.user_preferences = FakeCollection()
+        self.interaction_embeddings = FakeCollection()
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+class TestUserMemoryIndex:
+
+    def test_recency_breaks_ties_and_capacity_drops_oldest(self):
+        now = datetime(2024, 6, 1)
+        index = UserMemoryIndex(dimension=2, capacity=3)
+        index.add("old", [1, 0], now - timedelta(days=60))
+        index.add("new", [1, 0], now - timedelta(days=1))
+        index.add("other", [0, 1], now)
+
+        ranked = index.search(np.array([1, 0]), k=3, half_life_days=30, min_similarity=0.5, now=now)
+        assert [interaction_id for interaction_id, _ in ranked] == ["new", "old"]
+        assert ranked[1][1] == pytest.approx(0.25, abs=0.01)
+
+        index.add("latest", [1, 0], now)
+        index.add("latest", [1, 0], now)
+        assert len(index) == 3
+        ranked = index.search(np.array([1, 0]), k=3, half_life_days=0, min_similarity=0.5, now=now)
+        assert [interaction_id for interaction_id, _ in ranked if interaction_id == "old"] == []
+
+class TestSemanticMemory:
+
+    @pytest.mark.asyncio
+    async def test_relevant_interactions_are_returned(self):
+        db = FakeDatabase()
+        provider = KeywordProvider()
+        memory = ConversationMemory(db, SemanticMemoryStore(db, provider))
+
+        await memory.store_interaction("u1", "What mortgage rate can I get?", "Around 6%.")
+        await memory.store_interaction("u1", "Should I buy stocks?", "Diversify first.")
+        await memory.store_interaction("u2", "Refinance my mortgage?", "Maybe.")
+
+        context = await memory.get_user_context("u1", query="Tell me more about the mortgage")
+        assert [i["message"] for i in context["interactions"]] == ["What mortgage rate can I get?"]
+        assert "embedding_id" in context["interactions"][0]
+        assert len(db.interaction_embeddings.docs) == 3
+
+        # Stored after the index was built: added in place, no rebuild
+        finds = db.conversations.finds
+        await memory.store_interaction("u1", "Is a 30 year mortgage better?", "Usually safer.")
+        context = await memory.get_user_context("u1", query="mortgage")
+        assert len(context["interactions"]) == 2
+        assert db.conversations.finds - finds == 1
+
+    @pytest.mark.asyncio
+    async def test_image_embedding_is_stored_by_reference(self):
+        db = FakeDatabase()
+        memory = ConversationMemory(db, SemanticMemoryStore(db, KeywordProvider()))
+        image_embedding = np.linspace(-1, 1, 512, dtype=np.float32)
+
+        await memory.store_interaction("u1", "What is this receipt?", "A grocery bill.", image_embedding=image_embedding)
+
+        interaction = db.conversations.docs[0]
+        embedding_id = interaction["metadata"]["image_embedding_id"]
+        assert "image_embedding" not in interaction["metadata"]
+        stored = next(doc for doc in db.interaction_embeddings.docs if doc["_id"] == embedding_id)
+        assert len(stored["vector"]) == 512 * 2
+        restored = await memory.embeddings.get(embedding_id)
+        np.testing.assert_allclose(restored, image_embedding, atol=1e-3)
+
+    @pytest.mark.asyncio
+    async def test_interactions_without_embeddings_are_embedded_once(self):
+        db = FakeDatabase()
+        now = datetime.utcnow()
+        db.conversations.docs.extend([
+            {"_id": ObjectId(), "user_id": "u1", "message": "Help me with a budget",
+             "response": "Sure.", "timestamp": now},
+            {"_id": ObjectId(), "user_id": "u1", "message": "Any stocks to buy?",
+             "response": "Maybe.", "timestamp": now - timedelta(minutes=1)},
+        ])
+        provider = KeywordProvider()
+        store = SemanticMemoryStore(db, provider)
+
+        results = await store.search("u1", "budget")
+        assert [doc["message"] for doc in results] == ["Help me with a budget"]
+        assert all(doc["embedding_model"] == "keywords" for doc in db.conversations.docs)
+        assert len(db.interaction_embeddings.docs) == 2
+        # Both interactions are updated in one round trip
+        assert db.conversations.bulk_writes == 1
+
+        calls = provider.calls
+        await store.search("u1", "budget")
+        assert provider.calls - calls == 1
+
+    @pytest.mark.asyncio
+    async def test_interaction_stored_during_index_build_is_indexed_once(self):
+        db = FakeDatabase()
+        db.conversations.docs.append({"_id": ObjectId(), "user_id": "u1", "message": "Help me with a budget",
+                                      "response": "Sure.", "timestamp": datetime.utcnow() - timedelta(minutes=1)})
+        provider = GatedProvider()
+        store = SemanticMemoryStore(db, provider)
+        memory = ConversationMemory(db, store)
+
+        # The build has read the interactions and is embedding them
+        search = asyncio.create_task(store.search("u1", "mortgage"))
+        await provider.building.wait()
+        store_task = asyncio.create_task(memory.store_interaction("u1", "What mortgage rate can I get?", "Around 6%."))
+        await asyncio.sleep(0.05)
+        provider.release.set()
+        await asyncio.gather(search, store_task)
+
+        index = await store._get_index("u1")
+        assert len(index) == 2
+        results = await store.search("u1", "mortgage")
+        assert [doc["message"] for doc in results] == ["What mortgage rate can I get?"]
+
+        # Adding an interaction the build already read doesn't duplicate it
+        stored = db.conversations.docs[-1]
+        await store.add("u1", stored["_id"], np.array([1, 0, 0]), stored["timestamp"])
+        assert len(index) == 2
@@ -0,0 +1,181 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from app.repository.transaction_rollup_repository import TransactionRollupRepository
+from app.utils.data_processor import DataProcessor
+
+TRANSACTIONS = [
+    {"user_id": "u1", "date": datetime(2024, 3, 2), "amount": 40.0, "merchant": "Netflix.com", "category": "entertainment", "transaction_type": "debit"},
+    {"user_id": "u1", "date": datetime(2024, 3, 9), "amount": 1500.0, "merchant": "Airline", "category": "travel", "transaction_type": "debit"},
+    {"user_id": "u1", "date": datetime(2024, 3, 15), "amount": 60.0, "merchant": "Cinema", "category": "entertainment", "transaction_type": "debit"},
+    {"user_id": "u1", "date": "2024-04-02", "amount": 40.0, "merchant": "Netflix.com", "category": "entertainment", "transaction_type": "debit"},
+    {"user_id": "u1", "date": "2024-04-05", "amount": 3000.0, "merchant": "Employer", "category": "income", "transaction_type": "credit"},
+]
+
+def set_path(doc, path, combine, value):
+    target = doc
+    *parents, leaf = path.split(".")
+    for part in parents:
+        target = target.setdefault(part, {})
+    target[leaf] = combine(target[leaf], value) if leaf in target else value
+
+def fold(transactions):
+    """Apply build_updates to in-memory documents the way MongoDB would."""
+    docs = {}
+    for op in TransactionRollupRepository.build_updates(transactions):
+        spec = op._doc
+        key = tuple(op._filter[f] for f in ("user_id", "month", "category"))
+        doc = docs.get(key)
+        if doc is None:
+            if not op._upsert:
+                continue
+            doc = docs[key] = dict(zip(("user_id", "month", "category"), key))
+        if any(doc.get(f) != v for f, v in op._filter.items()):
+            continue
+        for path, value in spec.get("$inc", {}).items():
+            set_path(doc, path, lambda old, new: old + new, value)
+        for path, value in spec.get("$max", {}).items():
+            set_path(doc, path, max, value)
+        for path, value in spec.get("$min", {}).items():
+            set_path(doc, path, min, value)
+        doc.update(spec.get("$set", {}))
+    return docs
+
+class PausingCursor:
+    """Transactions cursor that stops after the first document until resumed."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.paused = asyncio.Event()
+        self.resume = asyncio.Event()
+
+    def sort(self, field, direction=1):
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def __aiter__(self):
+        for i, doc in enumerate(self.docs):
+            if i == 1:
+                self.paused.set()
+                await self.resume.wait()
+            yield doc
+
+class RecordingRollups:
+    """Rollups collection recording the kind of each write, in order."""
+
+    def __init__(self):
+        self.writes = []
+
+    async def create_index(self, keys, **kwargs):
+        pass
+
+    async def bulk_write(self, operations, ordered=True):
+        self.writes.extend(type(op).__name__ for op in operations)
+
+    async def delete_many(self, query):
+        self.writes.append("DeleteMany")
+
+class TestTransactionRollups:
+
+    def test_build_updates_groups_by_month_and_category(self):
+        docs = fold(TRANSACTIONS)
+
+        march = docs[("u1", "2024-03", "entertainment")]
+        assert march["count"] == 2
+        assert march["spend_total"] == 100.0
+        assert march["largest"]["merchant"] == "Cinema"
+        assert march["merchants"]["Netflix．com"] == {"count": 1, "total": 40.0, "min": 40.0, "max": 40.0}
+
+        # Credits count as spend for the summary but not as debits for the insights
+        income = docs[("u1", "2024-04", "income")]
+        assert income["spend_count"] == 1
+        assert income["debit_count"] == 0
+        assert "largest_debit" not in income
+        assert "merchants" not in income
+
+    def test_build_documents_match_incremental_updates(self):
+        documents = TransactionRollupRepository.build_documents(TRANSACTIONS)
+        docs = fold(TRANSACTIONS)
+
+        assert len(documents) == len(docs)
+        for document in documents:
+            folded = docs[(document["user_id"], document["month"], document["category"])]
+            for field in ("count", "total", "spend_total", "debit_total", "min_amount", "largest", "smallest"):
+                assert document.get(field) == folded.get(field)
+            assert document["merchants"] == folded.get("merchants", {})
+
+    def test_rollup_insights(self):
+        insights = DataProcessor().extract_rollup_insights(list(fold(TRANSACTIONS).values()))
+
+        assert insights["monthly_spending"] == 820.0
+        assert insights["top_categories"][0] == "entertainment"
+        assert insights["large_transactions"] == "Airline ($1500.0)"
+        assert insights["recurring_payments"] == "Netflix.com ($40.0 monthly)"
+
+    def test_rollup_recurring_payments_need_a_regular_cadence(self):
+        transactions = TRANSACTIONS + [
+            {"user_id": "u1", "date": datetime(2024, 3, day), "amount": 25.0, "merchant": "Gym",
+             "category": "health", "transaction_type": "debit"}
+            for day in (1, 8, 15, 22, 29)
+        ] + [
+            # Twice, but months apart
+            {"user_id": "u1", "date": "2024-05-20", "amount": 60.0, "merchant": "Cinema",
+             "category": "entertainment", "transaction_type": "debit"}
+        ]
+        insights = DataProcessor().extract_rollup_insights(list(fold(transactions).values()))
+
+        assert insights["recurring_payments"] == "Gym ($25.0 weekly), Netflix.com ($40.0 monthly)"
+
+    @pytest.mark.asyncio
+    async def test_apply_waits_for_a_running_rebuild(self):
+        """The rebuild's replaced documents must not overwrite increments made meanwhile."""
+        cursor = PausingCursor(TRANSACTIONS)
+        rollups = RecordingRollups()
+        db = SimpleNamespace(transaction_rollups=rollups,
+                             transaction_data=SimpleNamespace(find=lambda query: cursor))
+        repo = TransactionRollupRepository(db)
+
+        rebuild = asyncio.create_task(repo.rebuild())
+        await cursor.paused.wait()
+        new_transaction = {"user_id": "u1", "date": "2024-04-20", "amount": 12.0, "merchant": "Cafe",
+                           "category": "dining", "transaction_type": "debit"}
+        apply = asyncio.create_task(TransactionRollupRepository(db).apply([new_transaction]))
+        await asyncio.sleep(0.05)
+        assert rollups.writes == []
+
+        cursor.resume.set()
+        assert await rebuild == len(TRANSACTIONS)
+        await apply
+        last_replace = len(rollups.writes) - 1 - rollups.writes[::-1].index("ReplaceOne")
+        assert rollups.writes.index("UpdateOne") > last_replace
+        assert rollups.writes.index("UpdateOne") > rollups.writes.index("DeleteMany")
+
+    @pytest.mark.asyncio
+    async def test_transactions_a_rebuild_may_have_read_rebuild_their_user(self):
+        """Inserted before the rebuild read them but applied after: incrementing would count them twice."""
+        cursor = PausingCursor(TRANSACTIONS)
+        cursor.resume.set()
+        rollups = RecordingRollups()
+        db = SimpleNamespace(transaction_rollups=rollups,
+                             transaction_data=SimpleNamespace(find=lambda query: cursor))
+        repo = TransactionRollupRepository(db)
+        inserted = {"_id": ObjectId(), **TRANSACTIONS[0]}
+
+        await repo.rebuild()
+        rollups.writes.clear()
+        await repo.apply([inserted])
+        assert "UpdateOne" not in rollups.writes
+        assert "ReplaceOne" in rollups.writes
+
+        # Inserted after the last rebuild finished: incremented as usual
+        rollups.writes.clear()
+        later = {"_id": ObjectId.from_datetime(datetime.utcnow() + timedelta(seconds=2)), **TRANSACTIONS[0]}
+        await repo.apply([later])
+        assert "ReplaceOne" not in rollups.writes
+        assert "UpdateOne" in rollups.writes
@@ -0,0 +1,67 @@
+import pytest
+import numpy as np
+
+from app.utils.ann_index import top_k, build_index, ExactIndex, IVFFlatIndex, HNSWIndex, hnswlib
+
+def clustered_vectors(n=4000, dim=32, clusters=40, seed=0):
+    """Generate unit-length vectors grouped around random cluster centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    points = centres[rng.integers(0, clusters, n)] + 0.3 * rng.normal(size=(n, dim))
+    points = points.astype(np.float32)
+    return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+def recall_at_k(index, vectors, queries, k=10):
+    """Fraction of the exact top-k neighbours the index returns."""
+    exact = ExactIndex(vectors)
+    hits = 0
+    for query in queries:
+        expected = set(exact.search(query, k)[0].tolist())
+        hits += len(expected & set(index.search(query, k)[0].tolist()))
+    return hits / (k * len(queries))
+
+class TestAnnIndex:
+
+    def test_top_k_matches_full_sort(self):
+        """argpartition-based top-k returns the same order as a full sort."""
+        scores = np.random.default_rng(1).normal(size=1000)
+        np.testing.assert_array_equal(top_k(scores, 7), np.argsort(-scores)[:7])
+        assert len(top_k(scores, 5000)) == 1000
+        assert len(top_k(scores, 0)) == 0
+
+    def test_small_corpus_uses_exact_search(self):
+        """Corpora below the threshold fall back to exact search."""
+        vectors = clustered_vectors(n=50)
+        assert isinstance(build_index(vectors, "ivf"), ExactIndex)
+
+    def test_unknown_index_type_is_rejected(self):
+        """A misspelled index type fails clearly instead of reaching the wrong constructor."""
+        with pytest.raises(ValueError):
+            build_index(clustered_vectors(n=50), "hnws", m=16)
+
+    def test_ivf_recall(self):
+        """IVF keeps high recall while scanning a fraction of the lists."""
+        vectors = clustered_vectors()
+        index = IVFFlatIndex(vectors, nlist=64, nprobe=8)
+        queries = vectors[:50]
+        assert recall_at_k(index, vectors, queries) >= 0.9
+
+    def test_ivf_full_probe_is_exact(self):
+        """Probing every list gives exactly the brute-force result."""
+        vectors = clustered_vectors(n=1000)
+        index = IVFFlatIndex(vectors, nlist=16, nprobe=16)
+        query = vectors[3]
+        indices, scores = index.search(query, 5)
+        exact_indices, exact_scores = ExactIndex(vectors).search(query, 5)
+        np.testing.assert_array_equal(indices, exact_indices)
+        np.testing.assert_allclose(scores, exact_scores, rtol=1e-5)
+
+    @pytest.mark.skipif(hnswlib is None, reason="hnswlib is not installed")
+    def test_hnsw_recall(self):
+        """The hnswlib adapter returns inner-product scores with high recall."""
+        vectors = clustered_vectors()
+        index = HNSWIndex(vectors, m=16, ef_construction=100, ef_search=64)
+        assert recall_at_k(index, vectors, vectors[:50]) >= 0.9
+        indices, scores = index.search(vectors[0], 1)
+        assert indices[0] == 0
+        assert scores[0] == pytest.approx(1.0, abs=1e-4)
@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+
+from app.utils.batch_executor import BatchExecutor
+
+class TestBatchExecutor:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_items_share_batches(self):
+        batches = []
+
+        def double(items):
+            batches.append(len(items))
+            return [item * 2 for item in items]
+
+        executor = BatchExecutor("double", double, max_batch_size=4, max_wait_ms=50)
+        try:
+            results = await asyncio.gather(*(executor.run(i) for i in range(10)))
+        finally:
+            executor.stop()
+
+        assert results == [i * 2 for i in range(10)]
+        assert sum(batches) == 10
+        assert max(batches) == 4
+        assert len(batches) <= 4
+
+        stats = executor.stats()
+        assert stats["items"] == 10
+        assert stats["batches"] == len(batches)
+        assert sum(stats["batch_sizes"].values()) == len(batches)
+        assert stats["batch_sizes"]["<=4"] >= 1
+        assert stats["queue_depth"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_fails_its_items_only(self):
+        def fail_on_negative(items):
+            if any(item < 0 for item in items):
+                raise ValueError("negative input")
+            return items
+
+        executor = BatchExecutor("check", fail_on_negative, max_batch_size=8, max_wait_ms=20)
+        try:
+            results = await asyncio.gather(executor.run(1), executor.run(-1), return_exceptions=True)
+            assert all(isinstance(result, ValueError) for result in results)
+            assert await executor.run(3) == 3
+        finally:
+            executor.stop()
+
+        assert executor.stats()["errors"] == 1
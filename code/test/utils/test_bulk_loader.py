@@ -0,0 +1,153 @@
+import asyncio
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from app.utils import bulk_loader
+from app.utils.bulk_loader import BulkLoader
+
+class FakeCollection:
+    def __init__(self, name, failures=None):
+        self.name = name
+        self.docs = []
+        self.indexes = []
+        self.failures = list(failures or [])
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def insert_many(self, records, ordered=True):
+        assert ordered is False
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.failures:
+                failure = self.failures.pop(0)
+                if failure is not None:
+                    raise failure(records, self)
+            self.docs.extend(records)
+
+            class Result:
+                inserted_ids = list(range(len(records)))
+            return Result()
+        finally:
+            self.in_flight -= 1
+
+    async def create_index(self, spec):
+        # Indexes are only built once every batch is in
+        assert self.in_flight == 0
+        self.indexes.append((spec, len(self.docs)))
+
+class FakeDatabase:
+    def __init__(self, **collections):
+        self.collections = collections
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+def partial_failure(records, collection):
+    """The first two rows are inserted and the rest fail with a retryable error."""
+    collection.docs.extend(records[:2])
+    errors = [{"index": i, "code": 91, "errmsg": "shutdown in progress"} for i in range(2, len(records))]
+    return BulkWriteError({"nInserted": 2, "writeErrors": errors})
+
+def write_csv(path, rows):
+    lines = ["user_id,amount"] + [f"{i},{i * 1.5}" for i in range(rows)]
+    path.write_text("\n".join(lines) + "\n")
+
+@pytest.fixture(autouse=True)
+def csv_mode(monkeypatch):
+    monkeypatch.setattr(bulk_loader, "columnar_enabled", lambda: False)
+
+class TestBulkLoader:
+
+    @pytest.mark.asyncio
+    async def test_loads_in_bounded_parallel_batches(self, tmp_path):
+        csv_path = tmp_path / "data.csv"
+        write_csv(csv_path, 95)
+        collection = FakeCollection("data")
+        seen = []
+
+        async def on_batch(records):
+            seen.append(len(records))
+
+        loader = BulkLoader(FakeDatabase(data=collection), batch_size=10, max_in_flight=3)
+        stats = await loader.load_collection("data", csv_path, indexes=["user_id"], on_batch=on_batch)
+
+        assert stats.rows == 95
+        assert stats.batches == 10
+        assert sorted(seen) == [5] + [10] * 9
+        assert 1 < collection.max_in_flight <= 3
+        assert sorted(doc["user_id"] for doc in collection.docs) == list(range(95))
+        assert collection.indexes == [("user_id", 95)]
+
+    @pytest.mark.asyncio
+    async def test_retries_failed_rows_only(self, tmp_path):
+        csv_path = tmp_path / "data.csv"
+        write_csv(csv_path, 5)
+        collection = FakeCollection("data", failures=[partial_failure, lambda r, c: AutoReconnect("lost")])
+
+        loader = BulkLoader(FakeDatabase(data=collection), batch_size=10, max_retries=3, retry_delay=0)
+        stats = await loader.load_collection("data", csv_path)
+
+        assert stats.rows == 5
+        assert stats.retries == 2
+        assert stats.failed_rows == 0
+        assert sorted(doc["user_id"] for doc in collection.docs) == list(range(5))
+
+    @pytest.mark.asyncio
+    async def test_duplicates_from_an_earlier_attempt_are_not_retried(self, tmp_path):
+        csv_path = tmp_path / "data.csv"
+        write_csv(csv_path, 3)
+
+        def lost_ack(records, collection):
+            collection.docs.extend(records)
+            return AutoReconnect("connection closed before the reply")
+
+        def duplicates(records, collection):
+            errors = [{"index": i, "code": 11000, "errmsg": "duplicate key"} for i in range(len(records))]
+            return BulkWriteError({"nInserted": 0, "writeErrors": errors})
+
+        collection = FakeCollection("data", failures=[lost_ack, duplicates])
+        loader = BulkLoader(FakeDatabase(data=collection), batch_size=10, max_retries=3, retry_delay=0)
+        stats = await loader.load_collection("data", csv_path)
+
+        assert stats.rows == 3
+        assert stats.retries == 1
+        assert len(collection.docs) == 3
+
+    @pytest.mark.asyncio
+    async def test_rows_that_already_existed_are_not_reported_as_inserted(self, tmp_path):
+        csv_path = tmp_path / "data.csv"
+        write_csv(csv_path, 3)
+
+        def first_row_exists(records, collection):
+            collection.docs.extend(records[1:])
+            return BulkWriteError({"nInserted": 2, "writeErrors": [{"index": 0, "code": 11000, "errmsg": "duplicate key"}]})
+
+        collection = FakeCollection("data", failures=[first_row_exists])
+        seen = []
+
+        async def on_batch(records):
+            seen.extend(record["user_id"] for record in records)
+
+        loader = BulkLoader(FakeDatabase(data=collection), batch_size=10, max_retries=3, retry_delay=0)
+        stats = await loader.load_collection("data", csv_path, on_batch=on_batch)
+
+        assert stats.rows == 2
+        assert stats.failed_rows == 0
+        assert seen == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_load_all_runs_collections_independently(self, tmp_path):
+        good_path = tmp_path / "good.csv"
+        write_csv(good_path, 4)
+        db = FakeDatabase(good=FakeCollection("good"))
+
+        stats = await BulkLoader(db, batch_size=2).load_all(
+            {"good": good_path, "missing": tmp_path / "missing.csv"},
+            indexes={"good": ["user_id"]}
+        )
+
+        assert list(stats) == ["good"]
+        assert stats["good"].rows == 4
+        assert db["good"].indexes == [("user_id", 4)]
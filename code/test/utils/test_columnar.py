@@ -0,0 +1,29 @@
+import os
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.utils.columnar import convert_csv_to_parquet, parquet_path_for
+
+def write_accounts(path, rows):
+    lines = ["user_id,account_id,account_type,balance,interest_rate,opening_date"]
+    lines += [f"{i},{i},savings,{i * 10},0.01,2024-01-0{i % 9 + 1}" for i in range(rows)]
+    path.write_text("\n".join(lines) + "\n")
+
+class TestColumnarIngestion:
+
+    def test_conversion_uses_explicit_schema_and_is_cached(self, tmp_path):
+        csv_path = tmp_path / "account_data.csv"
+        write_accounts(csv_path, 3)
+
+        parquet_path = convert_csv_to_parquet(csv_path)
+        assert parquet_path == parquet_path_for(csv_path)
+
+        import pyarrow.parquet as pq
+        schema = pq.read_schema(parquet_path)
+        assert str(schema.field("balance").type) == "double"
+        assert str(schema.field("opening_date").type) == "string"
+
+        mtime = os.path.getmtime(parquet_path)
+        assert convert_csv_to_parquet(csv_path) == parquet_path
+        assert os.path.getmtime(parquet_path) == mtime
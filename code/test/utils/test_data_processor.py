@@ -0,0 +1,47 @@
+import pandas as pd
+
+from app.utils.data_processor import DataProcessor
+
+def debit(merchant, amount, date, category="bills"):
+    return {"merchant": merchant, "amount": amount, "date": date, "category": category, "transaction_type": "debit"}
+
+class TestTransactionInsights:
+
+    def test_recurring_payments_need_similar_amounts_and_cadence(self):
+        transactions = (
+            [debit("Gym", 30.0, f"2024-0{m}-03") for m in range(1, 5)]
+            + [debit("Coffee", 4.5 + i * 0.1, d) for i, d in enumerate(["2024-03-01", "2024-03-08", "2024-03-15"])]
+            # Same shop, wildly different amounts
+            + [debit("Grocer", a, d) for a, d in [(20.0, "2024-01-05"), (140.0, "2024-02-05"), (75.0, "2024-03-05")]]
+            # Similar amounts but irregular timing
+            + [debit("Cinema", 12.0, d) for d in ["2024-01-01", "2024-01-03", "2024-04-20"]]
+        )
+
+        insights = DataProcessor().extract_transaction_insights(transactions)
+
+        assert insights["recurring_payments"] == "Gym ($30.0 monthly), Coffee ($4.6 weekly)"
+
+    def test_result_shape(self):
+        transactions = [
+            debit("Airline", 1500.0, "2024-03-01", "travel"),
+            debit("Hotel", 1200.0, "2024-03-02", "travel"),
+            debit("Cafe", 5.0, "2024-03-03", "dining"),
+            {"merchant": "Employer", "amount": 4000.0, "date": "2024-03-01", "category": "income", "transaction_type": "credit"},
+        ]
+
+        insights = DataProcessor().extract_transaction_insights(pd.DataFrame(transactions))
+
+        assert insights == {
+            "monthly_spending": 2705.0,
+            "top_categories": ["travel", "dining"],
+            "large_transactions": "Airline ($1500.0), Hotel ($1200.0)",
+            "recurring_payments": None
+        }
+
+    def test_without_dates_only_amounts_are_checked(self):
+        transactions = [{"merchant": "Gym", "amount": 30.0, "transaction_type": "debit"}] * 2
+
+        insights = DataProcessor().extract_transaction_insights(transactions)
+
+        assert insights["recurring_payments"] == "Gym ($30.0 monthly)"
+        assert DataProcessor().extract_transaction_insights([]) == {}
@@ -0,0 +1,176 @@
+import os
+import pytest
+from itertools import count
+from pymongo import DeleteMany
+
+from app.utils.delta_sync import DeltaSync, ROW_HASH_FIELD
+
+def matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            if "$exists" in condition:
+                if (field in doc) != condition["$exists"]:
+                    return False
+            elif doc.get(field) not in condition["$in"]:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class BulkResult:
+    def __init__(self, upserted_ids=None, deleted_count=0):
+        self.upserted_ids = upserted_ids or {}
+        self.deleted_count = deleted_count
+
+class FakeCollection:
+    """Just enough of a Motor collection for delta syncs."""
+
+    ids = count()
+
+    def __init__(self):
+        self.docs = []
+        self.writes = 0
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(doc) for doc in self.docs if matches(doc, query)])
+
+    async def find_one(self, query):
+        return next((dict(doc) for doc in self.docs if matches(doc, query)), None)
+
+    async def update_one(self, query, update, upsert=False):
+        existing = next((doc for doc in self.docs if matches(doc, query)), None)
+        if existing is None:
+            self.docs.append({**query, **update["$set"]})
+        else:
+            existing.update(update["$set"])
+
+    async def create_index(self, spec):
+        pass
+
+    async def bulk_write(self, operations, ordered=True):
+        upserted = {}
+        deleted = 0
+        for index, op in enumerate(operations):
+            if isinstance(op, DeleteMany):
+                before = len(self.docs)
+                self.docs = [doc for doc in self.docs if not matches(doc, op._filter)]
+                deleted += before - len(self.docs)
+                continue
+            self.writes += 1
+            existing = next((doc for doc in self.docs if matches(doc, op._filter)), None)
+            if existing is None:
+                upserted[index] = next(self.ids)
+                self.docs.append({"_id": upserted[index], **op._doc["$set"]})
+            else:
+                existing.update(op._doc["$set"])
+        return BulkResult(upserted, deleted)
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+HEADER = "user_id,transaction_id,date,amount,merchant,category,transaction_type\n"
+
+def row(user_id, transaction_id, amount=10):
+    return f"{user_id},{transaction_id},2024-01-01,{amount},Shop,groceries,debit\n"
+
+def write(path, rows, mode="w"):
+    with open(path, mode) as f:
+        if mode == "w":
+            f.write(HEADER)
+        f.writelines(rows)
+
+class TestDeltaSync:
+
+    @pytest.mark.asyncio
+    async def test_unchanged_and_appended_files(self, tmp_path):
+        csv_path = tmp_path / "transaction_data.csv"
+        write(csv_path, [row(1, 1), row(1, 2), row(2, 3)])
+        db = FakeDatabase()
+        sync = DeltaSync(db, batch_size=2)
+        inserted = []
+
+        async def on_insert(records):
+            inserted.extend(r["transaction_id"] for r in records)
+
+        first = await sync.sync("transaction_data", csv_path, on_insert=on_insert)
+        assert first["mode"] == "full"
+        assert first["inserted"] == 3
+        assert ROW_HASH_FIELD in db["transaction_data"].docs[0]
+
+        # Nothing changed: the file isn't read at all
+        assert (await sync.sync("transaction_data", csv_path))["mode"] == "unchanged"
+
+        write(csv_path, [row(2, 4), row(3, 5)], mode="a")
+        appended = await sync.sync("transaction_data", csv_path, on_insert=on_insert)
+        assert appended["mode"] == "append"
+        assert appended["rows_read"] == 2
+        assert appended["inserted"] == 2
+        assert inserted == [1, 2, 3, 4, 5]
+        assert len(db["transaction_data"].docs) == 5
+
+    @pytest.mark.asyncio
+    async def test_half_written_row_is_read_again(self, tmp_path):
+        csv_path = tmp_path / "transaction_data.csv"
+        write(csv_path, [row(1, 1), "1,2,2024-01-01,5"])
+        db = FakeDatabase()
+        sync = DeltaSync(db)
+
+        first = await sync.sync("transaction_data", csv_path)
+        assert first["rows_read"] == 1
+
+        write(csv_path, [",Shop,groceries,debit\n"], mode="a")
+        second = await sync.sync("transaction_data", csv_path)
+        assert second["mode"] == "append"
+        assert second["inserted"] == 1
+        assert db["transaction_data"].docs[-1]["merchant"] == "Shop"
+
+    @pytest.mark.asyncio
+    async def test_rewritten_file_upserts_changes_and_prunes(self, tmp_path):
+        csv_path = tmp_path / "transaction_data.csv"
+        write(csv_path, [row(1, 1), row(1, 2), row(2, 3)])
+        db = FakeDatabase()
+        sync = DeltaSync(db, batch_size=1, prune=True)
+        await sync.sync("transaction_data", csv_path)
+        writes = db["transaction_data"].writes
+        # Created through the API, not the file: never pruned
+        db["transaction_data"].docs.append({"_id": "api", "user_id": 4, "transaction_id": 7, "amount": 5.0})
+        changed = []
+
+        async def on_change(user_ids):
+            changed.append(user_ids)
+
+        write(csv_path, [row(1, 1), row(1, 2, amount=99), row(3, 6)])
+        os.utime(csv_path, (1, 1))
+        stats = await sync.sync("transaction_data", csv_path, on_change=on_change)
+
+        assert stats["mode"] == "full"
+        assert (stats["unchanged"], stats["updated"], stats["inserted"], stats["deleted"]) == (1, 1, 1, 1)
+        assert db["transaction_data"].writes - writes == 2
+        # Changed users arrive in batch_size chunks
+        assert sorted(changed) == [[1], [2]]
+        amounts = {doc["transaction_id"]: doc["amount"] for doc in db["transaction_data"].docs}
+        assert amounts == {1: 10.0, 2: 99.0, 6: 10.0, 7: 5.0}
@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+from unittest.mock import patch
+
+from app.utils.embedding_cache import EmbeddingCache
+from app.utils.embedding_providers import OpenAIEmbeddingProvider, OPENAI_EMBEDDING_MODEL
+from app.utils.vector_store import VectorStore
+
+class TestEmbeddingCache:
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Create a cache backed by a temporary SQLite file."""
+        cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite3"), memory_size=2)
+        yield cache
+        cache.close()
+
+    def test_get_many_returns_none_for_misses(self, cache):
+        """Uncached texts come back as None, cached ones as float32 vectors."""
+        cache.put_many("model", ["a"], [[1.0, 2.0]])
+        hit, miss = cache.get_many("model", ["a", "b"])
+        assert miss is None
+        np.testing.assert_array_equal(hit, np.array([1.0, 2.0], dtype=np.float32))
+
+    def test_keys_are_scoped_by_model(self, cache):
+        """The same text embedded by another model is a miss."""
+        cache.put_many("model-a", ["text"], [[1.0]])
+        assert cache.get_many("model-b", ["text"]) == [None]
+
+    def test_lru_evicts_but_sqlite_keeps(self, cache):
+        """Entries evicted from memory are still served from SQLite."""
+        cache.put_many("model", ["a", "b", "c"], [[1.0], [2.0], [3.0]])
+        assert len(cache._memory) == 2
+        assert cache.get_many("model", ["a"])[0][0] == 1.0
+
+    def test_persists_across_instances(self, cache, tmp_path):
+        """A new cache over the same file sees earlier entries."""
+        cache.put_many("model", ["persisted"], [[4.0]])
+        reopened = EmbeddingCache(path=cache.path)
+        assert reopened.get_many("model", ["persisted"])[0][0] == 4.0
+        reopened.close()
+
+    def test_vector_store_only_embeds_misses(self, cache):
+        """VectorStore sends only uncached, de-duplicated texts upstream and keeps order."""
+        cache.put_many(OPENAI_EMBEDDING_MODEL, ["cached"], [[9.0, 9.0]])
+
+        def fake_create(input, model):
+            return {"data": [{"embedding": [float(len(text)), 0.0]} for text in input]}
+
+        with patch("app.utils.vector_store.get_embedding_cache", return_value=cache), \
+             patch("app.utils.embedding_providers.openai.Embedding.create", side_effect=fake_create) as create:
+            embeddings = VectorStore(provider=OpenAIEmbeddingProvider())._get_embeddings(["new", "cached", "new", "newer"])
+
+        create.assert_called_once()
+        assert create.call_args.kwargs["input"] == ["new", "newer"]
+        assert embeddings == [[3.0, 0.0], [9.0, 9.0], [3.0, 0.0], [5.0, 0.0]]
+        assert cache.get_many(OPENAI_EMBEDDING_MODEL, ["newer"])[0] is not None
+
+    def test_failed_embeddings_are_not_cached(self, cache):
+        """Zero-vector fallbacks from an upstream error never enter the cache."""
+        with patch("app.utils.vector_store.get_embedding_cache", return_value=cache), \
+             patch("app.utils.embedding_providers.openai.Embedding.create", side_effect=RuntimeError("down")):
+            embeddings = VectorStore(provider=OpenAIEmbeddingProvider())._get_embeddings(["text"])
+
+        assert not any(embeddings[0])
+        assert cache.get_many(OPENAI_EMBEDDING_MODEL, ["text"]) == [None]
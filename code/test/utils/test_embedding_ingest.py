@@ -0,0 +1,113 @@
+import json
+import pytest
+import httpx
+from unittest.mock import patch
+
+from app.utils.embedding_ingest import EmbeddingIngestor, OpenAIEmbeddingClient
+from app.utils.vector_store import VectorStore
+
+class StubEmbeddingServer:
+    """Local stand-in for an OpenAI-compatible /embeddings endpoint."""
+
+    def __init__(self, fail_once_on=None, fail_always_on=None):
+        self.fail_once_on = set(fail_once_on or [])
+        self.fail_always_on = set(fail_always_on or [])
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        texts = payload["input"]
+        self.requests.append(texts)
+
+        for text in texts:
+            if text in self.fail_always_on:
+                return httpx.Response(500, json={"error": "boom"})
+            if text in self.fail_once_on:
+                self.fail_once_on.discard(text)
+                return httpx.Response(429, headers={"Retry-After": "0"}, json={"error": "rate limited"})
+
+        # Return items out of order to check the client re-sorts by index
+        data = [{"index": i, "embedding": [float(len(text)), 1.0]} for i, text in enumerate(texts)]
+        return httpx.Response(200, json={"data": list(reversed(data))})
+
+def make_ingestor(server, **kwargs):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(server))
+    embedder = OpenAIEmbeddingClient(base_url="http://stub.local/v1", api_key="test", client=client)
+    kwargs.setdefault("max_retries", 2)
+    kwargs.setdefault("backoff_base", 0.0)
+    return EmbeddingIngestor(embedder.embed, **kwargs)
+
+class TestEmbeddingIngestor:
+
+    def test_batches_respect_token_and_count_limits(self):
+        """Texts are split by both the token budget and the text count."""
+        ingestor = EmbeddingIngestor(embed_fn=lambda texts: None, max_tokens_per_batch=10, max_texts_per_batch=3)
+        # Count one token per character so the expected split is tokenizer-independent
+        with patch("app.utils.embedding_ingest.count_tokens", side_effect=len):
+            batches = list(ingestor.make_batches(["a" * 5] * 4 + ["b"] * 5))
+
+        assert all(tokens <= 10 for _, _, tokens in batches)
+        assert all(len(texts) <= 3 for _, texts, _ in batches)
+        assert sum(len(texts) for _, texts, _ in batches) == 9
+        assert [start for start, _, _ in batches] == [0, 2, 4, 7]
+
+    @pytest.mark.asyncio
+    async def test_ingest_streams_all_batches(self):
+        """Every text is embedded exactly once and results carry throughput."""
+        server = StubEmbeddingServer()
+        ingestor = make_ingestor(server, max_texts_per_batch=2, max_in_flight=2)
+        texts = [f"text {i}" for i in range(7)]
+
+        results = [result async for result in ingestor.ingest(texts)]
+
+        assert len(results) == 4
+        assert all(result.ok for result in results)
+        embedded = {}
+        for result in results:
+            for offset, embedding in enumerate(result.embeddings):
+                embedded[result.start + offset] = embedding
+        assert embedded == {i: [float(len(texts[i])), 1.0] for i in range(7)}
+        assert all(result.texts_per_second > 0 for result in results)
+
+    @pytest.mark.asyncio
+    async def test_only_failed_batch_is_retried(self):
+        """A rate-limited batch is retried on its own; other batches are sent once."""
+        server = StubEmbeddingServer(fail_once_on=["text 3"])
+        ingestor = make_ingestor(server, max_texts_per_batch=2)
+
+        results = [result async for result in ingestor.ingest([f"text {i}" for i in range(6)])]
+
+        assert all(result.ok for result in results)
+        assert len(server.requests) == 4
+        assert server.requests.count(["text 2", "text 3"]) == 2
+        retried = [result for result in results if result.start == 2][0]
+        assert retried.attempts == 2
+
+    @pytest.mark.asyncio
+    async def test_persistent_failure_is_reported_not_zero_filled(self):
+        """A batch that keeps failing is reported with its error and no embeddings."""
+        server = StubEmbeddingServer(fail_always_on=["bad"])
+        ingestor = make_ingestor(server, max_texts_per_batch=1, max_retries=1)
+
+        results = {result.start: result async for result in ingestor.ingest(["good", "bad"])}
+
+        assert results[0].ok
+        assert not results[1].ok
+        assert results[1].embeddings is None
+        assert results[1].attempts == 2
+
+    @pytest.mark.asyncio
+    async def test_vector_store_skips_failed_texts(self):
+        """VectorStore.aadd_texts stores successful texts only."""
+        server = StubEmbeddingServer(fail_always_on=["bad"])
+        ingestor = make_ingestor(server, max_texts_per_batch=1, max_retries=0)
+        store = VectorStore()
+
+        with patch("app.utils.vector_store.get_embedding_cache", return_value=None):
+            stats = await store.aadd_texts(["good", "bad", "fine"], [{"n": 1}, {"n": 2}, {"n": 3}], ingestor=ingestor)
+
+        assert stats["added"] == 2
+        assert stats["failed"] == 1
+        assert store.texts == ["good", "fine"]
+        assert store.metadatas == [{"n": 1}, {"n": 3}]
+        assert not store.has_empty_embeddings()
@@ -0,0 +1,71 @@
+import pytest
+import numpy as np
+from unittest.mock import patch
+
+from app.utils.embedding_providers import EmbeddingProvider
+from app.utils.vector_store import VectorStore
+
+class FakeProvider(EmbeddingProvider):
+    """Deterministic local provider that records every batch it embeds."""
+
+    model_name = "fake-model"
+    dimension = 16
+
+    def __init__(self):
+        self.batches = []
+
+    def embed(self, texts):
+        self.batches.append(list(texts))
+        vectors = [np.random.default_rng(sum(ord(c) for c in text)).normal(size=self.dimension) for text in texts]
+        return np.asarray(vectors, dtype=np.float32)
+
+TEXTS = ["savings account", "mortgage loan", "travel card", "retirement plan"]
+
+class TestEmbeddingProviders:
+
+    @pytest.fixture(autouse=True)
+    def no_cache(self):
+        with patch("app.utils.vector_store.get_embedding_cache", return_value=None):
+            yield
+
+    def test_vector_store_uses_provider(self):
+        """Texts are embedded by the configured provider in one batch."""
+        provider = FakeProvider()
+        store = VectorStore(provider=provider)
+        store.add_texts(TEXTS)
+
+        assert provider.batches == [TEXTS]
+        assert store.model_name == "fake-model"
+        assert store.similarity_search("mortgage loan", k=1)[0]["page_content"] == "mortgage loan"
+
+    @pytest.mark.asyncio
+    async def test_async_search_matches_sync_search(self):
+        """asimilarity_search embeds off the event loop and returns the same ranking."""
+        store = VectorStore(provider=FakeProvider())
+        store.add_texts(TEXTS)
+
+        expected = store.similarity_search("travel card", k=2)
+        results = await store.asimilarity_search("travel card", k=2)
+
+        assert [r["page_content"] for r in results] == [r["page_content"] for r in expected]
+
+    @pytest.mark.parametrize("dtype, tolerance", [("float16", 1e-3), ("int8", 2e-2)])
+    def test_compact_storage_keeps_ranking(self, dtype, tolerance, tmp_path):
+        """float16 and int8 stores score close to float32 and round-trip through save/load."""
+        exact = VectorStore(provider=FakeProvider())
+        exact.add_texts(TEXTS)
+        compact = VectorStore(provider=FakeProvider(), storage_dtype=dtype)
+        compact.add_texts(TEXTS)
+
+        assert compact.embeddings.dtype == np.dtype(dtype)
+        for query in TEXTS:
+            expected = exact.similarity_search(query, k=4)
+            results = compact.similarity_search(query, k=4)
+            assert results[0]["page_content"] == query
+            for a, b in zip(sorted(r["similarity"] for r in expected), sorted(r["similarity"] for r in results)):
+                assert abs(a - b) < tolerance
+
+        compact.save(str(tmp_path))
+        loaded = VectorStore.load(str(tmp_path))
+        assert loaded.embeddings.dtype == np.dtype(dtype)
+        assert loaded.model_name == "fake-model"
@@ -0,0 +1,31 @@
+import pytest
+from unittest.mock import patch
+
+from app.config import settings
+from app.utils import http_client
+from app.utils.http_client import get_http_client, close_http_client, provider_timeout
+
+class TestHttpClient:
+
+    def test_provider_timeout_overrides_defaults(self):
+        """Provider-specific timeouts win; unset ones fall back to HTTP_* defaults."""
+        with patch.object(settings, "MISTRAL_READ_TIMEOUT", 90.0), \
+             patch.object(settings, "MISTRAL_CONNECT_TIMEOUT", None):
+            timeout = provider_timeout("mistral")
+
+        assert timeout.read == 90.0
+        assert timeout.connect == settings.HTTP_CONNECT_TIMEOUT
+        assert provider_timeout().read == settings.HTTP_READ_TIMEOUT
+
+    @pytest.mark.asyncio
+    async def test_client_is_shared_until_closed(self):
+        """Every caller gets the same pooled client; closing it allows a fresh one."""
+        with patch.object(http_client, "_http_client", None):
+            first = get_http_client()
+            assert get_http_client() is first
+
+            await close_http_client()
+            assert first.is_closed
+            second = get_http_client()
+            assert second is not first
+            await close_http_client()
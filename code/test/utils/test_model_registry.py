@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+from app.utils.model_registry import ModelRegistry
+
+class FakeModel:
+    pass
+
+class CountingLoader:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, name, device):
+        with self.lock:
+            self.calls.append((name, device))
+        time.sleep(0.05)
+        if name in self.fail:
+            raise OSError(f"{name} not found")
+        return FakeModel()
+
+class TestModelRegistry:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_load(self):
+        loader = CountingLoader()
+        registry = ModelRegistry(loader)
+
+        models = await asyncio.gather(*(registry.aget("mini", "cpu") for _ in range(5)))
+
+        assert loader.calls == [("mini", "cpu")]
+        assert all(model is models[0] for model in models)
+        assert registry.get("mini", "cpu") is models[0]
+        stats = registry.stats()[0]
+        assert stats["loaded"] and stats["hits"] == 6
+        assert stats["load_seconds"] >= 0.05
+
+    @pytest.mark.asyncio
+    async def test_failed_load_is_not_retried_immediately(self):
+        loader = CountingLoader(fail={"missing"})
+        registry = ModelRegistry(loader)
+
+        result = await registry.warm_up(["mini", "missing"], device="cpu")
+        assert result["loaded"] == ["mini"]
+        assert "missing" in result["failed"]
+
+        with pytest.raises(RuntimeError):
+            registry.get("missing", "cpu")
+        assert loader.calls.count(("missing", "cpu")) == 1
+
+        with patch("app.utils.model_registry.settings.MODEL_LOAD_RETRY_SECONDS", 0):
+            with pytest.raises(RuntimeError):
+                registry.get("missing", "cpu")
+        assert loader.calls.count(("missing", "cpu")) == 2
@@ -0,0 +1,46 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.config import settings
+from app.database import mongodb
+
+class TestMongoPool:
+
+    def test_compressors_are_filtered_to_installed_modules(self):
+        with patch.object(mongodb.importlib.util, "find_spec", side_effect=lambda name: None if name == "zstandard" else object()):
+            assert mongodb.available_compressors("zstd, snappy,zlib,bogus") == ["snappy", "zlib"]
+
+    def test_pool_metrics_snapshot(self):
+        metrics = mongodb.PoolMetrics()
+        event = SimpleNamespace(address=("db1", 27017))
+        for _ in range(3):
+            metrics.connection_created(event)
+        metrics.connection_closed(event)
+        metrics.connection_checked_out(event)
+        metrics.connection_checked_out(event)
+        metrics.connection_checked_in(event)
+
+        server = metrics.snapshot()["db1:27017"]
+        assert (server["open"], server["in_use"], server["idle"]) == (2, 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_shared_client_uses_pool_settings(self):
+        await mongodb.close_mongo_connection()
+        with patch.object(settings, "USE_LOCAL_DB", True), \
+             patch.object(settings, "MONGODB_MAX_POOL_SIZE", 7), \
+             patch.object(settings, "MONGODB_MIN_POOL_SIZE", 2), \
+             patch.object(settings, "MONGODB_ANALYTICS_READ_PREFERENCE", "secondaryPreferred"):
+            try:
+                client = mongodb.get_mongo_client()
+                assert mongodb.get_mongo_client() is client
+
+                pool_options = client.delegate.options.pool_options
+                assert (pool_options.max_pool_size, pool_options.min_pool_size) == (7, 2)
+
+                analytics = await mongodb.get_analytics_database()
+                assert analytics.read_preference.mongos_mode == "secondaryPreferred"
+                assert analytics.client is client
+                assert mongodb.get_pool_stats()["max_pool_size"] == 7
+            finally:
+                await mongodb.close_mongo_connection()
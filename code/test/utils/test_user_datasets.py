@@ -0,0 +1,43 @@
+import os
+import pandas as pd
+from unittest.mock import patch
+
+from app.models.meta_prompt_generator import MetaPromptGenerator
+from app.utils.user_datasets import UserDataset
+
+class TestUserDatasets:
+
+    def test_loads_lazily_and_indexes_by_user(self, tmp_path):
+        path = tmp_path / "account_data.csv"
+        pd.DataFrame({"user_id": ["u2", "u1", "u2"], "balance": [1, 2, 3]}).to_csv(path, index=False)
+
+        dataset = UserDataset("account", path)
+        with patch("app.utils.user_datasets.pd.read_csv", wraps=pd.read_csv) as read_csv:
+            assert dataset._frame is None
+            assert dataset.for_user("u2")["balance"].tolist() == [1, 3]
+            assert dataset.for_user("u2")["user_id"].tolist() == ["u2", "u2"]
+            assert dataset.for_user("u1")["balance"].tolist() == [2]
+            assert dataset.for_user("missing").empty
+            # The whole frame keeps its shape: user_id stays a column
+            assert dataset.frame["user_id"].tolist() == ["u2", "u1", "u2"]
+        read_csv.assert_called_once()
+
+    def test_reloads_when_file_changes(self, tmp_path):
+        path = tmp_path / "account_data.csv"
+        pd.DataFrame({"user_id": ["u1"], "balance": [1]}).to_csv(path, index=False)
+        dataset = UserDataset("account", path)
+        assert len(dataset) == 1
+
+        pd.DataFrame({"user_id": ["u1", "u2"], "balance": [1, 2]}).to_csv(path, index=False)
+        os.utime(path, (dataset._mtime + 10, dataset._mtime + 10))
+        assert len(dataset) == 2
+
+    def test_missing_file_is_empty(self, tmp_path):
+        dataset = UserDataset("account", tmp_path / "nope.csv")
+        assert dataset.frame.empty
+        assert dataset.for_user("u1").empty
+
+    def test_generator_construction_reads_nothing(self):
+        with patch("app.utils.user_datasets.pd.read_csv") as read_csv:
+            MetaPromptGenerator(db=None)
+        read_csv.assert_not_called()
@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+from unittest.mock import patch
+
+from app.utils.vector_store import VectorStore
+
+def fake_embeddings(texts):
+    """Deterministic 8-dimensional embeddings derived from the text."""
+    vectors = []
+    for text in texts:
+        rng = np.random.default_rng(sum(ord(c) for c in text))
+        vectors.append(rng.normal(size=8).tolist())
+    return vectors
+
+class TestVectorStore:
+
+    @pytest.fixture
+    def store(self):
+        """Create a vector store with a fake embedding backend."""
+        with patch.object(VectorStore, "_get_embeddings", side_effect=fake_embeddings):
+            store = VectorStore()
+            store.add_texts(
+                ["savings account", "mortgage loan", "travel card"],
+                [{"name": "savings"}, {"name": "mortgage"}, {"name": "card"}]
+            )
+            yield store
+
+    def test_embeddings_are_normalized_float32(self, store):
+        """Stored rows are contiguous, float32 and unit length."""
+        matrix = store.embeddings
+        assert matrix.dtype == np.float32
+        assert matrix.flags["C_CONTIGUOUS"]
+        np.testing.assert_allclose(np.linalg.norm(matrix, axis=1), 1.0, rtol=1e-5)
+
+    def test_similarity_search_returns_exact_match_first(self, store):
+        """A query identical to a stored text ranks that text first."""
+        with patch.object(VectorStore, "_get_embeddings", side_effect=fake_embeddings):
+            results = store.similarity_search("mortgage loan", k=2)
+
+        assert len(results) == 2
+        assert results[0]["metadata"] == {"name": "mortgage"}
+        assert results[0]["similarity"] == pytest.approx(1.0, abs=1e-5)
+
+    def test_save_and_load_memory_maps_index(self, store, tmp_path):
+        """A saved index reopens lazily as a read-only memory map."""
+        store.save(str(tmp_path))
+
+        loaded = VectorStore.load(str(tmp_path))
+        assert loaded is not None
+        assert loaded._loaded is False
+
+        assert loaded.texts == store.texts
+        assert isinstance(loaded.embeddings, np.memmap)
+        assert not loaded.embeddings.flags["WRITEABLE"]
+        np.testing.assert_array_equal(np.asarray(loaded.embeddings), store.embeddings)
+
+        with patch.object(VectorStore, "_get_embeddings", side_effect=fake_embeddings):
+            results = loaded.similarity_search("travel card", k=1)
+        assert results[0]["metadata"] == {"name": "card"}
+
+    def test_load_is_shared_until_index_changes(self, store, tmp_path):
+        """Reopening an unchanged index returns the same process-wide instance."""
+        store.save(str(tmp_path))
+        first = VectorStore.load(str(tmp_path))
+        assert VectorStore.load(str(tmp_path)) is first
+
+    def test_load_missing_index_returns_none(self, tmp_path):
+        """Loading a directory without an index returns None."""
+        assert VectorStore.load(str(tmp_path / "missing")) is None
+
+    def test_zero_vectors_are_detected(self):
+        """Failed embeddings (zero vectors) are reported so they aren't persisted."""
+        store = VectorStore()
+        store.add_embeddings(["a", "b"], [[1.0, 0.0], [0.0, 0.0]])
+        assert store.has_empty_embeddings()